@@ -0,0 +1,218 @@
+"""
+Pagination throughput benchmarks against the local Unipile stub.
+
+Measures, per scenario:
+- pages/s and results/s for the whole harvest;
+- time to first result (TTFR);
+- bytes written for checkpoints (write syscalls from /proc/self/io when
+  available, plus the final checkpoint size);
+- peak RSS of the process.
+
+Each scenario runs in its own subprocess so peak RSS is not polluted by the
+previous one. Two targets are measured: the script path
+(`fetch_salesnav_people` / `iter_salesnav_people`) and the app's bulk fetch
+loop (UnipileClient.search_people driven by CursorPrefetcher with the same
+dedupe the app uses).
+
+Usage:
+    python benchmarks/bench_pagination.py                 # all scenarios, table output
+    python benchmarks/bench_pagination.py --json out.json # also save the raw numbers
+    python benchmarks/bench_pagination.py --scenario script-latency
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "projeto_linkedin"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from unipile_stub import UnipileStub  # noqa: E402
+
+# name -> (target, stub options, runner options)
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "script-fast": {"target": "script", "stub": {"total": 5000}, "run": {}},
+    "script-latency": {"target": "script", "stub": {"total": 3000, "latency": 0.02}, "run": {}},
+    "script-serial": {"target": "script", "stub": {"total": 3000, "latency": 0.02}, "run": {"prefetch": 0}},
+    "script-429": {"target": "script", "stub": {"total": 3000, "latency": 0.005, "rate_429": 0.1}, "run": {}},
+    "script-capped": {"target": "script", "stub": {"total": 20000, "cursor_mode": "capped"}, "run": {}},
+    "script-overlap": {"target": "script", "stub": {"total": 5000, "overlap": 20}, "run": {}},
+    "app-fast": {"target": "app", "stub": {"total": 5000}, "run": {}},
+    "app-latency": {"target": "app", "stub": {"total": 3000, "latency": 0.02}, "run": {}},
+    "app-serial": {"target": "app", "stub": {"total": 3000, "latency": 0.02}, "run": {"prefetch": 0}},
+}
+
+
+def _written_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/io", "r", encoding="ascii") as handle:
+            for line in handle:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _peak_rss_kb() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_script(base_url: str, workdir: str, prefetch: int = 1) -> Dict[str, Any]:
+    from linkedin_salesnav_pagination import iter_salesnav_people
+
+    checkpoint = os.path.join(workdir, "checkpoint.json")
+    started = time.perf_counter()
+    first = None
+    count = 0
+    for _ in iter_salesnav_people(
+        {"keywords": "rh"},
+        account_id="bench",
+        token="bench",
+        base_url=base_url,
+        limit=100,
+        min_delay=0.0,
+        max_delay=0.0,
+        checkpoint_path=checkpoint,
+        resume=False,
+        prefetch=prefetch,
+        max_retries=10,
+    ):
+        if first is None:
+            first = time.perf_counter() - started
+        count += 1
+    return {
+        "results": count,
+        "elapsed": time.perf_counter() - started,
+        "ttfr": first,
+        "checkpoint_size": os.path.getsize(checkpoint) if os.path.exists(checkpoint) else 0,
+    }
+
+
+def run_app_loop(base_url: str, workdir: str, prefetch: int = 1) -> Dict[str, Any]:
+    """The bulk fetch loop from app.py without the Streamlit calls."""
+    from cursor_prefetch import CursorPrefetcher, page_cursor
+    from dedup_index import HashedKeySet
+    from retry_policy import RetryPolicy
+    from unipile_client import UnipileClient
+
+    policy = RetryPolicy(max_attempts=10, base_delay=0.0, max_delay=0.0)
+    unipile = UnipileClient(
+        base_url,
+        "bench",
+        retry_policies={"search": policy, "profile": policy, "relations": policy, "invite": policy, "message": policy},
+    )
+    seen = HashedKeySet()
+    results: List[dict] = []
+    started = time.perf_counter()
+    first = None
+
+    def fetch_page(cursor: Optional[str]) -> dict:
+        return unipile.search_people("bench", {"keywords": "rh"}, limit=100, cursor=cursor, api_type="sales_navigator")
+
+    with CursorPrefetcher(fetch_page, depth=prefetch) as pages:
+        for _, res in pages:
+            for item in res.get("items") or []:
+                key = item.get("public_identifier") or item.get("id")
+                if key in seen:
+                    continue
+                seen.add(key)
+                results.append(item)
+                if first is None:
+                    first = time.perf_counter() - started
+            if not page_cursor(res):
+                break
+    return {"results": len(results), "elapsed": time.perf_counter() - started, "ttfr": first, "checkpoint_size": 0}
+
+
+def run_scenario(name: str) -> Dict[str, Any]:
+    scenario = SCENARIOS[name]
+    runner = run_script if scenario["target"] == "script" else run_app_loop
+    with UnipileStub(**scenario["stub"]) as stub, tempfile.TemporaryDirectory() as workdir:
+        written_before = _written_bytes()
+        outcome = runner(stub.base_url, workdir, **scenario["run"])
+        written_after = _written_bytes()
+        stats = dict(stub.stats)
+    elapsed = outcome["elapsed"] or 1e-9
+    return {
+        "scenario": name,
+        "target": scenario["target"],
+        "results": outcome["results"],
+        "pages": stats["pages"],
+        "requests": stats["requests"],
+        "throttled": stats["throttled"],
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_s": round(stats["pages"] / elapsed, 1),
+        "results_per_s": round(outcome["results"] / elapsed, 1),
+        "ttfr_ms": round(outcome["ttfr"] * 1000, 1) if outcome["ttfr"] is not None else None,
+        "checkpoint_bytes_written": (
+            written_after - written_before if written_before is not None and written_after is not None else None
+        ),
+        "checkpoint_size": outcome["checkpoint_size"],
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+
+def _run_in_subprocess(name: str) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, __file__, "--child", name],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _print_table(rows: List[Dict[str, Any]]) -> None:
+    columns = [
+        "scenario",
+        "results",
+        "pages",
+        "throttled",
+        "elapsed_s",
+        "pages_per_s",
+        "ttfr_ms",
+        "checkpoint_bytes_written",
+        "checkpoint_size",
+        "peak_rss_kb",
+    ]
+    widths = {col: max(len(col), *(len(str(row.get(col))) for row in rows)) for col in columns}
+    print("  ".join(col.ljust(widths[col]) for col in columns))
+    for row in rows:
+        print("  ".join(str(row.get(col)).ljust(widths[col]) for col in columns))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Run only these scenarios.")
+    parser.add_argument("--json", help="Write the raw results to this file.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Pagination logs go to stderr; stdout carries only the result line.
+        import logging
+
+        logging.disable(logging.WARNING)
+        print(json.dumps(run_scenario(args.child)))
+        return
+
+    rows = [_run_in_subprocess(name) for name in (args.scenario or list(SCENARIOS))]
+    _print_table(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(rows, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+EXPLAIN every Supabase query the app, cron and sync workers issue.
+
+Builds each query the same way the code does (same table, filters, order and
+limit) and asks PostgREST for the plan with `.explain()`. Plans that fall
+back to a sequential scan on a large table are flagged, so a missing or
+unused index from supabase/migrations/*_query_indexes.sql shows up at once.
+
+PostgREST only returns plans when `db_plan_enabled` is on for the API role
+(do this on a dev/staging project, not production):
+
+    alter role authenticator set pgrst.db_plan_enabled to true;
+    notify pgrst, 'reload config';
+
+Usage:
+    SUPABASE_URL=... SUPABASE_SERVICE_KEY=... python benchmarks/explain_queries.py
+    python benchmarks/explain_queries.py --analyze --query cron_pending_schedules
+    python benchmarks/explain_queries.py --campaign-id <uuid> --batch-id <uuid>
+"""
+import argparse
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "projeto_linkedin"))
+
+from lead_columns import lead_select  # noqa: E402
+from supabase_utils import DEFAULT_PAGE_SIZE  # noqa: E402
+
+SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+INDEX_SCAN = re.compile(r"(?:Index Only Scan|Index Scan|Bitmap Index Scan)(?: Backward)? using (\w+)")
+
+# name -> (call site, builder(client, ctx) returning a postgrest request builder)
+QUERIES: Dict[str, Dict[str, Any]] = {
+    "leads_keyset_page": {
+        "site": "DBHandler.iter_leads (app tabs 2-4)",
+        "build": lambda sb, ctx: sb.table("leads")
+        .select(lead_select("invite"))
+        .eq("campaign_id", ctx["campaign_id"])
+        .gt("id", ctx["lead_id"])
+        .order("id")
+        .limit(DEFAULT_PAGE_SIZE),
+    },
+    "leads_pending": {
+        "site": "DBHandler.get_pending_leads",
+        "build": lambda sb, ctx: sb.table("leads")
+        .select(lead_select("list"))
+        .eq("campaign_id", ctx["campaign_id"])
+        .eq("status", "new")
+        .order("id")
+        .limit(DEFAULT_PAGE_SIZE),
+    },
+    "sync_leads_by_invitation": {
+        "site": "sync_acceptances.run (lead_query)",
+        "build": lambda sb, ctx: sb.table("leads")
+        .select(lead_select("sync"))
+        .eq("campaign_id", ctx["campaign_id"])
+        .in_("invitation_status", ["sent", "accepted"])
+        .order("id")
+        .limit(DEFAULT_PAGE_SIZE),
+    },
+    "sync_sent_logs": {
+        "site": "sync_acceptances.run (sent_logs)",
+        "build": lambda sb, ctx: sb.table("message_logs")
+        .select("lead_id")
+        .eq("campaign_id", ctx["campaign_id"])
+        .in_("status", ["sent", "auto_sent"]),
+    },
+    "cron_pending_schedules": {
+        "site": "cron_invites.get_pending_schedules",
+        "build": lambda sb, ctx: sb.table("invite_schedules")
+        .select("*")
+        .lte("scheduled_date", ctx["today"])
+        .eq("status", "scheduled")
+        .order("scheduled_date")
+        .limit(ctx["pending_limit"]),
+    },
+    "send_counter_usage": {
+        "site": "SendCounters.usage (cron, UI and sync send limits)",
+        "build": lambda sb, ctx: sb.table("account_send_counters")
+        .select("day,count")
+        .eq("account_id", ctx["account_id"])
+        .eq("action", "invite")
+        .gte("day", ctx["week_ago"][:10]),
+    },
+    "schedule_batches": {
+        "site": "DBHandler.get_invite_schedule_batches",
+        "build": lambda sb, ctx: sb.table("invite_schedule_batches")
+        .select("*")
+        .eq("user_id", ctx["user_id"])
+        .eq("campaign_id", ctx["campaign_id"])
+        .eq("source", "campaign")
+        .order("created_at", desc=True),
+    },
+    "schedule_days": {
+        "site": "DBHandler.get_invite_schedule_days",
+        "build": lambda sb, ctx: sb.table("invite_schedule_days")
+        .select("*")
+        .eq("user_id", ctx["user_id"])
+        .eq("batch_id", ctx["batch_id"])
+        .gt("scheduled", 0)
+        .order("scheduled_date"),
+    },
+    "schedule_send_day": {
+        "site": "DBHandler.get_invite_schedule (send a day)",
+        "build": lambda sb, ctx: sb.table("invite_schedules")
+        .select("*")
+        .eq("user_id", ctx["user_id"])
+        .eq("batch_id", ctx["batch_id"])
+        .eq("status", "scheduled")
+        .eq("scheduled_date", ctx["today"])
+        .order("scheduled_date")
+        .limit(ctx["daily_limit"]),
+    },
+}
+
+
+def plan_text(result: Any) -> str:
+    """postgrest-py returns the plan as text (or an APIResponse holding it)."""
+    if isinstance(result, str):
+        return result
+    data = getattr(result, "data", result)
+    return data if isinstance(data, str) else str(data)
+
+
+def summarize_plan(plan: str) -> Dict[str, List[str]]:
+    return {
+        "indexes": sorted(set(INDEX_SCAN.findall(plan))),
+        "seq_scans": sorted(set(SEQ_SCAN.findall(plan))),
+    }
+
+
+def _first_value(sb, table: str, column: str, **filters: Any) -> Optional[str]:
+    query = sb.table(table).select(column)
+    for key, value in filters.items():
+        query = query.eq(key, value)
+    rows = query.not_.is_(column, "null").limit(1).execute().data or []
+    return rows[0][column] if rows else None
+
+
+def build_context(sb, args: argparse.Namespace) -> Dict[str, Any]:
+    """Sample ids for the filters; real ids give the planner realistic selectivity."""
+    campaign_id = args.campaign_id or _first_value(sb, "campaigns", "id")
+    user_id = args.user_id or (
+        _first_value(sb, "campaigns", "user_id", id=campaign_id) if campaign_id else None
+    )
+    batch_id = args.batch_id or _first_value(sb, "invite_schedules", "batch_id")
+    lead_id = _first_value(sb, "leads", "id", campaign_id=campaign_id) if campaign_id else None
+    account_id = args.account_id or _first_value(sb, "unipile_accounts", "account_id")
+    zero_uuid = "00000000-0000-0000-0000-000000000000"
+    return {
+        "campaign_id": campaign_id or zero_uuid,
+        "user_id": user_id or zero_uuid,
+        "batch_id": batch_id or zero_uuid,
+        "lead_id": lead_id or zero_uuid,
+        "account_id": account_id or "",
+        "today": datetime.utcnow().date().isoformat(),
+        "week_ago": (datetime.utcnow() - timedelta(days=7)).isoformat(),
+        "daily_limit": args.daily_limit,
+        "pending_limit": int(os.getenv("INVITE_PENDING_FETCH_LIMIT", "1000")),
+    }
+
+
+def explain_query(sb, name: str, ctx: Dict[str, Any], analyze: bool = False) -> Dict[str, Any]:
+    builder: Callable = QUERIES[name]["build"]
+    plan = plan_text(builder(sb, ctx).explain(analyze=analyze, format="text").execute())
+    return {"name": name, "site": QUERIES[name]["site"], "plan": plan, **summarize_plan(plan)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--query", action="append", choices=sorted(QUERIES), help="Explain only these queries.")
+    parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE (runs the queries).")
+    parser.add_argument("--campaign-id", help="Campaign used in the filters (default: first campaign).")
+    parser.add_argument("--user-id", help="User used in the filters (default: the campaign owner).")
+    parser.add_argument("--account-id", help="Unipile account used in the filters (default: first account).")
+    parser.add_argument("--batch-id", help="Schedule batch used in the filters (default: first batch).")
+    parser.add_argument("--daily-limit", type=int, default=int(os.getenv("INVITE_DAILY_LIMIT", "40")))
+    parser.add_argument("--quiet", action="store_true", help="Print only the summary line per query.")
+    args = parser.parse_args()
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        parser.error("SUPABASE_URL and SUPABASE_SERVICE_KEY are required.")
+
+    from supabase import create_client
+
+    sb = create_client(url, key)
+    ctx = build_context(sb, args)
+    flagged = 0
+    for name in args.query or list(QUERIES):
+        try:
+            outcome = explain_query(sb, name, ctx, analyze=args.analyze)
+        except Exception as exc:
+            print(f"[error] {name} ({QUERIES[name]['site']}): {exc}")
+            flagged += 1
+            continue
+        verdict = "SEQ SCAN " + ",".join(outcome["seq_scans"]) if outcome["seq_scans"] else "ok"
+        print(f"[{verdict}] {name} ({outcome['site']}) indexes={','.join(outcome['indexes']) or '-'}")
+        if not args.quiet:
+            print(outcome["plan"].rstrip())
+            print()
+        flagged += bool(outcome["seq_scans"])
+    # Seq scans on tiny tables are expected; on a populated project they point at a missing index.
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Local HTTP stub of the Unipile search endpoint for pagination benchmarks.
+
+Serves POST /api/v1/linkedin/search with deterministic fake leads and
+cursor pagination. Page size, latency, 429 rate, duplicate overlap and the
+cursor behaviour are configurable, so pagination changes can be measured
+without touching a real LinkedIn account.
+"""
+import base64
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+SEARCH_PATH = "/api/v1/linkedin/search"
+CURSOR_MODES = ("normal", "capped", "repeat")
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["offset"])
+
+
+def fake_lead(n: int, padding: int = 0) -> Dict[str, Any]:
+    return {
+        "object": "SearchResult",
+        "type": "PEOPLE",
+        "id": f"ACoAA{n:010d}",
+        "public_identifier": f"lead-{n}",
+        "name": f"Lead {n}",
+        "first_name": "Lead",
+        "last_name": str(n),
+        "headline": "Gerente de RH" + " x" * padding,
+        "location": "Sao Paulo, Brazil",
+        "network_distance": "DISTANCE_3",
+        "current_positions": [
+            {"company": f"Empresa {n % 997}", "company_id": str(n % 997), "role": "HR Manager"}
+        ],
+    }
+
+
+class UnipileStub:
+    """
+    Threaded HTTP server answering like the Unipile search endpoint.
+
+    - total: leads the search reports in paging.total_count;
+    - max_page_size: cap applied to the requested limit;
+    - latency: seconds slept per request (plus up to `jitter`);
+    - rate_429: fraction of requests answered with 429 (Retry-After: 0);
+    - overlap: leads repeated from the previous page at the start of each page;
+    - cursor_mode: "normal" pages through everything, "capped" stops at
+      `cap` results like Sales Navigator, "repeat" returns the same cursor
+      after `repeat_after` pages.
+
+    Use as a context manager; base_url points at the running server.
+    """
+
+    def __init__(
+        self,
+        total: int = 5000,
+        max_page_size: int = 100,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_429: float = 0.0,
+        overlap: int = 0,
+        cursor_mode: str = "normal",
+        cap: int = 2500,
+        repeat_after: int = 10,
+        padding: int = 0,
+        seed: int = 7,
+    ):
+        if cursor_mode not in CURSOR_MODES:
+            raise ValueError(f"cursor_mode must be one of {CURSOR_MODES}")
+        self.total = total
+        self.max_page_size = max_page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.overlap = overlap
+        self.cursor_mode = cursor_mode
+        self.cap = cap
+        self.repeat_after = repeat_after
+        self.padding = padding
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "pages": 0, "throttled": 0, "bytes_sent": 0}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _throttled(self) -> bool:
+        with self._lock:
+            self.stats["requests"] += 1
+            hit = self.rate_429 > 0 and self._random.random() < self.rate_429
+            if hit:
+                self.stats["throttled"] += 1
+            return hit
+
+    def page(self, limit: int, cursor: Optional[str]) -> Dict[str, Any]:
+        limit = max(1, min(limit, self.max_page_size))
+        offset = decode_cursor(cursor)
+        reachable = min(self.total, self.cap) if self.cursor_mode == "capped" else self.total
+        start = max(0, offset - self.overlap) if offset else 0
+        end = min(offset + limit, reachable)
+        items = [fake_lead(n, self.padding) for n in range(start, end)]
+        page_number = offset // limit + 1
+        next_cursor = None
+        if end < reachable:
+            next_cursor = encode_cursor(end)
+            if self.cursor_mode == "repeat" and page_number >= self.repeat_after:
+                next_cursor = cursor
+        with self._lock:
+            self.stats["pages"] += 1
+        return {
+            "object": "LinkedinSearch",
+            "items": items,
+            "config": {"params": {"api": "sales_navigator", "category": "people"}},
+            "paging": {"start": offset, "page_count": len(items), "total_count": self.total},
+            "cursor": next_cursor,
+        }
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, Nagle + delayed ACK add ~40ms per page.
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):  # noqa: A002 - silence per-request logging
+                return
+
+            def _send(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with stub._lock:
+                    stub.stats["bytes_sent"] += len(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                parsed = urlparse(self.path)
+                if parsed.path != SEARCH_PATH:
+                    self._send(404, {"error": "not found"})
+                    return
+                if stub.latency or stub.jitter:
+                    time.sleep(stub.latency + stub._random.uniform(0, stub.jitter))
+                if stub._throttled():
+                    self._send(429, {"error": "rate limited"}, {"Retry-After": "0"})
+                    return
+                query = parse_qs(parsed.query)
+                limit = int((query.get("limit") or ["100"])[0])
+                cursor = (query.get("cursor") or [None])[0]
+                self._send(200, stub.page(limit, cursor))
+
+        return Handler
+
+    def start(self) -> "UnipileStub":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="unipile-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
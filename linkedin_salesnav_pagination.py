@@ -1,16 +1,33 @@
+import argparse
 import json
 import logging
 import os
-import random
+import queue
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import requests
 
+# Shared helpers (rate limiter, etc.) live next to the app modules.
+sys.path.insert(0, str(Path(__file__).resolve().parent / "projeto_linkedin"))
+
+from rate_limiter import RateLimiter  # noqa: E402
+from retry_policy import DEFAULT_RETRY_STATUSES, RetryPolicy, max_total_wait_from_env  # noqa: E402
+from cursor_prefetch import CursorPrefetcher  # noqa: E402
+from salesnav_shards import SALESNAV_RESULT_CAP, DEFAULT_FACETS, plan_shards  # noqa: E402
+from salesnav_url import parse_salesnav_url, salesnav_search_params  # noqa: E402
+from result_sinks import ResultSink, open_sink  # noqa: E402
+from dedup_index import HashedKeySet  # noqa: E402
+
 DEFAULT_BASE_URL = os.getenv("UNIPILE_BASE_URL", "https://api26.unipile.com:15609")
 SEARCH_ENDPOINT = "/api/v1/linkedin/search"
-RETRY_STATUS_CODES = {401, 403, 429, 503, 504}
+# Items per line when the checkpoint journal is compacted into a snapshot.
+SNAPSHOT_CHUNK = 500
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -19,28 +36,137 @@ logging.basicConfig(
 )
 
 
-def _compute_backoff(attempt: int, base: float = 1.5, cap: float = 60.0) -> float:
-    exp = min(cap, base * (2 ** (attempt - 1)))
-    jitter = random.uniform(0, exp * 0.2)
-    return exp + jitter
+def search_retry_policy(max_retries: int) -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts=max_retries,
+        retry_statuses=DEFAULT_RETRY_STATUSES,
+        base_delay=1.5,
+        max_delay=60.0,
+        max_total_wait=max_total_wait_from_env(),
+    )
+
+
+def _item_key(item: Dict[str, Any]) -> Optional[str]:
+    key = item.get("public_identifier") or item.get("id") or item.get("provider_id")
+    return str(key) if key else None
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _append_journal(path: str, record: Dict[str, Any]) -> None:
+    """Append one JSON line to the checkpoint journal and flush it to disk."""
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        handle.flush()
+        os.fsync(handle.fileno())
 
 
-def _atomic_write_json(path: str, payload: Dict[str, Any]) -> None:
+def _read_journal(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield journal records one line at a time (a torn last line is skipped)."""
+    if not path or not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as handle:
+        for number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A torn last line from a crash mid-append; everything before it is intact.
+                logger.warning("Ignoring unreadable checkpoint line %s.", number)
+
+
+def _journal_items(path: str) -> Iterator[Dict[str, Any]]:
+    for record in _read_journal(path):
+        yield from record.get("items") or []
+
+
+def _journal_state(path: str) -> Dict[str, Any]:
+    state: Dict[str, Any] = {"cursor": None, "page": 0, "count": 0, "finished": False, "exhausted": False}
+    for record in _read_journal(path):
+        kind = record.get("type")
+        if kind == "snapshot":
+            state.update(
+                cursor=record.get("cursor"),
+                page=record.get("page", 0),
+                finished=bool(record.get("finished")),
+                exhausted=bool(record.get("exhausted")),
+            )
+        elif kind == "page":
+            state.update(cursor=record.get("cursor"), page=record.get("page", state["page"]))
+        state["count"] += len(record.get("items") or [])
+    return state
+
+
+def _compact_journal(path: str, state: Dict[str, Any], items: Optional[Iterable[Dict[str, Any]]] = None) -> None:
+    """Atomically rewrite the journal as a snapshot header plus fixed-size item lines.
+
+    items=None carries over the items already in the journal, streaming them
+    from the old file, so compaction never holds the whole search in memory.
+    """
     tmp_path = f"{path}.tmp"
+    source = _journal_items(path) if items is None else items
     with open(tmp_path, "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, ensure_ascii=False, indent=2)
+        handle.write(json.dumps({"type": "snapshot", **state}, ensure_ascii=False) + "\n")
+        chunk: List[Dict[str, Any]] = []
+        for item in source:
+            chunk.append(item)
+            if len(chunk) >= SNAPSHOT_CHUNK:
+                handle.write(json.dumps({"type": "items", "items": chunk}, ensure_ascii=False) + "\n")
+                chunk = []
+        if chunk:
+            handle.write(json.dumps({"type": "items", "items": chunk}, ensure_ascii=False) + "\n")
+        handle.flush()
+        os.fsync(handle.fileno())
     os.replace(tmp_path, path)
 
 
-def _load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
-    if not path or not os.path.exists(path):
-        return None
+def _migrate_legacy_checkpoint(path: str) -> bool:
+    """Convert a legacy single-object JSON checkpoint into a journal in place.
+
+    Returns False when the file cannot be used as a checkpoint at all.
+    """
+    with open(path, "r", encoding="utf-8") as handle:
+        first_line = handle.readline()
+    try:
+        record = json.loads(first_line)
+    except ValueError:
+        record = None
+    if isinstance(record, dict) and "type" in record:
+        return True
     try:
         with open(path, "r", encoding="utf-8") as handle:
-            return json.load(handle)
+            legacy = json.load(handle)
     except Exception as exc:
         logger.warning("Failed to load checkpoint: %s", exc)
+        return False
+    if not isinstance(legacy, dict):
+        logger.warning("Failed to load checkpoint: unexpected format in %s", path)
+        return False
+    _compact_journal(
+        path,
+        {
+            "cursor": legacy.get("cursor"),
+            "page": legacy.get("page", 0),
+            "finished": bool(legacy.get("finished")),
+            "updated_at": _utc_now(),
+        },
+        items=legacy.get("items", []) or [],
+    )
+    logger.info("Migrated legacy checkpoint %s to the journal format.", path)
+    return True
+
+
+def _load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    """Load a checkpoint journal (or legacy JSON checkpoint) fully into memory."""
+    if not path or not os.path.exists(path) or not _migrate_legacy_checkpoint(path):
         return None
+    state = _journal_state(path)
+    state["items"] = list(_journal_items(path))
+    return state
 
 
 def _request_with_retries(
@@ -52,48 +178,33 @@ def _request_with_retries(
     payload: Dict[str, Any],
     timeout: int,
     max_retries: int,
+    throttle: Optional[Callable[[], Any]] = None,
+    observe: Optional[Callable[[int, float], Any]] = None,
+    policy: Optional[RetryPolicy] = None,
 ) -> Tuple[int, Dict[str, Any]]:
-    for attempt in range(1, max_retries + 1):
-        try:
-            response = session.post(
-                url,
-                headers=headers,
-                params=params,
-                json=payload,
-                timeout=timeout,
-            )
-            status = response.status_code
-            if status in RETRY_STATUS_CODES:
-                if attempt >= max_retries:
-                    response.raise_for_status()
-                wait = _compute_backoff(attempt)
-                logger.warning(
-                    "Retryable status %s (attempt %s/%s). Waiting %.1fs",
-                    status,
-                    attempt,
-                    max_retries,
-                    wait,
-                )
-                time.sleep(wait)
-                continue
-            response.raise_for_status()
-            return status, response.json()
-        except requests.RequestException as exc:
-            if attempt >= max_retries:
-                raise
-            wait = _compute_backoff(attempt)
-            logger.warning(
-                "Request error: %s (attempt %s/%s). Waiting %.1fs",
-                exc,
-                attempt,
-                max_retries,
-                wait,
-            )
-            time.sleep(wait)
-    raise RuntimeError("Max retries exceeded")
+    policy = policy or search_retry_policy(max_retries)
+
+    def send() -> requests.Response:
+        if throttle:
+            throttle()
+        started = time.monotonic()
+        response = session.post(
+            url,
+            headers=headers,
+            params=params,
+            json=payload,
+            timeout=timeout,
+        )
+        if observe:
+            observe(response.status_code, time.monotonic() - started)
+        return response
 
+    response = policy.run(send, label="Sales Navigator search", paced=throttle is not None)
+    response.raise_for_status()
+    return response.status_code, response.json()
 
-def fetch_salesnav_people(
+
+def iter_salesnav_people(
     search_params: Dict[str, Any],
     *,
     account_id: str,
@@ -108,19 +219,58 @@ def fetch_salesnav_people(
     resume: bool = True,
     timeout: int = 30,
     max_retries: int = 5,
-) -> List[Dict[str, Any]]:
+    rate_limiter: Optional[RateLimiter] = None,
+    prefetch: int = 1,
+    compact_every: int = 50,
+    replay_checkpoint: bool = True,
+    by_page: bool = False,
+) -> Iterator[Any]:
     """
-    Fetch all possible Sales Navigator results using cursor pagination.
+    Stream Sales Navigator results using cursor pagination.
 
     Requirements:
     - POST {base_url}/api/v1/linkedin/search
     - Headers: accept, content-type, and token in "Header"
     - Query params: account_id, limit (<=100), cursor (optional)
     - Body: {"api": "sales_navigator", "category": "people", ...filters}
+
+    Yields each new (deduplicated) item right after its page is journaled
+    (with checkpoint_every=1), or one list per page with by_page=True. Only the dedup keys are kept in
+    memory, never the items themselves. On resume the checkpointed items are
+    yielded again first (replay_checkpoint=False skips them), so a consumer
+    that crashed mid-run sees every item at least once. Dedup keys are kept
+    as 64-bit hashes (dedup_index.HashedKeySet), not as strings.
+
+    When a rate_limiter is given, every request first takes a "search" token
+    from the account's shared bucket and reports its status/latency back to the
+    adaptive controller; min_delay/max_delay still add pacing.
+
+    With prefetch > 0 the next page is requested as soon as the current
+    page's cursor arrives, while the current page is deduped and
+    checkpointed; at most `prefetch` pages run ahead. prefetch=0 is the
+    strictly serial mode. The pacing delay applies between request starts
+    in both modes.
+
+    The checkpoint is an append-only JSONL journal: every `checkpoint_every`
+    pages one line with the page number, next cursor and only the new items
+    is appended, and every `compact_every` appends the journal is rewritten
+    as a snapshot. Resume replays the journal; legacy single-object JSON
+    checkpoints are still read (and migrated). The final snapshot is marked
+    finished only when the cursor ran out; a max_results stop saves the
+    cursor, so a rerun with a larger limit continues from there.
     """
     if limit > 100:
         limit = 100
 
+    throttle = None
+    observe = None
+    if rate_limiter:
+        def throttle() -> float:
+            return rate_limiter.acquire(account_id, "search")
+
+        def observe(status: int, latency: float) -> bool:
+            return rate_limiter.record(account_id, "search", status, latency)
+
     session = requests.Session()
     headers = {
         "accept": "application/json",
@@ -128,28 +278,45 @@ def fetch_salesnav_people(
         "Header": token,
     }
 
-    results: List[Dict[str, Any]] = []
-    seen_ids: set[str] = set()
+    seen_ids = HashedKeySet()
     cursor: Optional[str] = None
     seen_cursors: set[str] = set()
     page = 0
+    count = 0
 
-    if resume and checkpoint_path:
-        checkpoint = _load_checkpoint(checkpoint_path)
-        if checkpoint:
-            cursor = checkpoint.get("cursor")
-            results = checkpoint.get("items", [])
-            for item in results:
-                key = item.get("public_identifier") or item.get("id") or item.get("provider_id")
+    resumed = bool(
+        resume
+        and checkpoint_path
+        and os.path.exists(checkpoint_path)
+        and _migrate_legacy_checkpoint(checkpoint_path)
+    )
+    if resumed:
+        state = _journal_state(checkpoint_path)
+        cursor = state["cursor"]
+        page = state["page"]
+        logger.info(
+            "Resuming from checkpoint: page=%s count=%s cursor=%s",
+            page,
+            state["count"],
+            bool(cursor),
+        )
+        for record in _read_journal(checkpoint_path):
+            replayed = record.get("items") or []
+            for item in replayed:
+                key = _item_key(item)
                 if key:
-                    seen_ids.add(str(key))
-            page = checkpoint.get("page", 0)
-            logger.info(
-                "Resuming from checkpoint: page=%s count=%s cursor=%s",
-                page,
-                len(results),
-                bool(cursor),
-            )
+                    seen_ids.add(key)
+            count += len(replayed)
+            if replay_checkpoint and replayed:
+                if by_page:
+                    yield replayed
+                else:
+                    yield from replayed
+    elif checkpoint_path:
+        # Fresh run: start an empty journal instead of appending to a stale one.
+        _compact_journal(checkpoint_path, {"cursor": None, "page": 0, "updated_at": _utc_now()}, items=())
+    unsaved: List[Dict[str, Any]] = []
+    appends = 0
 
     url = f"{base_url.rstrip('/')}{SEARCH_ENDPOINT}"
     payload = {
@@ -158,16 +325,11 @@ def fetch_salesnav_people(
         **search_params,
     }
 
-    while True:
-        if max_results and len(results) >= max_results:
-            logger.info("Reached max_results=%s. Stopping.", max_results)
-            break
-
+    def fetch_page(page_cursor: Optional[str]) -> Tuple[int, Dict[str, Any]]:
         params = {"account_id": account_id, "limit": limit}
-        if cursor:
-            params["cursor"] = cursor
-
-        status, data = _request_with_retries(
+        if page_cursor:
+            params["cursor"] = page_cursor
+        return _request_with_retries(
             session,
             url,
             headers=headers,
@@ -175,82 +337,334 @@ def fetch_salesnav_people(
             payload=payload,
             timeout=timeout,
             max_retries=max_retries,
+            throttle=throttle,
+            observe=observe,
         )
 
-        items = data.get("items", []) or []
-        paging = data.get("paging", {}) or {}
-        next_cursor = data.get("cursor") or paging.get("cursor")
-        total_count = paging.get("total_count")
-
-        new_items = 0
-        for item in items:
-            key = item.get("public_identifier") or item.get("id") or item.get("provider_id")
-            if key:
-                key = str(key)
-            if key and key in seen_ids:
-                continue
-            if key:
-                seen_ids.add(key)
-            results.append(item)
-            new_items += 1
-            if max_results and len(results) >= max_results:
-                break
-
-        page += 1
-        logger.info(
-            "Page %s | status=%s | new=%s | total=%s | cursor=%s | api_total=%s",
-            page,
-            status,
-            new_items,
-            len(results),
-            bool(next_cursor),
-            total_count,
+    def page_next_cursor(fetched: Tuple[int, Dict[str, Any]]) -> Optional[str]:
+        data = fetched[1]
+        return data.get("cursor") or (data.get("paging", {}) or {}).get("cursor")
+
+    # finished: the cursor ran out (or repeated). A max_results stop keeps the
+    # cursor so a rerun with a larger limit picks up where this one stopped.
+    # Snapshots also carry "exhausted", written only by runs that know the
+    # difference: older journals marked every stop as finished, so on those a
+    # resume still walks the search again (deduped) instead of trusting it.
+    # Skipping exhausted checkpoints is what lets a resumed sharded search
+    # leave its completed shards alone.
+    finished = False
+    if max_results and count >= max_results:
+        logger.info("Reached max_results=%s. Stopping.", max_results)
+        finished = resumed and state["exhausted"]
+    elif resumed and state["exhausted"]:
+        logger.info("Checkpoint already exhausted the search. Nothing left to fetch.")
+        finished = True
+    else:
+        with CursorPrefetcher(
+            fetch_page,
+            start_cursor=cursor,
+            depth=prefetch,
+            min_delay=min_delay,
+            max_delay=max_delay,
+            next_cursor=page_next_cursor,
+        ) as pages:
+            for page_cursor_used, (status, data) in pages:
+                items = data.get("items", []) or []
+                paging = data.get("paging", {}) or {}
+                next_cursor = data.get("cursor") or paging.get("cursor")
+                total_count = paging.get("total_count")
+
+                new_page_items: List[Dict[str, Any]] = []
+                truncated = False
+                for position, item in enumerate(items):
+                    key = _item_key(item)
+                    if key and key in seen_ids:
+                        continue
+                    if key:
+                        seen_ids.add(key)
+                    new_page_items.append(item)
+                    if max_results and count + len(new_page_items) >= max_results:
+                        truncated = position + 1 < len(items)
+                        break
+                count += len(new_page_items)
+                unsaved.extend(new_page_items)
+
+                page += 1
+                logger.info(
+                    "Page %s | status=%s | new=%s | total=%s | cursor=%s | api_total=%s",
+                    page,
+                    status,
+                    len(new_page_items),
+                    count,
+                    bool(next_cursor),
+                    total_count,
+                )
+
+                if checkpoint_path and checkpoint_every and page % checkpoint_every == 0:
+                    _append_journal(
+                        checkpoint_path,
+                        {
+                            "type": "page",
+                            "page": page,
+                            "cursor": next_cursor,
+                            "items": unsaved,
+                            "updated_at": _utc_now(),
+                        },
+                    )
+                    unsaved = []
+                    appends += 1
+                    if compact_every and appends % compact_every == 0:
+                        _compact_journal(
+                            checkpoint_path,
+                            {"cursor": next_cursor, "page": page, "updated_at": _utc_now()},
+                        )
+
+                if new_page_items:
+                    if by_page:
+                        yield new_page_items
+                    else:
+                        yield from new_page_items
+
+                if not next_cursor:
+                    logger.info("No cursor returned. Pagination finished.")
+                    finished = True
+                    break
+
+                if next_cursor in seen_cursors:
+                    logger.warning("Cursor repeated. Stopping to avoid loop.")
+                    finished = True
+                    break
+
+                seen_cursors.add(next_cursor)
+                # Rest of a page cut by max_results: refetch it on resume (seen ids are skipped).
+                cursor = page_cursor_used if truncated else next_cursor
+
+                if max_results and count >= max_results:
+                    logger.info("Reached max_results=%s. Stopping.", max_results)
+                    break
+            else:
+                # The prefetcher stops on its own only when the cursor runs out or repeats.
+                finished = True
+
+    if checkpoint_path:
+        resume_cursor = None if finished else cursor
+        if unsaved:
+            _append_journal(checkpoint_path, {"type": "page", "page": page, "cursor": resume_cursor, "items": unsaved})
+        _compact_journal(
+            checkpoint_path,
+            {
+                "cursor": resume_cursor,
+                "page": page,
+                "count": count,
+                "updated_at": _utc_now(),
+                "finished": finished,
+                "exhausted": finished,
+            },
         )
 
-        if checkpoint_path and checkpoint_every and page % checkpoint_every == 0:
-            _atomic_write_json(
-                checkpoint_path,
-                {
-                    "cursor": next_cursor,
-                    "page": page,
-                    "count": len(results),
-                    "items": results,
-                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                },
-            )
 
-        if not next_cursor:
-            logger.info("No cursor returned. Pagination finished.")
-            break
+def fetch_salesnav_people(search_params: Dict[str, Any], **kwargs: Any) -> List[Dict[str, Any]]:
+    """
+    Fetch all possible Sales Navigator results into a list.
 
-        if next_cursor in seen_cursors:
-            logger.warning("Cursor repeated. Stopping to avoid loop.")
-            break
+    Thin wrapper around iter_salesnav_people (same keyword arguments, minus
+    by_page); prefer the generator for large searches.
+    """
+    return list(iter_salesnav_people(search_params, **kwargs))
 
-        cursor = next_cursor
-        seen_cursors.add(next_cursor)
 
-        if max_results and len(results) >= max_results:
-            logger.info("Reached max_results=%s. Stopping.", max_results)
-            break
+def probe_salesnav_total(
+    search_params: Dict[str, Any],
+    *,
+    account_id: str,
+    token: str,
+    base_url: str = DEFAULT_BASE_URL,
+    timeout: int = 30,
+    max_retries: int = 5,
+    rate_limiter: Optional[RateLimiter] = None,
+    session: Optional[requests.Session] = None,
+) -> Optional[int]:
+    """Return paging.total_count for a search using a single limit=1 request."""
+    throttle = observe = None
+    if rate_limiter:
+        def throttle() -> float:
+            return rate_limiter.acquire(account_id, "search")
+
+        def observe(status: int, latency: float) -> bool:
+            return rate_limiter.record(account_id, "search", status, latency)
+
+    _, data = _request_with_retries(
+        session or requests.Session(),
+        f"{base_url.rstrip('/')}{SEARCH_ENDPOINT}",
+        headers={
+            "accept": "application/json",
+            "content-type": "application/json",
+            "Header": token,
+        },
+        params={"account_id": account_id, "limit": 1},
+        payload={"api": "sales_navigator", "category": "people", **search_params},
+        timeout=timeout,
+        max_retries=max_retries,
+        throttle=throttle,
+        observe=observe,
+    )
+    total = (data.get("paging", {}) or {}).get("total_count")
+    return int(total) if total is not None else None
 
-        if max_delay and max_delay > 0:
-            time.sleep(random.uniform(min_delay, max_delay))
 
-    if checkpoint_path:
-        _atomic_write_json(
-            checkpoint_path,
-            {
-                "cursor": None,
-                "page": page,
-                "count": len(results),
-                "items": results,
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-                "finished": True,
-            },
+def iter_sharded_salesnav_people(
+    search_params: Dict[str, Any],
+    *,
+    account_id: str,
+    token: str,
+    base_url: str = DEFAULT_BASE_URL,
+    cap: int = SALESNAV_RESULT_CAP,
+    facets: Iterable[str] = DEFAULT_FACETS,
+    facet_candidates: Optional[Dict[str, Iterable[Any]]] = None,
+    max_workers: int = 3,
+    checkpoint_dir: str = "salesnav_shards",
+    resume: bool = True,
+    max_results: Optional[int] = None,
+    timeout: int = 30,
+    max_retries: int = 5,
+    rate_limiter: Optional[RateLimiter] = None,
+    by_page: bool = False,
+    **kwargs: Any,
+) -> Iterator[Any]:
+    """
+    Stream a broad search past the per-query result cap by splitting it.
+
+    The search is probed (limit=1) and, while a sub-search reports more than
+    `cap` results, it is split into disjoint sub-searches along `facets`
+    (REGION, SENIORITY_LEVEL, COMPANY_HEADCOUNT, INDUSTRY by default; see
+    salesnav_shards.plan_shards). facet_candidates supplies values for facets
+    that cannot be enumerated offline, e.g. {"REGION": [state ids]}.
+
+    Up to max_workers shards are paged in parallel with iter_salesnav_people,
+    each with its own checkpoint under checkpoint_dir; the plan itself is
+    saved there too, so resume skips the probes. All shards draw from the same
+    rate_limiter, so together they stay within the account's search budget.
+    Items are deduplicated across shards and yielded as pages arrive (one list
+    per shard page with by_page=True).
+    Remaining keyword arguments go to iter_salesnav_people.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    plan_path = os.path.join(checkpoint_dir, "plan.json")
+    shards = None
+    if resume and os.path.exists(plan_path):
+        with open(plan_path, "r", encoding="utf-8") as handle:
+            saved = json.load(handle)
+        if saved.get("search_params") == search_params and saved.get("cap") == cap:
+            shards = saved["shards"]
+            logger.info("Resuming sharded search: %s shards from %s", len(shards), plan_path)
+    if shards is None:
+        probe_session = requests.Session()
+
+        def probe(params: Dict[str, Any]) -> Optional[int]:
+            return probe_salesnav_total(
+                params,
+                account_id=account_id,
+                token=token,
+                base_url=base_url,
+                timeout=timeout,
+                max_retries=max_retries,
+                rate_limiter=rate_limiter,
+                session=probe_session,
+            )
+
+        planned = plan_shards(
+            search_params,
+            probe,
+            cap=cap,
+            facets=tuple(facets),
+            candidates=facet_candidates,
+            max_workers=max_workers,
         )
+        shards = [{"key": shard.key, "params": shard.params, "total": shard.total} for shard in planned]
+        with open(plan_path, "w", encoding="utf-8") as handle:
+            json.dump(
+                {"search_params": search_params, "cap": cap, "shards": shards, "updated_at": _utc_now()},
+                handle,
+                ensure_ascii=False,
+                indent=2,
+            )
 
-    return results
+    stop = threading.Event()
+    pages: queue.Queue = queue.Queue(maxsize=max(1, max_workers) * 2)
+
+    def put(message: Tuple[str, Any]) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run_shard(shard: Dict[str, Any]) -> None:
+        if stop.is_set():
+            return
+        people = iter_salesnav_people(
+            shard["params"],
+            account_id=account_id,
+            token=token,
+            base_url=base_url,
+            checkpoint_path=os.path.join(checkpoint_dir, f"shard-{shard['key']}.json"),
+            resume=resume,
+            timeout=timeout,
+            max_retries=max_retries,
+            rate_limiter=rate_limiter,
+            by_page=True,
+            **kwargs,
+        )
+        try:
+            for page_items in people:
+                if not put(("page", page_items)):
+                    return
+        except Exception as exc:
+            put(("error", exc))
+            return
+        finally:
+            people.close()
+        put(("done", shard["key"]))
+
+    seen_ids = HashedKeySet()
+    count = 0
+    finished = 0
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        for shard in shards:
+            pool.submit(run_shard, shard)
+        while finished < len(shards):
+            kind, value = pages.get()
+            if kind == "error":
+                raise value
+            if kind == "done":
+                finished += 1
+                logger.info("Shard %s/%s finished | total=%s", finished, len(shards), count)
+                continue
+            new_items: List[Dict[str, Any]] = []
+            for item in value:
+                key = _item_key(item)
+                if key and key in seen_ids:
+                    continue
+                if key:
+                    seen_ids.add(key)
+                new_items.append(item)
+                if max_results and count + len(new_items) >= max_results:
+                    break
+            count += len(new_items)
+            if new_items:
+                if by_page:
+                    yield new_items
+                else:
+                    yield from new_items
+            if max_results and count >= max_results:
+                logger.info("Reached max_results=%s. Stopping.", max_results)
+                return
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
 
 
 def _env_or_raise(key: str) -> str:
@@ -260,36 +674,313 @@ def _env_or_raise(key: str) -> str:
     return value
 
 
-if __name__ == "__main__":
-    # Adjust base_url by setting UNIPILE_BASE_URL (example: https://api26.unipile.com:15609)
-    # Adjust filters in search_params as needed (keywords, location/industry include IDs, role/company, etc).
-    token = _env_or_raise("UNIPILE_TOKEN")
-    account_id = _env_or_raise("UNIPILE_ACCOUNT_ID")
-    base_url = os.getenv("UNIPILE_BASE_URL", DEFAULT_BASE_URL)
+DEFAULT_SEARCH_PARAMS = {
+    "keywords": "rh - brasil",
+    "location": {"include": ["103658898"]},
+    "industry": {"include": ["48"]},
+}
+SINK_EXTENSIONS = {"json": ".json", "jsonl": ".jsonl.gz", "parquet": ".parquet"}
 
-    search_params = {
-        "keywords": "rh - brasil",
-        "location": {"include": ["103658898"]},
-        "industry": {"include": ["48"]},
-    }
 
-    results = fetch_salesnav_people(
-        search_params,
-        account_id=account_id,
-        token=token,
-        base_url=base_url,
-        limit=100,
-        max_results=None,
-        min_delay=1.0,
-        max_delay=2.0,
-        checkpoint_path="salesnav_checkpoint.json",
-        checkpoint_every=1,
-        resume=True,
+def write_people_to_sink(pages: Iterable[List[Dict[str, Any]]], sink: ResultSink) -> int:
+    """Send each page to the sink as it arrives; return how many items were written."""
+    saved = 0
+    with sink:
+        for page in pages:
+            sink.write_page(page)
+            saved += len(page)
+    return saved
+
+
+def load_batch(path: str) -> List[Dict[str, Any]]:
+    """
+    Read a batch file: a JSON array or one JSON value per line (JSONL).
+
+    Each entry is a Sales Navigator URL string, a search body dict, or a dict
+    with "url" or "params" plus optional "name", "account_id", "max_results"
+    and "campaign_id". Entries are normalized to {"name", "params", ...}.
+    """
+    with open(path, "r", encoding="utf-8") as handle:
+        text = handle.read()
+    stripped = text.strip()
+    if stripped.startswith("["):
+        raw_entries = json.loads(stripped)
+    else:
+        raw_entries = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            raw_entries.append(json.loads(line) if line[0] in "{[\"" else line)
+
+    entries = []
+    for index, raw in enumerate(raw_entries, start=1):
+        entry: Dict[str, Any] = {}
+        if isinstance(raw, str):
+            entry["params"] = salesnav_search_params(parse_salesnav_url(raw))
+        elif isinstance(raw, dict) and ("url" in raw or "params" in raw):
+            entry = {k: v for k, v in raw.items() if k not in ("url", "params")}
+            if raw.get("url"):
+                entry["params"] = salesnav_search_params(parse_salesnav_url(raw["url"]))
+            else:
+                entry["params"] = raw["params"]
+        elif isinstance(raw, dict):
+            entry["params"] = raw
+        else:
+            raise ValueError(f"Batch entry {index} is neither a URL nor a dict: {raw!r}")
+        if not entry["params"]:
+            raise ValueError(f"Batch entry {index} has no usable search filters.")
+        entry["name"] = str(entry.get("name") or f"search-{index:03d}")
+        entries.append(entry)
+    names = [entry["name"] for entry in entries]
+    if len(set(names)) != len(names):
+        raise ValueError("Batch entry names must be unique (they name checkpoints and outputs).")
+    return entries
+
+
+def run_batch(
+    entries: List[Dict[str, Any]],
+    *,
+    accounts: List[str],
+    token: str,
+    open_entry_sink: Callable[[Dict[str, Any]], ResultSink],
+    work_dir: str = "salesnav_batch",
+    max_workers: int = 4,
+    account_concurrency: int = 2,
+    sharded: bool = False,
+    shard_workers: int = 2,
+    rate_limiter: Optional[RateLimiter] = None,
+    **kwargs: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Run several searches in parallel across one or more accounts.
+
+    Entries without an "account_id" are spread round-robin over `accounts`.
+    At most account_concurrency searches page the same account at once, and
+    all of them draw from that account's bucket in the shared rate_limiter
+    (the same SQLite budget the app and workers use). Each search gets its
+    own checkpoint under work_dir and its own sink from open_entry_sink(entry),
+    so an interrupted batch resumes search by search. A failing search is
+    logged and reported without stopping the others.
+
+    Returns one summary dict per entry (name, account_id, saved, error).
+    """
+    if not accounts:
+        raise ValueError("run_batch needs at least one account_id.")
+    os.makedirs(work_dir, exist_ok=True)
+    slots = {account: threading.Semaphore(max(1, account_concurrency)) for account in accounts}
+    jobs = []
+    for index, entry in enumerate(entries):
+        account_id = entry.get("account_id") or accounts[index % len(accounts)]
+        slots.setdefault(account_id, threading.Semaphore(max(1, account_concurrency)))
+        jobs.append((entry, account_id))
+
+    def run_one(entry: Dict[str, Any], account_id: str) -> Dict[str, Any]:
+        name = entry["name"]
+        summary = {"name": name, "account_id": account_id, "saved": 0, "error": None}
+        with slots[account_id]:
+            logger.info("[%s] Starting on account %s", name, account_id)
+            options = dict(kwargs)
+            if entry.get("max_results") is not None:
+                options["max_results"] = entry["max_results"]
+            try:
+                # Opened first: a bad sink spec fails this search before any page is fetched.
+                sink = open_entry_sink(entry)
+                if sharded:
+                    pages = iter_sharded_salesnav_people(
+                        entry["params"],
+                        account_id=account_id,
+                        token=token,
+                        checkpoint_dir=os.path.join(work_dir, f"{name}.shards"),
+                        max_workers=shard_workers,
+                        rate_limiter=rate_limiter,
+                        by_page=True,
+                        **options,
+                    )
+                else:
+                    pages = iter_salesnav_people(
+                        entry["params"],
+                        account_id=account_id,
+                        token=token,
+                        checkpoint_path=os.path.join(work_dir, f"{name}.checkpoint.json"),
+                        rate_limiter=rate_limiter,
+                        by_page=True,
+                        **options,
+                    )
+                summary["saved"] = write_people_to_sink(pages, sink)
+            except Exception as exc:
+                logger.exception("[%s] Search failed", name)
+                summary["error"] = str(exc)
+            else:
+                logger.info("[%s] Finished: %s results", name, summary["saved"])
+        return summary
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [pool.submit(run_one, entry, account_id) for entry, account_id in jobs]
+        return [future.result() for future in futures]
+
+
+def _search_params_from_args(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.url:
+        return salesnav_search_params(parse_salesnav_url(args.url))
+    if args.params:
+        if os.path.exists(args.params):
+            with open(args.params, "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        return json.loads(args.params)
+    if args.keywords:
+        return {"keywords": args.keywords}
+    return dict(DEFAULT_SEARCH_PARAMS)
+
+
+def _open_sink_from_args(
+    args: argparse.Namespace,
+    output: Optional[str] = None,
+    campaign_id: Optional[str] = None,
+) -> ResultSink:
+    """Open the sink chosen on the command line; a bad sink spec raises ValueError."""
+    if args.sink != "supabase":
+        return open_sink(args.sink, output or args.output)
+    campaign_id = campaign_id or args.campaign_id
+    if not campaign_id:
+        raise ValueError("--campaign-id is required with --sink supabase.")
+    if not args.supabase_url or not args.supabase_key:
+        raise ValueError("Missing SUPABASE_URL or SUPABASE_SERVICE_KEY/SUPABASE_KEY.")
+    if not args.user_id:
+        raise ValueError("--user-id is required with --sink supabase (the service key has no logged-in user).")
+    # Imported lazily: the file sinks must not require supabase/streamlit.
+    from db_handler import DBHandler
+
+    db = DBHandler(args.supabase_url, args.supabase_key)
+    return open_sink(
+        "supabase",
+        db=db,
+        campaign_id=campaign_id,
+        user_id=args.user_id,
+        chunk_size=args.chunk_size,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Page through a Sales Navigator search and stream the results to a sink.")
+    search = parser.add_mutually_exclusive_group()
+    search.add_argument("--url", help="Sales Navigator search URL.")
+    search.add_argument("--params", help="Search body as JSON, or a path to a JSON file.")
+    search.add_argument("--keywords")
+    search.add_argument("--batch", help="File with many searches (URLs or filter dicts, JSON array or JSONL).")
+    parser.add_argument("--base-url", default=os.getenv("UNIPILE_BASE_URL", DEFAULT_BASE_URL))
+    parser.add_argument(
+        "--accounts",
+        default=os.getenv("UNIPILE_ACCOUNT_IDS") or os.getenv("UNIPILE_ACCOUNT_ID"),
+        help="Comma-separated account ids (batch mode spreads searches over them).",
+    )
+    parser.add_argument("--sink", choices=("json", "jsonl", "parquet", "supabase"), default="json")
+    parser.add_argument("--output", help="Output path for file sinks (.jsonl.gz is gzip-compressed).")
+    parser.add_argument("--output-dir", default="salesnav_batch", help="Checkpoints and outputs of a batch.")
+    parser.add_argument("--campaign-id", help="Target campaign for --sink supabase.")
+    parser.add_argument("--user-id", help="Owner user_id written on each lead for --sink supabase.")
+    parser.add_argument("--supabase-url", default=os.getenv("SUPABASE_URL"))
+    parser.add_argument(
+        "--supabase-key",
+        default=os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_KEY"),
+    )
+    parser.add_argument("--chunk-size", type=int, default=500, help="Rows per upsert for --sink supabase.")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--max-results", type=int, default=None)
+    parser.add_argument("--min-delay", type=float, default=1.0)
+    parser.add_argument("--max-delay", type=float, default=2.0)
+    parser.add_argument("--checkpoint", default="salesnav_checkpoint.json")
+    parser.add_argument("--no-resume", dest="resume", action="store_false")
+    parser.add_argument("--sharded", action="store_true", help="Split the search to get past the result cap.")
+    parser.add_argument("--shard-dir", default="salesnav_shards")
+    parser.add_argument("--shard-workers", type=int, default=3)
+    parser.add_argument("--batch-workers", type=int, default=4, help="Searches running at once in batch mode.")
+    parser.add_argument("--account-concurrency", type=int, default=2, help="Searches per account at once.")
+    args = parser.parse_args()
+
+    token = _env_or_raise("UNIPILE_TOKEN")
+    accounts = [a.strip() for a in (args.accounts or "").split(",") if a.strip()]
+    if not accounts:
+        raise RuntimeError("Missing required env var: UNIPILE_ACCOUNT_ID (or --accounts)")
+    rate_limiter = RateLimiter.from_env()
+    common = dict(
+        base_url=args.base_url,
+        limit=args.limit,
+        max_results=args.max_results,
+        min_delay=args.min_delay,
+        max_delay=args.max_delay,
+        resume=args.resume,
         timeout=30,
         max_retries=5,
     )
 
-    output_path = "salesnav_results.json"
-    with open(output_path, "w", encoding="utf-8") as handle:
-        json.dump(results, handle, ensure_ascii=False, indent=2)
-    logger.info("Saved %s results to %s", len(results), output_path)
+    if args.batch:
+        entries = load_batch(args.batch)
+        extension = SINK_EXTENSIONS.get(args.sink, "")
+
+        def open_entry_sink(entry: Dict[str, Any]) -> ResultSink:
+            output = entry.get("output") or os.path.join(args.output_dir, f"{entry['name']}{extension}")
+            return _open_sink_from_args(args, output=output, campaign_id=entry.get("campaign_id"))
+
+        summary = run_batch(
+            entries,
+            accounts=accounts,
+            token=token,
+            open_entry_sink=open_entry_sink,
+            work_dir=args.output_dir,
+            max_workers=args.batch_workers,
+            account_concurrency=args.account_concurrency,
+            sharded=args.sharded,
+            shard_workers=args.shard_workers,
+            rate_limiter=rate_limiter,
+            **common,
+        )
+        summary_path = os.path.join(args.output_dir, "batch_summary.json")
+        with open(summary_path, "w", encoding="utf-8") as handle:
+            json.dump(summary, handle, ensure_ascii=False, indent=2)
+        failed = [item["name"] for item in summary if item["error"]]
+        logger.info(
+            "Batch finished: %s searches, %s results, %s failed. Summary in %s",
+            len(summary),
+            sum(item["saved"] for item in summary),
+            len(failed),
+            summary_path,
+        )
+        if failed:
+            raise SystemExit(f"Failed searches: {', '.join(failed)}")
+        return
+
+    search_params = _search_params_from_args(args)
+    if args.sharded:
+        pages = iter_sharded_salesnav_people(
+            search_params,
+            account_id=accounts[0],
+            token=token,
+            checkpoint_dir=args.shard_dir,
+            max_workers=args.shard_workers,
+            rate_limiter=rate_limiter,
+            by_page=True,
+            **common,
+        )
+    else:
+        pages = iter_salesnav_people(
+            search_params,
+            account_id=accounts[0],
+            token=token,
+            checkpoint_path=args.checkpoint,
+            checkpoint_every=1,
+            rate_limiter=rate_limiter,
+            by_page=True,
+            **common,
+        )
+    try:
+        sink = _open_sink_from_args(args)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    # Each page goes to the sink as soon as it is checkpointed; nothing is held until the end.
+    saved = write_people_to_sink(pages, sink)
+    logger.info("Saved %s results to the %s sink", saved, args.sink)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,32 +4,36 @@ import random
 import uuid
 from pathlib import Path
 from datetime import datetime, timedelta
-from urllib.parse import urlparse, parse_qs, unquote_plus
+from urllib.parse import urlparse, parse_qs
 import streamlit as st
 import pandas as pd
 import time
 from unipile_client import UnipileClient
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from company_enrichment import collect_company_ids, enrich_leads_with_companies, lead_company_fields
+from cursor_prefetch import CursorPrefetcher, page_cursor
+from dedup_index import HashedKeySet
+from salesnav_url import (
+    NETWORK_OPTIONS,
+    SENIORITY_OPTIONS,
+    build_salesnav_field_values,
+    parse_salesnav_url,
+)
 from db_handler import DBHandler
 from message_utils import build_message_context, render_message
+from send_counters import ACTION_INVITE, ACTION_MESSAGE
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(page_title="LinkedIn List Builder Pro", layout="wide", page_icon="🎯")
 
 SQL_SCHEMA_PATH = Path(__file__).resolve().parent.parent / "supabase_schema.sql"
 
-SENIORITY_OPTIONS = [
-    "owner/partner",
-    "cxo",
-    "vice_president",
-    "director",
-    "experienced_manager",
-    "entry_level_manager",
-    "strategic",
-    "senior",
-    "entry_level",
-    "in_training",
-]
-NETWORK_OPTIONS = [1, 2, 3, "GROUP"]
+# Páginas de busca pedidas à frente enquanto a atual é filtrada/deduplicada.
+SEARCH_PREFETCH_DEPTH = 1
+# Enriquecimento gravado em lote: flush a cada N leads ou T segundos.
+ENRICH_FLUSH_ROWS = 200
+ENRICH_FLUSH_SECONDS = 5.0
 
 # --- FUNÇÕES AUXILIARES ---
 def load_schema_sql() -> str:
@@ -42,7 +46,7 @@ def init_session_state():
     if 'search_results' not in st.session_state: st.session_state['search_results'] = []
     if 'next_cursor' not in st.session_state: st.session_state['next_cursor'] = None
     if 'search_params' not in st.session_state: st.session_state['search_params'] = {}
-    if 'seen_lead_keys' not in st.session_state: st.session_state['seen_lead_keys'] = set()
+    if 'seen_lead_keys' not in st.session_state: st.session_state['seen_lead_keys'] = HashedKeySet()
     if 'last_cursor' not in st.session_state: st.session_state['last_cursor'] = None
     if 'total_count' not in st.session_state: st.session_state['total_count'] = None
     if 'url_base' not in st.session_state: st.session_state['url_base'] = None
@@ -57,7 +61,7 @@ def init_session_state():
 def reset_search():
     st.session_state['search_results'] = []
     st.session_state['next_cursor'] = None
-    st.session_state['seen_lead_keys'] = set()
+    st.session_state['seen_lead_keys'] = HashedKeySet()
     st.session_state['last_cursor'] = None
     st.session_state['total_count'] = None
     st.session_state['url_base'] = None
@@ -131,7 +135,7 @@ def build_checkpoint_payload() -> dict:
         "url_page": st.session_state.get("url_page"),
         "last_search_debug": st.session_state.get("last_search_debug"),
         "results": st.session_state.get("search_results") or [],
-        "seen_lead_keys": list(st.session_state.get("seen_lead_keys") or []),
+        "seen_lead_keys": (st.session_state.get("seen_lead_keys") or HashedKeySet()).to_state(),
     }
 
 def apply_checkpoint_payload(payload: dict) -> None:
@@ -142,7 +146,8 @@ def apply_checkpoint_payload(payload: dict) -> None:
     seen_keys = payload.get("seen_lead_keys") or []
     if not seen_keys and st.session_state['search_results']:
         seen_keys = [lead_key(item) for item in st.session_state['search_results'] if lead_key(item)]
-    st.session_state['seen_lead_keys'] = set(seen_keys)
+    # Aceita o formato compacto e a lista de chaves dos checkpoints antigos.
+    st.session_state['seen_lead_keys'] = HashedKeySet.from_state(seen_keys)
     cursor = payload.get("next_cursor") or payload.get("cursor")
     st.session_state['next_cursor'] = cursor
     st.session_state['last_cursor'] = payload.get("last_cursor") or cursor
@@ -196,7 +201,7 @@ def lead_key(item: dict) -> str | None:
         return f"fallback:{fallback}"
     return None
 
-def dedupe_results(items: list, seen_keys: set) -> tuple[list, set]:
+def dedupe_results(items: list, seen_keys: HashedKeySet) -> tuple[list, HashedKeySet]:
     unique = []
     for item in items:
         if not isinstance(item, dict):
@@ -303,268 +308,6 @@ def criteria_from_search_url(search_url: str) -> dict:
         criteria["keywords"] = keywords
     return criteria
 
-def decode_salesnav_value(value: str) -> str:
-    if not value:
-        return ""
-    decoded = unquote_plus(value)
-    if "%" in decoded:
-        decoded = unquote_plus(decoded)
-    return decoded
-
-def strip_wrapping_parens(value: str) -> str:
-    if not value:
-        return ""
-    value = value.strip()
-    if len(value) >= 2 and value[0] == "(" and value[-1] == ")":
-        return value[1:-1]
-    return value
-
-def split_top_level(text: str, delimiter: str = ",") -> list[str]:
-    if not text:
-        return []
-    parts = []
-    depth = 0
-    current = []
-    for ch in text:
-        if ch == "(":
-            depth += 1
-        elif ch == ")":
-            if depth > 0:
-                depth -= 1
-        if ch == delimiter and depth == 0:
-            part = "".join(current).strip()
-            if part:
-                parts.append(part)
-            current = []
-        else:
-            current.append(ch)
-    part = "".join(current).strip()
-    if part:
-        parts.append(part)
-    return parts
-
-def parse_top_level_pairs(text: str) -> dict[str, str]:
-    pairs: dict[str, str] = {}
-    for part in split_top_level(text):
-        if ":" not in part:
-            continue
-        key, value = part.split(":", 1)
-        pairs[key.strip()] = value.strip()
-    return pairs
-
-def extract_list_block(text: str, marker: str) -> str | None:
-    idx = text.find(marker)
-    if idx == -1:
-        return None
-    start = idx + len(marker)
-    if start >= len(text):
-        return None
-    depth = 1
-    for i in range(start, len(text)):
-        ch = text[i]
-        if ch == "(":
-            depth += 1
-        elif ch == ")":
-            depth -= 1
-            if depth == 0:
-                return text[start:i]
-    return None
-
-def parse_salesnav_filters(filters_text: str) -> dict[str, dict[str, list[str]]]:
-    if not filters_text:
-        return {}
-    list_block = extract_list_block(filters_text, "List(")
-    if list_block is None:
-        return {}
-    items = split_top_level(list_block)
-    filters: dict[str, dict[str, list[str]]] = {}
-    for item in items:
-        item = strip_wrapping_parens(item)
-        if not item:
-            continue
-        pairs = parse_top_level_pairs(item)
-        filter_type = pairs.get("type")
-        values_text = pairs.get("values")
-        if not filter_type or not values_text:
-            continue
-        values_block = extract_list_block(values_text, "List(")
-        if values_block is None:
-            continue
-        value_items = split_top_level(values_block)
-        for value_item in value_items:
-            value_item = strip_wrapping_parens(value_item)
-            if not value_item:
-                continue
-            value_pairs = parse_top_level_pairs(value_item)
-            raw_value = value_pairs.get("id") or value_pairs.get("text")
-            if not raw_value:
-                continue
-            selection = (value_pairs.get("selectionType") or value_pairs.get("selection") or "INCLUDED").upper()
-            bucket = "exclude" if selection == "EXCLUDED" else "include"
-            decoded_value = decode_salesnav_value(raw_value)
-            if not decoded_value:
-                continue
-            entry = filters.setdefault(filter_type, {"include": [], "exclude": []})
-            if decoded_value not in entry[bucket]:
-                entry[bucket].append(decoded_value)
-    return filters
-
-def parse_salesnav_url(search_url: str) -> dict:
-    extracted = {
-        "keywords": "",
-        "saved_search_id": "",
-        "recent_search_id": "",
-        "filters": {},
-    }
-    if not search_url:
-        return extracted
-    try:
-        parsed = urlparse(search_url)
-    except Exception:
-        parsed = None
-    params = parse_qs(parsed.query) if parsed else {}
-    query_value = params.get("query", [""])[0] if params else ""
-    query_text = ""
-    if query_value:
-        query_text = unquote_plus(query_value)
-    elif search_url.strip().startswith("("):
-        query_text = search_url.strip()
-    else:
-        match = re.search(r"query=([^&]+)", search_url)
-        if match:
-            query_text = unquote_plus(match.group(1))
-    if not query_text:
-        return extracted
-    query_text = strip_wrapping_parens(query_text)
-    pairs = parse_top_level_pairs(query_text)
-    keywords_value = (
-        pairs.get("keywords")
-        or pairs.get("keyword")
-        or (params.get("keywords", [""])[0] if params else "")
-    )
-    if keywords_value:
-        extracted["keywords"] = decode_salesnav_value(keywords_value)
-    saved_search_value = (
-        pairs.get("savedSearchId")
-        or pairs.get("saved_search_id")
-        or (params.get("savedSearchId", [""])[0] if params else "")
-        or (params.get("saved_search_id", [""])[0] if params else "")
-    )
-    if saved_search_value:
-        extracted["saved_search_id"] = decode_salesnav_value(saved_search_value)
-    recent_search_value = (
-        pairs.get("recentSearchId")
-        or pairs.get("recent_search_id")
-        or (params.get("recentSearchId", [""])[0] if params else "")
-        or (params.get("recent_search_id", [""])[0] if params else "")
-    )
-    if recent_search_value:
-        extracted["recent_search_id"] = decode_salesnav_value(recent_search_value)
-    filters_value = pairs.get("filters")
-    if filters_value:
-        extracted["filters"] = parse_salesnav_filters(filters_value)
-    return extracted
-
-def dedupe_values(values: list[str]) -> list[str]:
-    seen = set()
-    ordered = []
-    for value in values:
-        if value in seen:
-            continue
-        seen.add(value)
-        ordered.append(value)
-    return ordered
-
-def map_seniority_values(values: list[str]) -> list[str]:
-    lookup = {re.sub(r"[^a-z0-9/]+", "_", opt.lower()).strip("_"): opt for opt in SENIORITY_OPTIONS}
-    lookup.update(
-        {
-            "owner": "owner/partner",
-            "partner": "owner/partner",
-            "owner_partner": "owner/partner",
-            "vp": "vice_president",
-            "vicepresident": "vice_president",
-            "vice_president": "vice_president",
-            "cxo": "cxo",
-            "c_level": "cxo",
-            "clevel": "cxo",
-            "entry_level": "entry_level",
-            "entrylevel": "entry_level",
-            "in_training": "in_training",
-            "training": "in_training",
-        }
-    )
-    mapped = []
-    for raw in values:
-        if not raw:
-            continue
-        norm = re.sub(r"[^a-z0-9/]+", "_", raw.lower()).strip("_")
-        option = lookup.get(norm)
-        if option and option not in mapped:
-            mapped.append(option)
-    return mapped
-
-def map_network_values(values: list[str]) -> list:
-    mapped = []
-    for raw in values:
-        if raw is None:
-            continue
-        text = str(raw).strip()
-        if not text:
-            continue
-        upper = text.upper()
-        if upper.endswith("+") and upper[:-1].isdigit():
-            upper = upper[:-1]
-        if upper.isdigit():
-            num = int(upper)
-            if num in (1, 2, 3) and num not in mapped:
-                mapped.append(num)
-            continue
-        if "GROUP" in upper or upper == "G":
-            if "GROUP" not in mapped:
-                mapped.append("GROUP")
-            continue
-        if "FIRST" in upper or upper in {"1ST", "1ST_DEGREE"}:
-            if 1 not in mapped:
-                mapped.append(1)
-        elif "SECOND" in upper or upper in {"2ND", "2ND_DEGREE"}:
-            if 2 not in mapped:
-                mapped.append(2)
-        elif "THIRD" in upper or upper in {"3RD", "3RD_DEGREE"}:
-            if 3 not in mapped:
-                mapped.append(3)
-    return mapped
-
-def build_salesnav_field_values(extracted: dict) -> dict:
-    filters = extracted.get("filters", {}) if isinstance(extracted, dict) else {}
-    def collect(filter_types: list[str]) -> list[str]:
-        values = []
-        for f_type in filter_types:
-            info = filters.get(f_type, {})
-            values.extend(info.get("include", []))
-        return dedupe_values(values)
-
-    region_ids = collect(["GEOGRAPHY", "REGION", "LOCATION"])
-    industry_ids = collect(["INDUSTRY", "SALES_INDUSTRY"])
-    company_vals = collect(["CURRENT_COMPANY", "COMPANY"])
-    role_vals = collect(["TITLE", "JOB_TITLE", "CURRENT_TITLE", "ROLE"])
-    function_ids = collect(["FUNCTION", "DEPARTMENT"])
-    seniority_vals = collect(["SENIORITY_LEVEL", "SENIORITY"])
-    network_vals = collect(["NETWORK_DISTANCE", "NETWORK"])
-
-    return {
-        "keywords": extracted.get("keywords") or "",
-        "region_ids": ", ".join(region_ids),
-        "industry_ids": ", ".join(industry_ids),
-        "company_vals": ", ".join(company_vals),
-        "role_vals": ", ".join(role_vals),
-        "function_ids": ", ".join(function_ids),
-        "seniority": map_seniority_values(seniority_vals),
-        "network": map_network_values(network_vals),
-        "saved_search_id": extracted.get("saved_search_id") or "",
-        "recent_search_id": extracted.get("recent_search_id") or "",
-    }
-
 def apply_salesnav_fields(fields: dict) -> int:
     if not fields:
         return 0
@@ -673,6 +416,17 @@ def summarize_invite_schedule(schedule: list[dict]) -> pd.DataFrame:
     summary = [{"date": day, "count": count} for day, count in sorted(counts.items())]
     return pd.DataFrame(summary)
 
+def apply_send_budget(db: DBHandler, items: list, account_id: str, action: str) -> list:
+    """Corta `items` ao que ainda cabe nos limites diário/semanal da conta (account_send_counters)."""
+    budget = db.send_budget(account_id, action)
+    if budget is None or budget >= len(items):
+        return items
+    label = "convites" if action == ACTION_INVITE else "mensagens"
+    st.warning(
+        f"Limite da conta: restam {budget} {label} hoje; {len(items) - budget} ficam para depois."
+    )
+    return items[:budget]
+
 def summarize_invite_rows(rows: list[dict], status: str | None = None) -> pd.DataFrame:
     if not rows:
         return pd.DataFrame(columns=["date", "count"])
@@ -688,6 +442,15 @@ def summarize_invite_rows(rows: list[dict], status: str | None = None) -> pd.Dat
     summary = [{"date": day, "count": count} for day, count in sorted(counts.items())]
     return pd.DataFrame(summary)
 
+def schedule_days_frame(day_rows: list[dict], status: str) -> pd.DataFrame:
+    """Linhas da view invite_schedule_days -> DataFrame date/count (dias com algum `status`)."""
+    summary = [
+        {"date": str(row.get("scheduled_date")), "count": row.get(status) or 0}
+        for row in day_rows or []
+        if row.get(status)
+    ]
+    return pd.DataFrame(summary, columns=["date", "count"])
+
 def strip_page_param(search_url: str) -> str:
     if not search_url:
         return search_url
@@ -831,20 +594,30 @@ def extract_profile_fields(profile_data: dict) -> dict:
         "socials": join_socials(socials),
     }
 
-def build_enrichment_payload(unipile: UnipileClient, account_id: str, lead: dict) -> dict:
-    identifier = lead.get("public_identifier") or lead.get("provider_id") or lead.get("id")
-    if not identifier:
-        return {}
-    try:
-        profile = unipile.get_profile_details(
-            account_id,
-            identifier,
-            sections=["*_preview", "experience", "about"],
-        )
-    except Exception:
-        profile = None
-    fields = extract_profile_fields(profile or {})
-    return fields
+ENRICHMENT_SECTIONS = ["*_preview", "experience", "about"]
+
+def iter_enrichment_payloads(unipile: UnipileClient, account_id: str, leads: list[dict], use_cache: bool = True):
+    """Enriquece leads em paralelo (get_profiles_bulk) e gera (lead, fields) conforme terminam.
+
+    Leads sem identificador saem primeiro com fields vazio; leads com o mesmo
+    identificador compartilham uma única busca.
+    """
+    by_identifier: dict[str, list[dict]] = {}
+    for lead in leads:
+        identifier = lead.get("public_identifier") or lead.get("provider_id") or lead.get("id")
+        if not identifier:
+            yield lead, {}
+            continue
+        by_identifier.setdefault(str(identifier), []).append(lead)
+    for identifier, profile in unipile.get_profiles_bulk(
+        account_id,
+        list(by_identifier),
+        sections=ENRICHMENT_SECTIONS,
+        use_cache=use_cache,
+    ):
+        fields = extract_profile_fields(profile) if isinstance(profile, dict) else {}
+        for lead in by_identifier[identifier]:
+            yield lead, fields
 
 # --- SIDEBAR (CONFIG & LOGIN) ---
 with st.sidebar:
@@ -944,7 +717,37 @@ if not st.session_state.get('db_connected') or 'current_account' not in st.sessi
     st.warning("👈 Configure o sistema na barra lateral.")
     st.stop()
 
-unipile = UnipileClient("https://api26.unipile.com:15609", st.session_state['current_account']['api_key'])
+@st.cache_resource
+def get_rate_limiter() -> RateLimiter | None:
+    # Um limiter por processo; o estado fica no SQLite compartilhado com cron/worker.
+    return RateLimiter.from_env()
+
+@st.cache_resource
+def get_profile_cache() -> ResponseCache | None:
+    return ResponseCache.from_env("profile")
+
+@st.cache_resource
+def get_company_cache() -> ResponseCache | None:
+    return ResponseCache.from_env("company")
+
+def get_unipile_client(api_key: str) -> UnipileClient:
+    # Mantém o cliente (e o pool de conexões) entre reruns do Streamlit.
+    cached = st.session_state.get('unipile_client')
+    if cached is not None and cached.api_key == api_key:
+        return cached
+    if cached is not None:
+        cached.close()
+    client = UnipileClient(
+        "https://api26.unipile.com:15609",
+        api_key,
+        rate_limiter=get_rate_limiter(),
+        profile_cache=get_profile_cache(),
+        company_cache=get_company_cache(),
+    )
+    st.session_state['unipile_client'] = client
+    return client
+
+unipile = get_unipile_client(st.session_state['current_account']['api_key'])
 acc_id = st.session_state['current_account']['account_id']
 init_session_state()
 
@@ -1277,91 +1080,121 @@ with tab1:
                     seen_cursors = set()
                     if st.session_state['last_cursor']:
                         seen_cursors.add(st.session_state['last_cursor'])
+                    criteria = p.get("criteria", {})
+
+                    results = st.session_state['search_results']
+                    # Itens brutos já buscados nesta rodada (teto para os válidos): a thread
+                    # de prefetch não pede página além do alvo.
+                    window = {"base": len(results), "fetched": 0}
 
-                    while True:
-                        if target is not None and len(st.session_state['search_results']) >= target:
-                            break
-                        if not st.session_state['next_cursor']:
-                            break
-                        criteria = p.get("criteria", {})
+                    def fetch_page(cursor: str | None) -> dict:
+                        # Roda na thread de prefetch: nada de st.* aqui, só a chamada à API.
                         try:
-                            log_request(
-                                "search_people",
-                                {
-                                    "endpoint": "/api/v1/linkedin/search",
-                                    "params": {
-                                        "account_id": acc_id,
-                                        "limit": page_limit,
-                                        "cursor": st.session_state['next_cursor'],
-                                    },
-                                    "body": {
-                                        "api": p.get("api_type", "sales_navigator"),
-                                        "category": "people",
-                                        **criteria,
-                                    },
-                                },
-                            )
                             res = unipile.search_people(
                                 acc_id,
                                 criteria,
                                 limit=page_limit,
-                                cursor=st.session_state['next_cursor'],
+                                cursor=cursor,
                                 api_type=p.get("api_type", "classic"),
                             )
-                            log_response("search_people", res, unipile.last_status)
+                            window["fetched"] += len((res or {}).get("items") or [])
+                            return {"res": res, "status": unipile.last_status, "error": None}
                         except Exception as e:
-                            log_error("bulk_cursor", e)
-                            st.error(f"Erro ao buscar pagina: {e}")
-                            break
-
-                        if not res or 'items' not in res:
-                            break
-                        paging = res.get('paging', {})
-                        st.session_state['last_search_debug'] = {
-                            "paging": paging,
-                            "items_count": len(res.get("items", []) or []),
-                            "config": res.get("config"),
-                        }
-                        config_url = (res.get("config") or {}).get("url")
-                        if config_url:
-                            st.session_state['url_base'] = strip_page_param(config_url)
-                            st.session_state['url_page'] = get_page_param(config_url)
-                        paging_total = paging.get('total_count')
-                        if paging_total is not None:
-                            st.session_state['total_count'] = paging_total
-                            if use_fetch_all:
-                                target = paging_total
-                        criteria = p.get("criteria", {})
-                        valid = clean_results(res['items'], criteria)
-                        valid, st.session_state['seen_lead_keys'] = dedupe_results(
-                            valid,
-                            st.session_state['seen_lead_keys'],
-                        )
-                        if valid:
-                            st.session_state['search_results'].extend(valid)
-                        else:
-                            status.text("Sem novos resultados nesta pagina. Continuando...")
+                            return {"res": None, "status": unipile.last_status, "error": e}
+
+                    def below_target() -> bool:
+                        return target is None or window["base"] + window["fetched"] < target
+
+                    stopped = False
+                    while (
+                        not stopped
+                        and st.session_state['next_cursor']
+                        and (target is None or len(results) < target)
+                    ):
+                        # Filtro/dedupe deixou abaixo do alvo: nova rodada a partir do último cursor.
+                        window.update(base=len(results), fetched=0)
+                        with CursorPrefetcher(
+                            fetch_page,
+                            start_cursor=st.session_state['next_cursor'],
+                            depth=SEARCH_PREFETCH_DEPTH,
+                            min_delay=delay,
+                            max_delay=delay,
+                            next_cursor=lambda page: page_cursor(page["res"]),
+                            should_continue=below_target,
+                        ) as pages:
+                            for page_cursor_used, fetched in pages:
+                                log_request(
+                                    "search_people",
+                                    {
+                                        "endpoint": "/api/v1/linkedin/search",
+                                        "params": {
+                                            "account_id": acc_id,
+                                            "limit": page_limit,
+                                            "cursor": page_cursor_used,
+                                        },
+                                        "body": {
+                                            "api": p.get("api_type", "sales_navigator"),
+                                            "category": "people",
+                                            **criteria,
+                                        },
+                                    },
+                                )
+                                if fetched["error"] is not None:
+                                    log_error("bulk_cursor", fetched["error"])
+                                    st.error(f"Erro ao buscar pagina: {fetched['error']}")
+                                    stopped = True
+                                    break
+                                res = fetched["res"]
+                                log_response("search_people", res, fetched["status"])
+
+                                if not res or 'items' not in res:
+                                    stopped = True
+                                    break
+                                paging = res.get('paging', {})
+                                st.session_state['last_search_debug'] = {
+                                    "paging": paging,
+                                    "items_count": len(res.get("items", []) or []),
+                                    "config": res.get("config"),
+                                }
+                                config_url = (res.get("config") or {}).get("url")
+                                if config_url:
+                                    st.session_state['url_base'] = strip_page_param(config_url)
+                                    st.session_state['url_page'] = get_page_param(config_url)
+                                paging_total = paging.get('total_count')
+                                if paging_total is not None:
+                                    st.session_state['total_count'] = paging_total
+                                    if use_fetch_all:
+                                        target = paging_total
+                                valid = clean_results(res['items'], criteria)
+                                valid, st.session_state['seen_lead_keys'] = dedupe_results(
+                                    valid,
+                                    st.session_state['seen_lead_keys'],
+                                )
+                                if valid:
+                                    st.session_state['search_results'].extend(valid)
+                                else:
+                                    status.text("Sem novos resultados nesta pagina. Continuando...")
+
+                                new_cursor = res.get('cursor') or paging.get('cursor')
+                                if not new_cursor:
+                                    st.session_state['next_cursor'] = None
+                                    break
+                                if new_cursor in seen_cursors:
+                                    st.warning("Cursor repetido: encerrando paginação.")
+                                    st.session_state['next_cursor'] = None
+                                    break
+                                st.session_state['next_cursor'] = new_cursor
+                                st.session_state['last_cursor'] = new_cursor
+                                seen_cursors.add(new_cursor)
 
-                        new_cursor = res.get('cursor') or paging.get('cursor')
-                        if not new_cursor:
-                            st.session_state['next_cursor'] = None
-                            break
-                        if new_cursor in seen_cursors:
-                            st.warning("Cursor repetido: encerrando paginação.")
-                            st.session_state['next_cursor'] = None
-                            break
-                        st.session_state['next_cursor'] = new_cursor
-                        st.session_state['last_cursor'] = new_cursor
-                        seen_cursors.add(new_cursor)
-
-                        progress_total = target or st.session_state.get('total_count')
-                        if progress_total:
-                            status.text(f"{len(st.session_state['search_results'])}/{progress_total} leads")
-                            bar.progress(min(1.0, len(st.session_state['search_results']) / max(progress_total, 1)))
-                        else:
-                            status.text(f"{len(st.session_state['search_results'])} leads coletados")
-                        if delay:
-                            time.sleep(delay)
+                                progress_total = target or st.session_state.get('total_count')
+                                if progress_total:
+                                    status.text(f"{len(st.session_state['search_results'])}/{progress_total} leads")
+                                    bar.progress(min(1.0, len(st.session_state['search_results']) / max(progress_total, 1)))
+                                else:
+                                    status.text(f"{len(st.session_state['search_results'])} leads coletados")
+                                if target is not None and len(st.session_state['search_results']) >= target:
+                                    break
                     st.success(f"Concluído: {len(st.session_state['search_results'])} leads.")
                     st.rerun()
 
@@ -1491,9 +1324,14 @@ with tab1:
                     else:
                         bar = st.progress(0)
                         st_text = st.empty()
-                        for i, lead in enumerate(sel_objs):
-                            st_text.text(f"Enriquecendo {lead.get('name')}...")
-                            fields = build_enrichment_payload(unipile, acc_id, lead)
+                        enriched = iter_enrichment_payloads(
+                            unipile,
+                            acc_id,
+                            sel_objs,
+                            use_cache=not st.session_state.get("enrich_inline_no_cache"),
+                        )
+                        for i, (lead, fields) in enumerate(enriched):
+                            st_text.text(f"Enriquecido {lead.get('name')}")
                             if fields:
                                 lead.update(fields)
                             bar.progress((i + 1) / len(sel_objs))
@@ -1501,6 +1339,7 @@ with tab1:
                         st.rerun()
             with c_enrich_info:
                 st.caption("Preenche Bio, Cargo, Empresas, Empresa ID, Localização e contato (emails/phones/adresses/socials) antes de salvar.")
+                st.checkbox("Ignorar cache de perfis", value=False, key="enrich_inline_no_cache")
 
         st.divider()
         with st.container():
@@ -1521,15 +1360,30 @@ with tab1:
                         c_resp = db.create_campaign(cp_name, msg_t, st.session_state['current_account']['id'])
                         if c_resp.data:
                             cid = c_resp.data[0]['id']
-                            final = []
-                            for i, l in enumerate(sel_objs):
-                                pl = l.copy()
-                                st_text.text(f"Salvando {l.get('name')}...")
-                                final.append(pl)
-                                bar.progress((i+1)/len(sel_objs))
-                            
-                            db.save_leads(cid, final)
-                            st.success("Salvo com sucesso!")
+                            final = [l.copy() for l in sel_objs]
+
+                            def on_save_progress(done: int, total: int) -> None:
+                                st_text.text(f"Salvando leads... {done}/{total}")
+                                bar.progress(done / total)
+
+                            report = db.save_leads(cid, final, on_progress=on_save_progress)
+                            if report.ok:
+                                st.success(f"Salvo com sucesso! {report.rows_written} leads.")
+                            else:
+                                st.warning(f"Importação parcial: {report.summary()}")
+                                st.dataframe(
+                                    pd.DataFrame(
+                                        [
+                                            {
+                                                "Nome": f["row"].get("full_name"),
+                                                "Public ID": f["row"].get("linkedin_public_id"),
+                                                "Erro": f["error"],
+                                            }
+                                            for f in report.failed
+                                        ]
+                                    ),
+                                    use_container_width=True,
+                                )
                     except Exception as e:
                         st.error(f"Erro: {e}")
 
@@ -1541,6 +1395,12 @@ with tab2:
         horizontal=True,
         key="enrich_source",
     )
+    enrich_no_cache = st.checkbox(
+        "Ignorar cache de perfis",
+        value=False,
+        help="Busca o perfil na API mesmo que ele tenha sido enriquecido recentemente.",
+        key="enrich_no_cache",
+    )
     if source == "Lista existente":
         try:
             camps = db.supabase.table("campaigns").select("*").eq("user_id", db.user.id).order('created_at', desc=True).execute().data
@@ -1549,7 +1409,7 @@ with tab2:
             else:
                 sel = st.selectbox("Lista/Campanha", [c['name'] for c in camps])
                 curr = next(c for c in camps if c['name'] == sel)
-                leads = db.supabase.table("leads").select("*").eq("campaign_id", curr['id']).execute().data
+                leads = db.get_campaign_leads(curr['id'], view="export")
                 st.metric("Total", len(leads))
                 if leads:
                     df = pd.DataFrame(leads)
@@ -1574,6 +1434,8 @@ with tab2:
                         "current_title",
                         "companies",
                         "company_id",
+                        "company_size",
+                        "company_industry",
                         "bio",
                         "emails",
                         "phones",
@@ -1590,6 +1452,8 @@ with tab2:
                         "current_title": st.column_config.TextColumn("Cargo"),
                         "companies": st.column_config.TextColumn("Empresas"),
                         "company_id": st.column_config.TextColumn("Empresa ID"),
+                        "company_size": st.column_config.TextColumn("Porte"),
+                        "company_industry": st.column_config.TextColumn("Setor"),
                         "bio": st.column_config.TextColumn("Bio"),
                         "emails": st.column_config.TextColumn("Emails"),
                         "phones": st.column_config.TextColumn("Phones"),
@@ -1606,16 +1470,79 @@ with tab2:
                         else:
                             bar = st.progress(0)
                             st_text = st.empty()
-                            for i, lead in enumerate(sel_leads):
-                                st_text.text(f"Enriquecendo {lead.get('full_name')}...")
-                                fields = build_enrichment_payload(unipile, acc_id, lead)
-                                try:
-                                    db.update_lead_enrichment(lead["id"], fields)
-                                except Exception as e:
-                                    st.error(f"Erro ao enriquecer {lead.get('full_name')}: {e}")
-                                bar.progress((i + 1) / len(sel_leads))
-                            st.success("Enriquecimento concluído.")
-                            st.rerun()
+                            enriched = iter_enrichment_payloads(unipile, acc_id, sel_leads, use_cache=not enrich_no_cache)
+                            # Grava em lote (a cada ENRICH_FLUSH_ROWS leads ou ENRICH_FLUSH_SECONDS) em vez de um UPDATE por lead.
+                            writer = db.enrichment_writer(flush_rows=ENRICH_FLUSH_ROWS, flush_seconds=ENRICH_FLUSH_SECONDS)
+                            try:
+                                with writer:
+                                    for i, (lead, fields) in enumerate(enriched):
+                                        st_text.text(f"Enriquecido {lead.get('full_name')}")
+                                        if fields:
+                                            writer.add(
+                                                {
+                                                    "id": lead["id"],
+                                                    "campaign_id": lead.get("campaign_id"),
+                                                    "user_id": lead.get("user_id"),
+                                                    **fields,
+                                                }
+                                            )
+                                        bar.progress((i + 1) / len(sel_leads))
+                            except Exception as e:
+                                st.error(f"Erro ao gravar enriquecimento: {e}")
+                            if writer.report.ok:
+                                st.success("Enriquecimento concluído.")
+                                st.rerun()
+                            else:
+                                st.warning(f"Enriquecimento parcial: {writer.report.summary()}")
+                                for failure in writer.report.failed:
+                                    st.error(f"Erro ao gravar lead {failure['row'].get('id')}: {failure['error']}")
+
+                    company_ids = collect_company_ids(leads)
+                    st.caption(
+                        f"{len(company_ids)} empresas distintas entre {len(leads)} leads "
+                        "(enriqueça os perfis antes para preencher o Empresa ID)."
+                    )
+                    if st.button("🏢 Enriquecer empresas", key="btn_enrich_companies", disabled=not company_ids):
+                        known = {}
+                        if not enrich_no_cache:
+                            try:
+                                known = {c["company_id"]: c for c in db.get_companies(company_ids)}
+                            except Exception as e:
+                                st.warning(f"Nao foi possivel ler a tabela companies: {e}")
+                        missing = len(company_ids) - len(known)
+                        bar = st.progress(0)
+                        st_text = st.empty()
+
+                        def on_company_progress(done: int, total: int) -> None:
+                            st_text.text(f"Buscando empresas... {done}/{total}")
+                            bar.progress(done / total)
+
+                        fetched = enrich_leads_with_companies(
+                            unipile,
+                            acc_id,
+                            leads,
+                            use_cache=not enrich_no_cache,
+                            on_progress=on_company_progress,
+                            skip=known,
+                        )
+                        if fetched:
+                            try:
+                                db.save_companies(list(fetched.values()))
+                            except Exception as e:
+                                st.warning(f"Nao foi possivel salvar as empresas: {e}")
+                        companies_by_id = {**known, **fetched}
+                        updated = 0
+                        for company_id, company in companies_by_id.items():
+                            try:
+                                db.update_leads_company(curr["id"], company_id, lead_company_fields(company))
+                                updated += 1
+                            except Exception as e:
+                                st.error(f"Erro ao atualizar leads da empresa {company_id}: {e}")
+                        st.success(
+                            f"{updated} empresas aplicadas ({len(known)} já conhecidas, "
+                            f"{len(fetched)} buscadas, {missing - len(fetched)} falharam)."
+                        )
+                        st.rerun()
 
                     enrich_df = pd.DataFrame(leads)
                     if not enrich_df.empty:
@@ -1623,6 +1550,8 @@ with tab2:
                         enrich_df["Cargo"] = enrich_df.get("current_title")
                         enrich_df["Empresas"] = enrich_df.get("companies")
                         enrich_df["Empresa ID"] = enrich_df.get("company_id")
+                        enrich_df["Porte"] = enrich_df.get("company_size")
+                        enrich_df["Setor"] = enrich_df.get("company_industry")
                         enrich_df["Localizacao"] = enrich_df.get("profile_location").fillna(enrich_df.get("location")) if "profile_location" in enrich_df.columns else enrich_df.get("location")
                         enrich_df["Emails"] = enrich_df.get("emails")
                         enrich_df["Phones"] = enrich_df.get("phones")
@@ -1633,6 +1562,8 @@ with tab2:
                             "Cargo",
                             "Empresas",
                             "Empresa ID",
+                            "Porte",
+                            "Setor",
                             "Localizacao",
                             "Emails",
                             "Phones",
@@ -1674,23 +1605,25 @@ with tab2:
                         else:
                             bar = st.progress(0)
                             status = st.empty()
-                            enriched_rows = []
-                            for i, row in enumerate(selected_rows):
+                            enriched_rows = [dict(row) for row in selected_rows]
+                            to_enrich = []
+                            for idx, row in enumerate(selected_rows):
                                 identifier = resolve_profile_identifier(row)
-                                out = dict(row)
                                 if not identifier:
+                                    out = enriched_rows[idx]
                                     out["Bio"] = ""
                                     out["Cargo"] = ""
                                     out["Empresas"] = ""
                                     out["Empresa ID"] = ""
                                     out["Localizacao"] = ""
                                     out["_enrich_error"] = "identificador ausente"
-                                    enriched_rows.append(out)
                                     continue
-                                lead = dict(row)
-                                lead["public_identifier"] = identifier
-                                status.text(f"Enriquecendo {identifier}...")
-                                fields = build_enrichment_payload(unipile, acc_id, lead)
+                                to_enrich.append({"public_identifier": identifier, "_row": idx})
+                            enriched = iter_enrichment_payloads(unipile, acc_id, to_enrich, use_cache=not enrich_no_cache)
+                            for i, (lead, fields) in enumerate(enriched):
+                                status.text(f"Enriquecido {lead['public_identifier']}")
+                                # Resultados chegam fora de ordem; cada um volta para a sua linha.
+                                out = enriched_rows[lead["_row"]]
                                 out["Bio"] = fields.get("bio") or ""
                                 out["Cargo"] = fields.get("current_title") or ""
                                 out["Empresas"] = fields.get("companies") or ""
@@ -1700,8 +1633,7 @@ with tab2:
                                 out["Phones"] = fields.get("phones") or ""
                                 out["Adresses"] = fields.get("adresses") or ""
                                 out["Socials"] = fields.get("socials") or ""
-                                enriched_rows.append(out)
-                                bar.progress((i + 1) / len(selected_rows))
+                                bar.progress((i + 1) / len(to_enrich))
                             result_df = pd.DataFrame(enriched_rows)
                             st.success("Enriquecimento concluído.")
                             st.download_button(
@@ -1785,7 +1717,7 @@ with tab3:
             else:
                 sel = st.selectbox("Lista/Campanha", [c['name'] for c in camps], key="invite_campaign_sel")
                 curr = next(c for c in camps if c['name'] == sel)
-                leads_all = db.supabase.table("leads").select("*").eq("campaign_id", curr['id']).execute().data
+                leads_all = db.get_campaign_leads(curr['id'], view="invite")
                 if not leads_all:
                     st.info("Nenhum lead encontrado nessa lista.")
                 else:
@@ -1900,23 +1832,11 @@ with tab3:
                                         summary_df = summarize_invite_rows(rows)
                                         st.success(f"Agenda salva: {len(rows)} convites em {len(summary_df)} dia(s).")
 
-                        schedule_rows = db.get_invite_schedule(campaign_id=curr["id"], source="campaign")
-                        if schedule_rows:
+                        # Contagens agregadas no banco (view invite_schedule_batches), já ordenadas da mais recente.
+                        schedule_batches = db.get_invite_schedule_batches(campaign_id=curr["id"], source="campaign")
+                        if schedule_batches:
                             st.markdown("#### Agendas salvas")
-                            df_sched = pd.DataFrame(schedule_rows)
-                            batch_df = (
-                                df_sched.groupby("batch_id")
-                                .agg(
-                                    batch_label=("batch_label", "first"),
-                                    created_at=("created_at", "min"),
-                                    total=("id", "count"),
-                                    scheduled=("status", lambda s: (s == "scheduled").sum()),
-                                    sent=("status", lambda s: (s == "sent").sum()),
-                                    error=("status", lambda s: (s == "error").sum()),
-                                )
-                                .reset_index()
-                            )
-                            batch_df = batch_df[batch_df["batch_id"].notna()].sort_values("created_at", ascending=False)
+                            batch_df = pd.DataFrame(schedule_batches)
                             if batch_df.empty:
                                 st.info("Nenhuma agenda salva.")
                             else:
@@ -1940,8 +1860,7 @@ with tab3:
                                     db.delete_invite_schedule_batch(selected_batch_id)
                                     st.success("Agenda removida.")
                                     st.rerun()
-                                batch_rows = [r for r in schedule_rows if r.get("batch_id") == selected_batch_id]
-                                summary_df = summarize_invite_rows(batch_rows, status="scheduled")
+                                summary_df = schedule_days_frame(db.get_invite_schedule_days(selected_batch_id, status="scheduled"), "scheduled")
                                 if summary_df.empty:
                                     st.info("Nenhum convite pendente nessa agenda.")
                                 else:
@@ -1956,12 +1875,13 @@ with tab3:
                                         if invite_message and len(invite_message) > 300:
                                             st.error("A mensagem do convite excede 300 caracteres.")
                                         else:
-                                            rows_day = [
-                                                row for row in batch_rows
-                                                if row.get("status") == "scheduled"
-                                                and str(row.get("scheduled_date")) == send_day
-                                            ]
-                                            rows_day = rows_day[: int(invite_daily_limit)]
+                                            rows_day = db.get_invite_schedule(
+                                                batch_id=selected_batch_id,
+                                                status="scheduled",
+                                                scheduled_date=send_day,
+                                                limit=int(invite_daily_limit),
+                                            )
+                                            rows_day = apply_send_budget(db, rows_day, acc_id, ACTION_INVITE)
                                             if not rows_day:
                                                 st.info("Nenhum lead agendado para este dia.")
                                             else:
@@ -2028,6 +1948,7 @@ with tab3:
                                                                     schema_warned = True
                                                                 db.log_attempt(curr["id"], lead_id, "invite_error", str(e))
                                                             db.log_attempt(curr["id"], lead_id, "invite_sent")
+                                                        db.record_send(acc_id, ACTION_INVITE)
                                                         ok += 1
                                                     except Exception as e:
                                                         log_error(
@@ -2150,23 +2071,11 @@ with tab3:
                                     summary_df = summarize_invite_rows(rows)
                                     st.success(f"Agenda salva: {len(rows)} convites em {len(summary_df)} dia(s).")
 
-        schedule_rows = db.get_invite_schedule(source="csv")
-        if schedule_rows:
+        # Contagens agregadas no banco (view invite_schedule_batches), já ordenadas da mais recente.
+        schedule_batches = db.get_invite_schedule_batches(source="csv")
+        if schedule_batches:
             st.markdown("#### Agendas salvas")
-            df_sched = pd.DataFrame(schedule_rows)
-            batch_df = (
-                df_sched.groupby("batch_id")
-                .agg(
-                    batch_label=("batch_label", "first"),
-                    created_at=("created_at", "min"),
-                    total=("id", "count"),
-                    scheduled=("status", lambda s: (s == "scheduled").sum()),
-                    sent=("status", lambda s: (s == "sent").sum()),
-                    error=("status", lambda s: (s == "error").sum()),
-                )
-                .reset_index()
-            )
-            batch_df = batch_df[batch_df["batch_id"].notna()].sort_values("created_at", ascending=False)
+            batch_df = pd.DataFrame(schedule_batches)
             if batch_df.empty:
                 st.info("Nenhuma agenda salva.")
             else:
@@ -2190,8 +2099,7 @@ with tab3:
                     db.delete_invite_schedule_batch(selected_batch_id)
                     st.success("Agenda removida.")
                     st.rerun()
-                batch_rows = [r for r in schedule_rows if r.get("batch_id") == selected_batch_id]
-                summary_df = summarize_invite_rows(batch_rows, status="scheduled")
+                summary_df = schedule_days_frame(db.get_invite_schedule_days(selected_batch_id, status="scheduled"), "scheduled")
                 if summary_df.empty:
                     st.info("Nenhum convite pendente nessa agenda.")
                 else:
@@ -2203,12 +2111,13 @@ with tab3:
                         if invite_message and len(invite_message) > 300:
                             st.error("A mensagem do convite excede 300 caracteres.")
                         else:
-                            rows_day = [
-                                row for row in batch_rows
-                                if row.get("status") == "scheduled"
-                                and str(row.get("scheduled_date")) == send_day
-                            ]
-                            rows_day = rows_day[: int(invite_daily_limit)]
+                            rows_day = db.get_invite_schedule(
+                                batch_id=selected_batch_id,
+                                status="scheduled",
+                                scheduled_date=send_day,
+                                limit=int(invite_daily_limit),
+                            )
+                            rows_day = apply_send_budget(db, rows_day, acc_id, ACTION_INVITE)
                             if not rows_day:
                                 st.info("Nenhum lead agendado para este dia.")
                             else:
@@ -2266,6 +2175,7 @@ with tab3:
                                                 "sent",
                                                 invitation_id=row_report.get("invitation_id"),
                                             )
+                                        db.record_send(acc_id, ACTION_INVITE)
                                         ok += 1
                                     except Exception as e:
                                         log_error(
@@ -2316,7 +2226,9 @@ with tab4:
             else:
                 sel = st.selectbox("Lista/Campanha", [c['name'] for c in camps], key="msg_campaign_sel")
                 curr = next(c for c in camps if c['name'] == sel)
-                leads_all = db.supabase.table("leads").select("*").eq("campaign_id", curr['id']).execute().data
+                # O template editado fica no session_state; campos citados nele (ex: {bio}) entram na projeção.
+                template_hint = st.session_state.get(f"msg_template_{curr['id']}") or curr.get("message_template")
+                leads_all = db.get_campaign_leads(curr['id'], view="sync", template=template_hint)
                 if not leads_all:
                     st.info("Nenhum lead encontrado nessa lista.")
                 else:
@@ -2444,6 +2356,7 @@ with tab4:
                             elif not selected_leads:
                                 st.error("Selecione pelo menos um lead.")
                             else:
+                                selected_leads = apply_send_budget(db, selected_leads, acc_id, ACTION_MESSAGE)
                                 ok = fail = skipped = 0
                                 bar = st.progress(0)
                                 status = st.empty()
@@ -2503,6 +2416,7 @@ with tab4:
                                             log_response("start_chat", res, unipile.last_status)
                                         db.update_lead_status(lead["id"], "sent")
                                         db.log_attempt(curr["id"], lead["id"], "sent")
+                                        db.record_send(acc_id, ACTION_MESSAGE)
                                         ok += 1
                                     except Exception as e:
                                         db.update_lead_status(lead["id"], "error")
@@ -2607,6 +2521,7 @@ with tab4:
                             elif not selected_rows:
                                 st.error("Selecione pelo menos um lead.")
                             else:
+                                selected_rows = apply_send_budget(db, selected_rows, acc_id, ACTION_MESSAGE)
                                 ok = fail = skipped = 0
                                 bar = st.progress(0)
                                 status = st.empty()
@@ -2674,6 +2589,7 @@ with tab4:
                                             if isinstance(res, dict):
                                                 row_report["chat_id"] = res.get("chat_id")
                                                 row_report["message_id"] = res.get("message_id")
+                                        db.record_send(acc_id, ACTION_MESSAGE)
                                         ok += 1
                                         row_report["_status"] = "sent"
                                     except Exception as e:
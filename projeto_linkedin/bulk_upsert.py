@@ -0,0 +1,212 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import httpx
+except ImportError:  # vem junto com o supabase; sem ele, só erros de rede do Python contam
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_MAX_WORKERS = 4
+# Códigos do Postgres/PostgREST que valem nova tentativa: timeout, deadlock, conexão.
+TRANSIENT_PG_CODES = {"57014", "40001", "40P01", "08000", "08003", "08006", "53300"}
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Erro que pode passar numa nova tentativa (rede, timeout, 5xx/429)."""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if httpx is not None and isinstance(exc, (httpx.TimeoutException, httpx.TransportError)):
+        return True
+    code = str(getattr(exc, "code", "") or "")
+    if code in TRANSIENT_PG_CODES:
+        return True
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429 or (isinstance(status, int) and status >= 500)
+
+
+class UpsertReport:
+    """Resultado de um upsert em blocos: linhas gravadas, falhas e por quê."""
+
+    def __init__(self, rows_total: int = 0):
+        self.rows_total = rows_total
+        self.rows_written = 0
+        self.chunks = 0
+        self.retries = 0
+        self.failed: List[Dict[str, Any]] = []
+        self.elapsed = 0.0
+
+    @property
+    def rows_failed(self) -> int:
+        return len(self.failed)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def summary(self) -> str:
+        return (
+            f"{self.rows_written}/{self.rows_total} linhas gravadas, {self.rows_failed} com erro "
+            f"({self.chunks} blocos, {self.retries} novas tentativas, {self.elapsed:.1f}s)"
+        )
+
+    def merge(self, other: "UpsertReport") -> "UpsertReport":
+        self.rows_total += other.rows_total
+        self.rows_written += other.rows_written
+        self.chunks += other.chunks
+        self.retries += other.retries
+        self.failed.extend(other.failed)
+        self.elapsed += other.elapsed
+        return self
+
+    def __repr__(self) -> str:
+        return f"UpsertReport({self.summary()})"
+
+
+def dedupe_rows(rows: Iterable[Dict[str, Any]], key_fields: Sequence[str]) -> List[Dict[str, Any]]:
+    """Mantém a última linha de cada chave de conflito.
+
+    Um upsert com a mesma chave duas vezes no mesmo comando falha inteiro no
+    Postgres ("cannot affect row a second time"). Linhas sem a chave passam.
+    """
+    by_key: Dict[Any, Dict[str, Any]] = {}
+    loose: List[Dict[str, Any]] = []
+    for row in rows:
+        key = tuple(row.get(field) for field in key_fields)
+        if any(value is None for value in key):
+            loose.append(row)
+        else:
+            by_key[key] = row
+    return list(by_key.values()) + loose
+
+
+def chunked_upsert(
+    send: Callable[[List[Dict[str, Any]]], Any],
+    rows: List[Dict[str, Any]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_attempts: int = 3,
+    base_delay: float = 1.0,
+    on_progress: Optional[Callable[[int, int], Any]] = None,
+) -> UpsertReport:
+    """Grava `rows` em blocos de chunk_size, até max_workers blocos em paralelo.
+
+    send(bloco) faz um upsert. Erros transitórios são repetidos com backoff
+    (até max_attempts); se persistirem, o bloco inteiro vai para report.failed
+    (dividir só multiplicaria as chamadas a um servidor fora do ar). Erros de
+    dados dividem o bloco ao meio até isolar as linhas ruins, que vão para
+    report.failed com o erro. Assim uma linha inválida não derruba a
+    importação inteira.
+    on_progress(linhas processadas, total) roda na thread chamadora.
+    """
+    report = UpsertReport(len(rows))
+    if not rows:
+        return report
+    chunk_size = max(1, chunk_size)
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    report.chunks = len(chunks)
+    started = time.monotonic()
+    lock = threading.Lock()
+
+    def attempt(chunk: List[Dict[str, Any]]) -> Optional[BaseException]:
+        for number in range(1, max_attempts + 1):
+            try:
+                send(chunk)
+                return None
+            except Exception as exc:
+                if number >= max_attempts or not is_transient_error(exc):
+                    return exc
+                delay = base_delay * (2 ** (number - 1))
+                delay += random.uniform(0, delay * 0.2)
+                logger.warning(
+                    "Upsert de %s linhas falhou (%s), tentativa %s/%s. Aguardando %.1fs",
+                    len(chunk),
+                    exc,
+                    number,
+                    max_attempts,
+                    delay,
+                )
+                with lock:
+                    report.retries += 1
+                time.sleep(delay)
+        return None
+
+    def write(chunk: List[Dict[str, Any]]) -> tuple[int, List[Dict[str, Any]]]:
+        error = attempt(chunk)
+        if error is None:
+            return len(chunk), []
+        if is_transient_error(error):
+            logger.warning("Bloco de %s linhas não gravado após %s tentativas: %s", len(chunk), max_attempts, error)
+            return 0, [{"row": row, "error": str(error)} for row in chunk]
+        if len(chunk) == 1:
+            logger.warning("Linha rejeitada no upsert: %s", error)
+            return 0, [{"row": chunk[0], "error": str(error)}]
+        # Divide para descobrir quais linhas são o problema; as demais são gravadas.
+        middle = len(chunk) // 2
+        written_left, failed_left = write(chunk[:middle])
+        written_right, failed_right = write(chunk[middle:])
+        return written_left + written_right, failed_left + failed_right
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        futures = {pool.submit(write, chunk): len(chunk) for chunk in chunks}
+        for future in as_completed(futures):
+            written, failed = future.result()
+            report.rows_written += written
+            report.failed.extend(failed)
+            done += futures[future]
+            if on_progress:
+                on_progress(done, len(rows))
+    report.elapsed = time.monotonic() - started
+    logger.info("Upsert em blocos: %s", report.summary())
+    return report
+
+
+class BufferedUpsertWriter:
+    """Acumula linhas e grava em lote a cada `max_rows` linhas ou `max_seconds` segundos.
+
+    flush_fn(linhas) faz a gravação e devolve um UpsertReport; os relatórios
+    de cada flush são somados em self.report. O prazo é conferido a cada add()
+    (sem thread própria, então pode ser usado no loop do Streamlit); close()
+    grava o que sobrou. Use como context manager.
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[List[Dict[str, Any]]], "UpsertReport"],
+        max_rows: int = 200,
+        max_seconds: float = 5.0,
+    ):
+        self.flush_fn = flush_fn
+        self.max_rows = max(1, max_rows)
+        self.max_seconds = max_seconds
+        self.report = UpsertReport()
+        self._rows: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.max_rows or time.monotonic() - self._last_flush >= self.max_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        self.report.merge(self.flush_fn(rows))
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
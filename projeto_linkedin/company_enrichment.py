@@ -0,0 +1,141 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List
+
+from unipile_client import DEFAULT_ACCOUNT_CONCURRENCY, UnipileClient
+
+logger = logging.getLogger(__name__)
+
+
+def collect_company_ids(leads: Iterable[dict]) -> List[str]:
+    """Lista os company_id distintos dos leads, na ordem em que aparecem."""
+    seen: Dict[str, None] = {}
+    for lead in leads:
+        company_id = lead.get("company_id") if isinstance(lead, dict) else None
+        if company_id is None:
+            continue
+        company_id = str(company_id).strip()
+        if company_id:
+            seen.setdefault(company_id, None)
+    return list(seen)
+
+
+def format_employee_range(value: Any) -> str | None:
+    """Converte {"from": 51, "to": 200} em "51-200" (ou "10001+" sem teto)."""
+    if not isinstance(value, dict):
+        return None
+    low = value.get("from")
+    high = value.get("to")
+    if low is None and high is None:
+        return None
+    if high is None:
+        return f"{low}+"
+    if low is None:
+        return f"0-{high}"
+    return f"{low}-{high}"
+
+
+def extract_company_fields(company_id: str, company: dict) -> dict:
+    """Campos da empresa que interessam para segmentar leads."""
+    if not isinstance(company, dict):
+        return {}
+    industry = company.get("industry")
+    if isinstance(industry, list):
+        industry = ", ".join(str(i).strip() for i in industry if i) or None
+    employee_count = company.get("employee_count")
+    if not isinstance(employee_count, int):
+        employee_count = None
+    return {
+        "company_id": str(company_id),
+        "name": company.get("name"),
+        "industry": industry,
+        "employee_count": employee_count,
+        "employee_count_range": format_employee_range(company.get("employee_count_range")),
+        "website": company.get("website"),
+    }
+
+
+def lead_company_fields(company: dict) -> dict:
+    """Colunas gravadas no lead a partir dos campos da empresa."""
+    size = company.get("employee_count_range")
+    if not size and company.get("employee_count") is not None:
+        size = str(company["employee_count"])
+    return {
+        "company_size": size,
+        "company_industry": company.get("industry"),
+    }
+
+
+def fetch_companies(
+    unipile: UnipileClient,
+    account_id: str,
+    company_ids: Iterable[str],
+    max_workers: int = DEFAULT_ACCOUNT_CONCURRENCY,
+    use_cache: bool = True,
+    on_progress=None,
+) -> Dict[str, dict]:
+    """Busca cada empresa uma única vez, em paralelo.
+
+    O ritmo por conta continua sendo controlado pelo rate limiter do cliente;
+    aqui só limitamos quantas requisições ficam em voo ao mesmo tempo.
+    on_progress(feitas, total) roda na thread chamadora, então pode mexer na UI.
+    Empresas que falharem ficam de fora do resultado.
+    """
+    ids = list(dict.fromkeys(str(c) for c in company_ids if c))
+    results: Dict[str, dict] = {}
+    if not ids:
+        return results
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(ids)))) as pool:
+        futures = {
+            pool.submit(unipile.get_company_details, account_id, company_id, use_cache=use_cache): company_id
+            for company_id in ids
+        }
+        for future in as_completed(futures):
+            company_id = futures[future]
+            done += 1
+            try:
+                company = future.result()
+            except Exception as exc:
+                logger.warning("Falha ao buscar empresa %s: %s", company_id, exc)
+                company = None
+            fields = extract_company_fields(company_id, company) if company else {}
+            if fields:
+                results[company_id] = fields
+            if on_progress:
+                on_progress(done, len(ids))
+    return results
+
+
+def enrich_leads_with_companies(
+    unipile: UnipileClient,
+    account_id: str,
+    leads: List[dict],
+    max_workers: int = DEFAULT_ACCOUNT_CONCURRENCY,
+    use_cache: bool = True,
+    on_progress=None,
+    skip: Iterable[str] = (),
+) -> Dict[str, dict]:
+    """Etapa de enriquecimento por empresa de uma lista de leads.
+
+    Deduplica os company_id antes de buscar, então N leads da mesma empresa
+    custam uma única chamada; ids em `skip` (ex: já gravados na tabela
+    companies) não são buscados. Retorna {company_id: campos da empresa} só
+    das buscadas; use lead_company_fields() para obter o que gravar em cada lead.
+    """
+    skip_ids = {str(c) for c in skip}
+    company_ids = [c for c in collect_company_ids(leads) if c not in skip_ids]
+    logger.info(
+        "Enriquecimento de empresas: %s leads, %s empresas a buscar (%s já conhecidas).",
+        len(leads),
+        len(company_ids),
+        len(skip_ids),
+    )
+    return fetch_companies(
+        unipile,
+        account_id,
+        company_ids,
+        max_workers=max_workers,
+        use_cache=use_cache,
+        on_progress=on_progress,
+    )
@@ -13,7 +13,8 @@ Via Docker (ver docker-compose.cron.yml):
 Variáveis de ambiente necessárias:
     - SUPABASE_URL: URL do projeto Supabase
     - SUPABASE_SERVICE_KEY: Service Role Key do Supabase (para bypass de RLS)
-    - INVITE_DAILY_LIMIT: Limite de convites por dia (default: 100)
+    - INVITE_DAILY_LIMIT: Limite de convites por dia, por conta (default: 40)
+    - INVITE_WEEKLY_LIMIT: Limite de convites em 7 dias, por conta (default: 190)
     - INVITE_DELAY_MIN: Delay mínimo entre convites em segundos (default: 1.0)
     - INVITE_DELAY_MAX: Delay máximo entre convites em segundos (default: 3.0)
     - UNIPILE_BASE_URL: URL base da API Unipile (default: https://api26.unipile.com:15609)
@@ -24,7 +25,7 @@ import sys
 import time
 import random
 import logging
-from datetime import datetime, date, timedelta
+from datetime import datetime
 from pathlib import Path
 
 # Adiciona o diretório do projeto ao path
@@ -33,6 +34,8 @@ sys.path.insert(0, str(Path(__file__).parent))
 from dotenv import load_dotenv
 from supabase import create_client
 from unipile_client import UnipileClient
+from rate_limiter import RateLimiter
+from send_counters import ACTION_INVITE, SendCounters, utc_today
 
 # Carrega variáveis de ambiente
 load_dotenv()
@@ -52,6 +55,8 @@ INVITE_DAILY_LIMIT = int(os.getenv("INVITE_DAILY_LIMIT", "40")) # Limite seguro
 INVITE_WEEKLY_LIMIT = int(os.getenv("INVITE_WEEKLY_LIMIT", "190")) # Limite semanal seguro
 INVITE_DELAY_MIN = float(os.getenv("INVITE_DELAY_MIN", "300.0")) # 5 minutos
 INVITE_DELAY_MAX = float(os.getenv("INVITE_DELAY_MAX", "900.0")) # 15 minutos
+# Os limites valem por conta; a busca traz os pendentes de todas as contas do dia.
+INVITE_PENDING_FETCH_LIMIT = int(os.getenv("INVITE_PENDING_FETCH_LIMIT", "1000"))
 UNIPILE_BASE_URL = os.getenv("UNIPILE_BASE_URL", "https://api26.unipile.com:15609")
 
 
@@ -68,16 +73,18 @@ def validate_config():
 
 def get_pending_schedules(supabase, today: str, limit: int):
     """
-    Busca todos os agendamentos pendentes para o dia atual.
+    Busca os agendamentos pendentes até o dia atual, dos mais antigos primeiro.
+    Convites adiados (conta no limite) ou de dias sem execução continuam na fila.
     Usa JOIN com unipile_accounts para obter as credenciais.
     """
     try:
-        # Busca schedules com status 'scheduled' para hoje
+        # Busca schedules com status 'scheduled' de hoje ou atrasados
         # Inclui dados da conta Unipile via FK
         result = supabase.table("invite_schedules") \
             .select("*, unipile_accounts(id, account_id, api_key, label)") \
-            .eq("scheduled_date", today) \
+            .lte("scheduled_date", today) \
             .eq("status", "scheduled") \
+            .order("scheduled_date") \
             .limit(limit) \
             .execute()
         
@@ -87,34 +94,19 @@ def get_pending_schedules(supabase, today: str, limit: int):
         return []
 
 
-def check_weekly_limit(supabase):
+def account_invite_budget(counters: SendCounters, account_id: str):
     """
-    Verifica se o limite semanal de convites foi atingido.
-    Retorna True se o limite foi atingido, False caso contrário.
+    Quantos convites a conta ainda pode enviar hoje (limites diário e semanal por conta).
+    Lê account_send_counters (até 7 linhas da conta) em vez de contar invite_schedules.
+    Retorna None se não houver limite ou a leitura falhar (não trava o envio por bugs de consulta).
     """
-    try:
-        # Data de 7 dias atrás
-        seven_days_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
-        
-        # Conta convites enviados nos últimos 7 dias
-        count_result = supabase.table("invite_schedules") \
-            .select("id", count="exact") \
-            .gte("sent_at", seven_days_ago) \
-            .eq("status", "sent") \
-            .execute()
-        
-        total_sent = count_result.count
-        
-        logger.info(f"Verificando limite semanal... enviadas nos últimos 7 dias: {total_sent}/{INVITE_WEEKLY_LIMIT}")
-        
-        if total_sent >= INVITE_WEEKLY_LIMIT:
-            logger.warning(f"⚠️ LIMITE SEMANAL ATINGIDO ({total_sent}/{INVITE_WEEKLY_LIMIT}). Convites pausados temporariamente.")
-            return True
-            
-        return False
-    except Exception as e:
-        logger.error(f"Erro ao verificar limite semanal: {e}")
-        return False # Em caso de erro, permite continuar para não travar por bugs de consulta
+    remaining = counters.remaining(account_id, ACTION_INVITE)
+    if remaining is not None and remaining <= 0:
+        logger.warning(
+            f"⚠️ Limite de convites atingido para a conta {account_id} "
+            f"(diário {INVITE_DAILY_LIMIT}, semanal {INVITE_WEEKLY_LIMIT}). Convites dela ficam para depois."
+        )
+    return remaining
 
 
 def send_invitation(unipile: UnipileClient, account_id: str, provider_id: str, message: str = None):
@@ -206,16 +198,12 @@ def process_schedules():
     supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
     
     # Data de hoje
-    today = date.today().isoformat()
+    # Mesmo dia (UTC) dos contadores de envio: a agenda do dia e o limite diário batem.
+    today = utc_today()
     logger.info(f"Iniciando processamento de convites para {today}")
     
-    # Valida limite semanal ANTES de buscar novos
-    if check_weekly_limit(supabase):
-        logger.info("❌ Abortando processamento de hoje devido ao limite semanal.")
-        return True
-    
-    # Busca agendamentos pendentes
-    schedules = get_pending_schedules(supabase, today, INVITE_DAILY_LIMIT)
+    # Busca agendamentos pendentes (os limites são conferidos por conta, abaixo)
+    schedules = get_pending_schedules(supabase, today, INVITE_PENDING_FETCH_LIMIT)
     
     if not schedules:
         logger.info("Nenhum convite agendado para hoje.")
@@ -231,6 +219,15 @@ def process_schedules():
     
     # Cache de clientes Unipile por account_id
     unipile_clients = {}
+    # Orçamento por conta compartilhado com a UI e o worker de sync
+    rate_limiter = RateLimiter.from_env()
+    # Limites diário/semanal por conta: uma conta no limite não trava as outras
+    counters = SendCounters(
+        supabase,
+        limits={ACTION_INVITE: {"daily": INVITE_DAILY_LIMIT, "weekly": INVITE_WEEKLY_LIMIT}},
+    )
+    budgets = {}
+    skipped_count = 0
     
     for schedule in schedules:
         try:
@@ -250,10 +247,17 @@ def process_schedules():
             
             account_id = account_data["account_id"]
             api_key = account_data["api_key"]
+
+            if account_id not in budgets:
+                budgets[account_id] = account_invite_budget(counters, account_id)
+            if budgets[account_id] is not None and budgets[account_id] <= 0:
+                # Fica como 'scheduled'; get_pending_schedules pega atrasados, então sai quando a janela liberar
+                skipped_count += 1
+                continue
             
             # Cria ou reutiliza cliente Unipile
             if account_id not in unipile_clients:
-                unipile_clients[account_id] = UnipileClient(UNIPILE_BASE_URL, api_key)
+                unipile_clients[account_id] = UnipileClient(UNIPILE_BASE_URL, api_key, rate_limiter=rate_limiter)
             
             unipile = unipile_clients[account_id]
             provider_id = schedule["provider_id"]
@@ -279,6 +283,10 @@ def process_schedules():
                     error_message=error_message
                 )
                 sent_count += 1
+                if not already_connected:
+                    counters.record(account_id, ACTION_INVITE)
+                    if budgets[account_id] is not None:
+                        budgets[account_id] -= 1
                 logger.info(f"  ✅ Enviado{' (Já conectado)' if already_connected else ''}: {provider_id}")
             else:
                 error_msg_str = str(result)
@@ -334,6 +342,7 @@ def process_schedules():
     logger.info(f"  Total processados: {len(schedules)}")
     logger.info(f"  Enviados com sucesso: {sent_count}")
     logger.info(f"  Erros: {error_count}")
+    logger.info(f"  Adiados (limite da conta): {skipped_count}")
     logger.info("=" * 50)
     
     return error_count == 0
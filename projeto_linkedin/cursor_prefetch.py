@@ -0,0 +1,137 @@
+import logging
+import queue
+import random
+import threading
+from typing import Any, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def page_cursor(data: Any) -> Optional[str]:
+    """Cursor da próxima página numa resposta da Unipile ({"cursor"} ou {"paging": {"cursor"}})."""
+    if not isinstance(data, dict):
+        return None
+    return data.get("cursor") or (data.get("paging") or {}).get("cursor")
+
+
+class CursorPrefetcher:
+    """Paginação por cursor com a próxima página já a caminho.
+
+    fetch_page(cursor) roda numa thread própria: assim que a página N chega,
+    a N+1 é pedida enquanto o consumidor ainda processa a N. No máximo `depth`
+    páginas ficam buscadas (ou em voo) à frente do consumidor; depth=0 busca de
+    forma serial na thread de quem itera (sem thread extra).
+
+    O atraso entre páginas (min_delay..max_delay) vale entre o início de cada
+    requisição, igual ao modo serial. A paginação para quando não vem cursor
+    ou o cursor se repete, ou quando should_continue() (checado na thread de
+    busca antes de cada página seguinte) devolve False. Erros de fetch_page
+    são relançados na iteração.
+    Ao parar antes do fim, chame close(): até `depth` páginas podem ter sido
+    buscadas além do que foi consumido.
+    """
+
+    def __init__(
+        self,
+        fetch_page: Callable[[Optional[str]], Any],
+        start_cursor: Optional[str] = None,
+        depth: int = 1,
+        min_delay: float = 0.0,
+        max_delay: float = 0.0,
+        next_cursor: Callable[[Any], Optional[str]] = page_cursor,
+        should_continue: Optional[Callable[[], bool]] = None,
+    ):
+        self.fetch_page = fetch_page
+        self.start_cursor = start_cursor
+        self.depth = max(0, depth)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.next_cursor = next_cursor
+        self.should_continue = should_continue
+        self._stop = threading.Event()
+        self._queue: queue.Queue = queue.Queue()
+        # Um crédito por página que pode estar à frente do consumidor.
+        self._credits = threading.Semaphore(max(1, self.depth))
+        self._thread: threading.Thread | None = None
+
+    def _pause(self) -> None:
+        if self.max_delay and self.max_delay > 0:
+            self._stop.wait(random.uniform(self.min_delay, self.max_delay))
+
+    def _pages(self) -> Iterator[tuple[Optional[str], Any]]:
+        cursor = self.start_cursor
+        seen = {cursor} if cursor else set()
+        first = True
+        while not self._stop.is_set():
+            if not first:
+                self._pause()
+                if self._stop.is_set():
+                    return
+            first = False
+            data = self.fetch_page(cursor)
+            yield cursor, data
+            cursor = self.next_cursor(data)
+            if not cursor or cursor in seen:
+                return
+            if self.should_continue is not None and not self.should_continue():
+                return
+            seen.add(cursor)
+
+    def _take_credit(self) -> bool:
+        while not self._stop.is_set():
+            if self._credits.acquire(timeout=0.1):
+                return True
+        return False
+
+    def _run(self) -> None:
+        pages = self._pages()
+        try:
+            while self._take_credit():
+                page = next(pages, _END)
+                self._queue.put(page)
+                if page is _END:
+                    return
+        except BaseException as exc:
+            self._queue.put(_Failure(exc))
+
+    def __iter__(self) -> Iterator[tuple[Optional[str], Any]]:
+        """Gera (cursor usado, página) na ordem da paginação."""
+        if self.depth == 0:
+            yield from self._pages()
+            return
+        self._thread = threading.Thread(target=self._run, name="cursor-prefetch", daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                self._credits.release()
+                yield item
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Para a thread de busca sem esperar a requisição em voo terminar."""
+        self._stop.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
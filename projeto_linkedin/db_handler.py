@@ -1,9 +1,24 @@
 from supabase import create_client, Client
 import streamlit as st
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Iterator, Optional, Any
+
+from bulk_upsert import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_MAX_WORKERS,
+    BufferedUpsertWriter,
+    UpsertReport,
+    chunked_upsert,
+    dedupe_rows,
+)
+from lead_columns import LEAD_VIEWS, lead_select
+from send_counters import SendCounters
+from supabase_utils import DEFAULT_PAGE_SIZE, iter_keyset
 
 class DBHandler:
+    # Projeções de leads aceitas em get_campaign_leads(view=...).
+    LEAD_VIEWS = LEAD_VIEWS
+
     def __init__(self, url: str, key: str):
         self.supabase: Client = create_client(url, key)
         self.user = None
@@ -59,11 +74,26 @@ class DBHandler:
     def update_campaign_template(self, campaign_id: str, template: str):
         return self.supabase.table("campaigns").update({"message_template": template}).eq("id", campaign_id).execute()
 
-    def save_leads(self, campaign_id: str, leads_list: List[Dict]):
+    def save_leads(
+        self,
+        campaign_id: str,
+        leads_list: List[Dict],
+        user_id: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        on_progress=None,
+    ) -> UpsertReport:
+        """Upsert dos leads na campanha, em blocos de chunk_size com até max_workers em paralelo.
+
+        user_id substitui o usuário logado (ex: scripts com service key, sem login).
+        Cada bloco é repetido em erro transitório e dividido até isolar linhas
+        inválidas; o UpsertReport diz quantas linhas foram gravadas e quais falharam.
+        """
+        user_id = user_id or self.user.id
         formatted_leads = []
         for lead in leads_list:
             formatted_leads.append({
-                "user_id": self.user.id,
+                "user_id": user_id,
                 "campaign_id": campaign_id,
                 "linkedin_public_id": lead.get("public_identifier"),
                 "provider_id": lead.get("provider_id") or lead.get("id"),
@@ -82,21 +112,136 @@ class DBHandler:
                 "status": "new",
                 "enrichment_data": lead.get("enrichment_data", None) 
             })
-        
-        return self.supabase.table("leads").upsert(formatted_leads, on_conflict="campaign_id, linkedin_public_id").execute()
+        formatted_leads = dedupe_rows(formatted_leads, ("campaign_id", "linkedin_public_id"))
+
+        def send(chunk: List[Dict]):
+            return self.supabase.table("leads").upsert(chunk, on_conflict="campaign_id, linkedin_public_id").execute()
+
+        return chunked_upsert(
+            send,
+            formatted_leads,
+            chunk_size=chunk_size,
+            max_workers=max_workers,
+            on_progress=on_progress,
+        )
 
     def update_lead_enrichment(self, lead_id: str, fields: Dict):
         if not fields:
             return None
         return self.supabase.table("leads").update(fields).eq("id", lead_id).execute()
 
-    def get_pending_leads(self, campaign_id: str):
-        return self.supabase.table("leads")\
+    def save_leads_enrichment(
+        self,
+        rows: List[Dict],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> UpsertReport:
+        """Grava o enriquecimento de vários leads com upserts em lote por id.
+
+        Cada linha precisa de id, campaign_id e user_id (colunas obrigatórias no
+        insert que o upsert tenta antes de cair no update) mais os campos
+        enriquecidos. Só as colunas enviadas são alteradas; linhas com conjuntos
+        de colunas diferentes vão em upserts separados para não zerar campos.
+        """
+        groups: Dict[tuple, List[Dict]] = {}
+        for row in rows:
+            if row.get("id"):
+                groups.setdefault(tuple(sorted(row)), []).append(row)
+
+        def send(chunk: List[Dict]):
+            return self.supabase.table("leads").upsert(chunk, on_conflict="id").execute()
+
+        report = UpsertReport()
+        for group in groups.values():
+            report.merge(
+                chunked_upsert(
+                    send,
+                    dedupe_rows(group, ("id",)),
+                    chunk_size=chunk_size,
+                    max_workers=max_workers,
+                )
+            )
+        return report
+
+    def enrichment_writer(self, flush_rows: int = 200, flush_seconds: float = 5.0) -> BufferedUpsertWriter:
+        """Writer que acumula enriquecimentos e grava a cada flush_rows linhas ou flush_seconds."""
+        return BufferedUpsertWriter(self.save_leads_enrichment, max_rows=flush_rows, max_seconds=flush_seconds)
+
+    def save_companies(self, companies: List[Dict[str, Any]]):
+        if not companies:
+            return None
+        rows = [
+            {
+                "user_id": self.user.id,
+                "company_id": c.get("company_id"),
+                "name": c.get("name"),
+                "industry": c.get("industry"),
+                "employee_count": c.get("employee_count"),
+                "employee_count_range": c.get("employee_count_range"),
+                "website": c.get("website"),
+                "fetched_at": datetime.utcnow().isoformat(),
+            }
+            for c in companies
+            if c.get("company_id")
+        ]
+        return self.supabase.table("companies").upsert(rows, on_conflict="user_id,company_id").execute()
+
+    def get_companies(self, company_ids: List[str]) -> List[Dict[str, Any]]:
+        if not company_ids:
+            return []
+        return self.supabase.table("companies")\
             .select("*")\
+            .eq("user_id", self.user.id)\
+            .in_("company_id", list(company_ids))\
+            .execute().data
+
+    def update_leads_company(self, campaign_id: str, company_id: str, fields: Dict):
+        """Atualiza de uma vez todos os leads da campanha que trabalham na empresa."""
+        if not fields:
+            return None
+        return self.supabase.table("leads")\
+            .update(fields)\
             .eq("campaign_id", campaign_id)\
-            .eq("status", "new")\
+            .eq("company_id", company_id)\
             .execute()
 
+    def iter_leads(
+        self,
+        campaign_id: str,
+        columns: str = "*",
+        status: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[Dict[str, Any]]:
+        """Leads da campanha em páginas de page_size por keyset (ordenados por id).
+
+        Um select único é cortado em silêncio no max-rows do PostgREST; aqui a
+        leitura segue página a página até o fim.
+        """
+        def make_query():
+            query = self.supabase.table("leads").select(columns).eq("campaign_id", campaign_id)
+            if status:
+                query = query.eq("status", status)
+            return query
+
+        return iter_keyset(make_query, page_size=page_size)
+
+    def get_campaign_leads(
+        self,
+        campaign_id: str,
+        view: str = "list",
+        template: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> List[Dict[str, Any]]:
+        """Leads da campanha na projeção `view` (ver lead_columns.LEAD_VIEWS).
+
+        Campos citados no template de mensagem (ex: {bio}) entram na projeção.
+        """
+        columns = lead_select(view, template=template)
+        return list(self.iter_leads(campaign_id, columns=columns, page_size=page_size))
+
+    def get_pending_leads(self, campaign_id: str, view: str = "list") -> List[Dict[str, Any]]:
+        return list(self.iter_leads(campaign_id, columns=lead_select(view), status="new"))
+
     def update_lead_status(self, lead_id: str, status: str):
         self.supabase.table("leads").update({"status": status}).eq("id", lead_id).execute()
 
@@ -131,6 +276,7 @@ class DBHandler:
         batch_id: str | None = None,
         status: str | None = None,
         scheduled_date: str | None = None,
+        limit: int | None = None,
     ):
         query = self.supabase.table("invite_schedules").select("*").eq("user_id", self.user.id)
         if campaign_id:
@@ -143,6 +289,34 @@ class DBHandler:
             query = query.eq("status", status)
         if scheduled_date:
             query = query.eq("scheduled_date", scheduled_date)
+        query = query.order("scheduled_date", desc=False)
+        if limit:
+            query = query.limit(limit)
+        return query.execute().data
+
+    def get_invite_schedule_batches(self, campaign_id: str | None = None, source: str | None = None):
+        """Uma linha por agenda (batch_id) com total/scheduled/sent/error/skipped, mais recente primeiro.
+
+        Lê a view invite_schedule_batches: o banco agrega e só o resumo é transferido.
+        """
+        query = self.supabase.table("invite_schedule_batches").select("*").eq("user_id", self.user.id)
+        if campaign_id:
+            query = query.eq("campaign_id", campaign_id)
+        if source:
+            query = query.eq("source", source)
+        return query.order("created_at", desc=True).execute().data
+
+    def get_invite_schedule_days(self, batch_id: str, status: str | None = None):
+        """Contagens por dia (total e por status) de uma agenda, via view invite_schedule_days.
+
+        Com `status` (scheduled, sent, error ou skipped), só os dias que têm convites nesse status.
+        """
+        query = self.supabase.table("invite_schedule_days")\
+            .select("*")\
+            .eq("user_id", self.user.id)\
+            .eq("batch_id", batch_id)
+        if status:
+            query = query.gt(status, 0)
         return query.order("scheduled_date", desc=False).execute().data
 
     def update_invite_schedule(
@@ -164,6 +338,17 @@ class DBHandler:
     def delete_invite_schedule_batch(self, batch_id: str):
         return self.supabase.table("invite_schedules").delete().eq("batch_id", batch_id).execute()
 
+    def _send_counters(self) -> SendCounters:
+        return SendCounters(self.supabase, user_id=self.user.id if self.user else None)
+
+    def send_budget(self, account_id: str, action: str) -> Optional[int]:
+        """Envios que ainda cabem hoje para a conta (None = sem limite ou leitura falhou)."""
+        return self._send_counters().remaining(account_id, action)
+
+    def record_send(self, account_id: str, action: str, amount: int = 1) -> Optional[int]:
+        """Soma um envio bem-sucedido em account_send_counters (incremento atômico)."""
+        return self._send_counters().record(account_id, action, amount)
+
     def log_attempt(self, campaign_id: str, lead_id: str, status: str, error_msg: str = None):
         data = {
             "user_id": self.user.id,
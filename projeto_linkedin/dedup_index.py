@@ -0,0 +1,145 @@
+import base64
+import hashlib
+import zlib
+from array import array
+from typing import Any, Dict, Iterable, Optional
+
+# Slot vazio na tabela; um hash que dê 0 é gravado como 1.
+_EMPTY = 0
+_MAX_LOAD = 0.5
+
+
+def key_hash(key: str) -> int:
+    """Hash de 64 bits (blake2b) de uma chave de dedup."""
+    digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class HashedKeySet:
+    """Conjunto de chaves de dedup guardando só hashes de 64 bits.
+
+    Endereçamento aberto (sondagem linear) sobre um array('Q'): cerca de 16
+    bytes por chave, contra ~100 de uma str num set. As chaves originais não
+    são guardadas (não dá para iterar sobre elas); a chance de colisão entre
+    hashes de 64 bits é desprezível até dezenas de milhões de chaves.
+
+    bloom_bits > 0 liga um filtro de Bloom consultado antes da tabela, que
+    responde "não tem" sem sondar quando a maioria das consultas é de chaves novas.
+    to_state()/from_state() serializam para checkpoints JSON.
+    """
+
+    def __init__(self, keys: Iterable[str] = (), capacity: int = 1024, bloom_bits: int = 0, bloom_hashes: int = 4):
+        size = 8
+        while size < capacity:
+            size *= 2
+        self._slots = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        self._count = 0
+        self.bloom_hashes = max(1, bloom_hashes)
+        self._bloom: Optional[bytearray] = bytearray((bloom_bits + 7) // 8) if bloom_bits > 0 else None
+        self._bloom_size = len(self._bloom) * 8 if self._bloom is not None else 0
+        self.update(keys)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, key: object) -> bool:
+        if key is None:
+            return False
+        return self._contains_hash(key_hash(key))
+
+    def add(self, key: str) -> bool:
+        """Adiciona a chave; devolve False se ela já estava no conjunto."""
+        return self._add_hash(key_hash(key))
+
+    def update(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            if key is not None:
+                self.add(key)
+
+    @property
+    def nbytes(self) -> int:
+        bloom = len(self._bloom) if self._bloom is not None else 0
+        return self._slots.itemsize * len(self._slots) + bloom
+
+    def _bloom_positions(self, value: int) -> Iterable[int]:
+        # Double hashing: k posições a partir das duas metades do hash.
+        h1 = value & 0xFFFFFFFF
+        h2 = (value >> 32) | 1
+        for i in range(self.bloom_hashes):
+            yield (h1 + i * h2) % self._bloom_size
+
+    def _slot(self, value: int) -> int:
+        slots = self._slots
+        index = value & self._mask
+        while True:
+            current = slots[index]
+            if current == _EMPTY or current == value:
+                return index
+            index = (index + 1) & self._mask
+
+    def _contains_hash(self, value: int) -> bool:
+        if self._bloom is not None:
+            for pos in self._bloom_positions(value):
+                if not self._bloom[pos >> 3] & (1 << (pos & 7)):
+                    return False
+        return self._slots[self._slot(value)] == value
+
+    def _add_hash(self, value: int) -> bool:
+        index = self._slot(value)
+        if self._slots[index] == value:
+            return False
+        self._slots[index] = value
+        self._count += 1
+        if self._bloom is not None:
+            for pos in self._bloom_positions(value):
+                self._bloom[pos >> 3] |= 1 << (pos & 7)
+        if self._count > len(self._slots) * _MAX_LOAD:
+            self._grow()
+        return True
+
+    def _grow(self) -> None:
+        old = self._slots
+        self._slots = array("Q", bytes(8 * len(old) * 2))
+        self._mask = len(self._slots) - 1
+        for value in old:
+            if value != _EMPTY:
+                self._slots[self._slot(value)] = value
+
+    def _hashes(self) -> array:
+        return array("Q", (value for value in self._slots if value != _EMPTY))
+
+    def to_bytes(self) -> bytes:
+        """Só os hashes ocupados, comprimidos (independe da capacidade da tabela)."""
+        return zlib.compress(self._hashes().tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes, bloom_bits: int = 0, bloom_hashes: int = 4) -> "HashedKeySet":
+        values = array("Q")
+        if data:
+            values.frombytes(zlib.decompress(data))
+        index = cls(capacity=int(len(values) / _MAX_LOAD) + 1, bloom_bits=bloom_bits, bloom_hashes=bloom_hashes)
+        for value in values:
+            index._add_hash(value)
+        return index
+
+    def to_state(self) -> Dict[str, Any]:
+        """Forma JSON para checkpoints."""
+        return {
+            "format": "hashed-keys-v1",
+            "count": self._count,
+            "bloom_bits": self._bloom_size,
+            "bloom_hashes": self.bloom_hashes,
+            "data": base64.b64encode(self.to_bytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_state(cls, state: Any) -> "HashedKeySet":
+        """Lê to_state(); aceita também a lista de chaves dos checkpoints antigos."""
+        if isinstance(state, dict) and state.get("format") == "hashed-keys-v1":
+            return cls.from_bytes(
+                base64.b64decode(state.get("data") or ""),
+                bloom_bits=int(state.get("bloom_bits") or 0),
+                bloom_hashes=int(state.get("bloom_hashes") or 4),
+            )
+        return cls(state or ())
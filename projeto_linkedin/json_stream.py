@@ -0,0 +1,64 @@
+import logging
+from typing import Iterable
+
+try:
+    import ijson
+except ImportError:  # opcional: sem ijson, cai no response.json() + projeção
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+SCALAR_EVENTS = {"string", "number", "boolean", "null"}
+
+
+def project_item(item: dict, fields: Iterable[str]) -> dict:
+    return {field: item.get(field) for field in fields if field in item}
+
+
+def project_page(data: dict, fields: Iterable[str]) -> dict:
+    """Reduz uma página {"items": [...], "cursor": ...} aos campos pedidos."""
+    fields = tuple(fields)
+    paging = data.get("paging") or {}
+    return {
+        "items": [project_item(item, fields) for item in data.get("items") or [] if isinstance(item, dict)],
+        "cursor": data.get("cursor"),
+        "paging": {"cursor": paging.get("cursor"), "total_count": paging.get("total_count")},
+    }
+
+
+def decode_projected_page(response, fields: Iterable[str]) -> dict:
+    """Decodifica uma página de lista guardando só `fields` de cada item.
+
+    Com ijson, lê o corpo em streaming (response feito com stream=True) e
+    nunca monta a árvore completa de cada item; só campos escalares de
+    primeiro nível são guardados. Sem ijson, usa response.json() e projeta.
+    """
+    fields = tuple(fields)
+    if ijson is None or getattr(response, "raw", None) is None:
+        return project_page(response.json(), fields)
+
+    wanted = {f"items.item.{field}": field for field in fields}
+    items: list[dict] = []
+    current: dict | None = None
+    cursor = None
+    paging: dict = {"cursor": None, "total_count": None}
+    raw = response.raw
+    # O corpo pode vir comprimido; o urllib3 só descomprime com decode_content.
+    raw.decode_content = True
+    try:
+        for prefix, event, value in ijson.parse(raw):
+            if prefix == "items.item":
+                if event == "start_map":
+                    current = {}
+                elif event == "end_map" and current is not None:
+                    items.append(current)
+                    current = None
+            elif current is not None and prefix in wanted and event in SCALAR_EVENTS:
+                current[wanted[prefix]] = value
+            elif prefix == "cursor" and event in SCALAR_EVENTS:
+                cursor = value
+            elif prefix in ("paging.cursor", "paging.total_count") and event in SCALAR_EVENTS:
+                paging[prefix.split(".", 1)[1]] = value
+    finally:
+        response.close()
+    return {"items": items, "cursor": cursor, "paging": paging}
@@ -0,0 +1,102 @@
+from string import Formatter
+from typing import Iterable, Optional, Tuple
+
+# Colunas de `leads` (supabase_schema.sql + migrations).
+LEAD_COLUMNS: Tuple[str, ...] = (
+    "id",
+    "campaign_id",
+    "user_id",
+    "linkedin_public_id",
+    "provider_id",
+    "full_name",
+    "headline",
+    "location",
+    "profile_location",
+    "current_title",
+    "companies",
+    "company_id",
+    "company_size",
+    "company_industry",
+    "bio",
+    "emails",
+    "phones",
+    "adresses",
+    "socials",
+    "invitation_status",
+    "invitation_id",
+    "invited_at",
+    "invitation_error",
+    "status",
+    "enrichment_data",
+)
+
+# Campos que o message_utils.build_message_context lê diretamente do lead.
+TEMPLATE_COLUMNS: Tuple[str, ...] = (
+    "full_name",
+    "headline",
+    "location",
+    "profile_location",
+    "current_title",
+    "companies",
+    "company_id",
+)
+
+# Projeções nomeadas: cada tela busca só o que usa. bio e enrichment_data
+# (os campos grandes) ficam de fora, exceto na exportação/enriquecimento.
+LEAD_VIEWS = {
+    "list": (
+        "id",
+        "campaign_id",
+        "linkedin_public_id",
+        "provider_id",
+        "full_name",
+        "headline",
+        "location",
+        "profile_location",
+        "current_title",
+        "companies",
+        "status",
+        "invitation_status",
+        "invited_at",
+    ),
+    "invite": (
+        "id",
+        "provider_id",
+        "linkedin_public_id",
+        "full_name",
+        "headline",
+        "location",
+        "profile_location",
+        "current_title",
+        "companies",
+        "status",
+        "invitation_status",
+        "invited_at",
+    ),
+    "sync": ("id", "linkedin_public_id", "provider_id", "status", "invitation_status", "invited_at")
+    + TEMPLATE_COLUMNS,
+    "export": tuple(column for column in LEAD_COLUMNS if column != "enrichment_data"),
+}
+
+
+def template_fields(template: Optional[str]) -> Tuple[str, ...]:
+    """Colunas de `leads` citadas como {campo} no template (ex: {bio})."""
+    if not template:
+        return ()
+    try:
+        names = [name for _, name, _, _ in Formatter().parse(template) if name]
+    except ValueError:  # template malformado: render_message devolve o texto como está
+        return ()
+    fields = {name.split(".")[0].split("[")[0] for name in names}
+    return tuple(column for column in LEAD_COLUMNS if column in fields)
+
+
+def lead_select(view: str, template: Optional[str] = None, extra: Iterable[str] = ()) -> str:
+    """String para .select() da projeção `view`, mais os campos do template e `extra`."""
+    if view not in LEAD_VIEWS:
+        raise ValueError(f"Projeção desconhecida: {view} (use {', '.join(LEAD_VIEWS)})")
+    columns = list(LEAD_VIEWS[view])
+    for column in (*template_fields(template), *extra):
+        if column not in columns:
+            columns.append(column)
+    return ",".join(columns)
@@ -0,0 +1,48 @@
+import logging
+import os
+import sqlite3
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_STORE_PATH = os.path.join(tempfile.gettempdir(), "linkedin_prospect.sqlite3")
+DEFAULT_STORE_PATH = os.getenv("LINKEDIN_PROSPECT_STORE", FALLBACK_STORE_PATH)
+
+
+def connect(path: str | None = None) -> sqlite3.Connection:
+    """Abre o SQLite local compartilhado entre processos (app, cron e worker).
+
+    Usa WAL para permitir leituras concorrentes e autocommit para que cada
+    chamador controle suas transações com BEGIN IMMEDIATE.
+    """
+    path = path or DEFAULT_STORE_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def usable_store_path(path: str | None = None) -> str:
+    """Devolve `path` se der para gravar nele; senão, o arquivo no diretório temporário.
+
+    Um ./data montado como root num container que roda como appuser não
+    derruba o cron/worker: o erro vai para o log e o processo segue com um
+    store local (o orçamento deixa de ser compartilhado até corrigir a permissão).
+    """
+    path = path or DEFAULT_STORE_PATH
+    try:
+        conn = connect(path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("ROLLBACK")
+        finally:
+            conn.close()
+        return path
+    except (sqlite3.Error, OSError) as e:
+        if path == FALLBACK_STORE_PATH:
+            raise
+        logger.error("Store %s indisponível (%s); usando %s, sem compartilhar entre processos.", path, e, FALLBACK_STORE_PATH)
+        return FALLBACK_STORE_PATH
@@ -0,0 +1,382 @@
+import logging
+import os
+import re
+import threading
+import time
+
+from local_store import connect, usable_store_path
+
+logger = logging.getLogger(__name__)
+
+# Classe de endpoint -> (requisições por minuto, rajada máxima)
+DEFAULT_RATES: dict[str, tuple[float, float]] = {
+    "search": (20.0, 5.0),
+    "profile": (60.0, 10.0),
+    "invite": (6.0, 2.0),
+    "message": (12.0, 3.0),
+    "relations": (20.0, 3.0),
+}
+
+
+# Respostas que indicam que a conta está acima do orçamento real.
+CONGESTION_STATUSES = {429, 503}
+
+# Convites e mensagens: o ritmo configurado é teto, o AIMD só pode reduzir.
+CLASS_MAX_FACTORS: dict[str, float] = {"invite": 1.0, "message": 1.0}
+
+
+def classify_endpoint(endpoint: str) -> str:
+    """Mapeia um endpoint da Unipile para a classe usada no rate limit."""
+    path = endpoint.split("?", 1)[0]
+    if path.startswith("/api/v1/linkedin/search"):
+        return "search"
+    if path.startswith("/api/v1/chats"):
+        return "message"
+    if path == "/api/v1/users/invite":
+        return "invite"
+    if path in ("/api/v1/users/invite/sent", "/api/v1/users/relations"):
+        return "relations"
+    return "profile"
+
+
+def parse_rate(value: str | None, default: tuple[float, float]) -> tuple[float, float]:
+    """Lê "por_minuto[:rajada]" (ex: "30:5")."""
+    if not value:
+        return default
+    match = re.fullmatch(r"\s*([\d.]+)\s*(?::\s*([\d.]+)\s*)?", value)
+    if not match:
+        logger.warning("Rate limit invalido: %s. Usando padrao %s.", value, default)
+        return default
+    per_minute = float(match.group(1))
+    burst = float(match.group(2)) if match.group(2) else default[1]
+    return per_minute, max(burst, 1.0)
+
+
+class AdaptiveController:
+    """Controle AIMD de ritmo e concorrência por (account_id, classe de endpoint).
+
+    Enquanto as respostas vêm saudáveis o ritmo sobe de forma aditiva; em 429,
+    503 ou latência muito acima da média ele cai de forma multiplicativa. O
+    estado aprendido fica no mesmo SQLite do limiter e é reaproveitado na
+    próxima execução. Leituras usam cópia local por até cache_ttl segundos,
+    para que cortes gravados por outro processo (cron, worker) valham aqui
+    também. class_max_factors limita o crescimento por classe (convites e
+    mensagens nunca passam do ritmo configurado).
+    """
+
+    def __init__(
+        self,
+        conn,
+        lock: threading.Lock,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        min_factor: float = 0.1,
+        max_factor: float = 3.0,
+        max_concurrency: int = 8,
+        latency_factor: float = 2.5,
+        latency_alpha: float = 0.2,
+        cooldown: float = 5.0,
+        initial_concurrency: float = 4.0,
+        cache_ttl: float = 2.0,
+        class_max_factors: dict[str, float] | None = None,
+    ):
+        self._conn = conn
+        self._lock = lock
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.max_concurrency = max(1, max_concurrency)
+        self.latency_factor = latency_factor
+        self.latency_alpha = latency_alpha
+        self.cooldown = cooldown
+        self.initial_concurrency = max(1.0, min(float(self.max_concurrency), float(initial_concurrency)))
+        self.cache_ttl = cache_ttl
+        self.class_max_factors = dict(CLASS_MAX_FACTORS if class_max_factors is None else class_max_factors)
+        self._cache: dict[tuple[str, str], tuple[float, dict]] = {}
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS adaptive_rates (
+                account_id TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                per_minute REAL NOT NULL,
+                concurrency REAL NOT NULL,
+                latency_ewma REAL,
+                samples INTEGER NOT NULL DEFAULT 0,
+                last_decrease REAL NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (account_id, endpoint)
+            )
+            """
+        )
+
+    def _load(self, account_id: str, endpoint_class: str, base_per_minute: float) -> dict:
+        row = self._conn.execute(
+            """
+            SELECT per_minute, concurrency, latency_ewma, samples, last_decrease
+            FROM adaptive_rates WHERE account_id = ? AND endpoint = ?
+            """,
+            (account_id, endpoint_class),
+        ).fetchone()
+        if row:
+            return {
+                "per_minute": row[0],
+                "concurrency": row[1],
+                "latency_ewma": row[2],
+                "samples": row[3],
+                "last_decrease": row[4],
+            }
+        return {
+            "per_minute": base_per_minute,
+            "concurrency": self.initial_concurrency,
+            "latency_ewma": None,
+            "samples": 0,
+            "last_decrease": 0.0,
+        }
+
+    def max_factor_for(self, endpoint_class: str) -> float:
+        return min(self.max_factor, self.class_max_factors.get(endpoint_class, self.max_factor))
+
+    def state(self, account_id: str, endpoint_class: str, base_per_minute: float) -> dict:
+        key = (account_id, endpoint_class)
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is None or now - cached[0] >= self.cache_ttl:
+            with self._lock:
+                current = self._load(account_id, endpoint_class, base_per_minute)
+            # Estado gravado com um teto antigo (ex: convites a 3x) não passa do teto atual.
+            current["per_minute"] = min(current["per_minute"], base_per_minute * self.max_factor_for(endpoint_class))
+            cached = (now, current)
+            self._cache[key] = cached
+        return cached[1]
+
+    def concurrency(self, account_id: str, endpoint_class: str, base_per_minute: float) -> int:
+        value = self.state(account_id, endpoint_class, base_per_minute)["concurrency"]
+        return max(1, min(self.max_concurrency, int(value)))
+
+    def record(
+        self,
+        account_id: str,
+        endpoint_class: str,
+        base_per_minute: float,
+        status: int | None,
+        latency: float | None,
+    ) -> tuple[dict, bool]:
+        """Atualiza o estado com uma resposta. Retorna (estado, houve_corte)."""
+        now = time.time()
+        min_rate = base_per_minute * self.min_factor
+        max_rate = base_per_minute * self.max_factor_for(endpoint_class)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = self._load(account_id, endpoint_class, base_per_minute)
+                # Mesmo teto de state(): um corte parte do ritmo permitido, não do gravado acima dele.
+                current["per_minute"] = min(current["per_minute"], max_rate)
+                ewma = current["latency_ewma"]
+                slow = (
+                    latency is not None
+                    and ewma is not None
+                    and current["samples"] >= 5
+                    and latency > ewma * self.latency_factor
+                )
+                congested = status in CONGESTION_STATUSES or slow
+                cut = False
+                if congested:
+                    # Um corte por janela: várias 429 da mesma rajada não derrubam o ritmo a zero.
+                    if now - current["last_decrease"] >= self.cooldown:
+                        current["per_minute"] = max(min_rate, current["per_minute"] * self.decrease_factor)
+                        current["concurrency"] = max(1.0, current["concurrency"] * self.decrease_factor)
+                        current["last_decrease"] = now
+                        cut = True
+                elif status is not None and 200 <= status < 300:
+                    current["per_minute"] = min(max_rate, current["per_minute"] + self.increase)
+                    current["concurrency"] = min(
+                        float(self.max_concurrency),
+                        current["concurrency"] + 1.0 / max(current["concurrency"], 1.0),
+                    )
+                if latency is not None and not slow:
+                    ewma = latency if ewma is None else ewma + self.latency_alpha * (latency - ewma)
+                    current["latency_ewma"] = ewma
+                    current["samples"] += 1
+                self._conn.execute(
+                    """
+                    INSERT INTO adaptive_rates
+                        (account_id, endpoint, per_minute, concurrency, latency_ewma, samples, last_decrease, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(account_id, endpoint) DO UPDATE SET
+                        per_minute = excluded.per_minute,
+                        concurrency = excluded.concurrency,
+                        latency_ewma = excluded.latency_ewma,
+                        samples = excluded.samples,
+                        last_decrease = excluded.last_decrease,
+                        updated_at = excluded.updated_at
+                    """,
+                    (
+                        account_id,
+                        endpoint_class,
+                        current["per_minute"],
+                        current["concurrency"],
+                        current["latency_ewma"],
+                        current["samples"],
+                        current["last_decrease"],
+                        now,
+                    ),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._cache[(account_id, endpoint_class)] = (time.monotonic(), current)
+        if cut:
+            logger.warning(
+                "Ritmo reduzido para %s/%s: %.1f req/min, concorrencia %.1f",
+                account_id,
+                endpoint_class,
+                current["per_minute"],
+                current["concurrency"],
+            )
+        return current, cut
+
+
+class RateLimiter:
+    """Token bucket por (account_id, classe de endpoint) guardado em SQLite.
+
+    O estado fica num arquivo local, então a UI do Streamlit, o cron de
+    convites e o worker de sync dividem o mesmo orçamento por conta quando
+    apontam para o mesmo LINKEDIN_PROSPECT_STORE.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        rates: dict[str, tuple[float, float]] | None = None,
+        adaptive: bool = False,
+        adaptive_options: dict | None = None,
+    ):
+        self.rates = dict(DEFAULT_RATES)
+        if rates:
+            self.rates.update(rates)
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self.controller = None
+        if adaptive:
+            self.controller = AdaptiveController(self._conn, self._lock, **(adaptive_options or {}))
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                account_id TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (account_id, endpoint)
+            )
+            """
+        )
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter | None":
+        if str(os.getenv("UNIPILE_RATE_LIMIT_DISABLED", "")).strip().lower() in {"1", "true", "yes", "on"}:
+            return None
+        rates = {
+            name: parse_rate(os.getenv(f"UNIPILE_RATE_{name.upper()}"), default)
+            for name, default in DEFAULT_RATES.items()
+        }
+        adaptive = str(os.getenv("UNIPILE_ADAPTIVE_DISABLED", "")).strip().lower() not in {"1", "true", "yes", "on"}
+        adaptive_options = {
+            "max_factor": float(os.getenv("UNIPILE_ADAPTIVE_MAX_FACTOR", "3.0")),
+            "max_concurrency": int(os.getenv("UNIPILE_ADAPTIVE_MAX_CONCURRENCY", "8")),
+            # Conta sem histórico começa na concorrência padrão do cliente, não em série.
+            "initial_concurrency": float(os.getenv("UNIPILE_ACCOUNT_CONCURRENCY", "4")),
+        }
+        return cls(
+            path=usable_store_path(),
+            rates=rates,
+            adaptive=adaptive,
+            adaptive_options=adaptive_options,
+        )
+
+    def rate_for(self, account_id: str, endpoint_class: str) -> tuple[float, float]:
+        """Retorna (tokens por segundo, capacidade) da conta/classe."""
+        per_minute, burst = self.rates.get(endpoint_class, self.rates["profile"])
+        if self.controller:
+            per_minute = self.controller.state(account_id, endpoint_class, per_minute)["per_minute"]
+        return per_minute / 60.0, burst
+
+    def concurrency_for(self, account_id: str, endpoint_class: str, default: int) -> int:
+        """Concorrência aprendida para a conta/classe (ou o padrão, sem controle adaptativo)."""
+        if not self.controller:
+            return default
+        per_minute = self.rates.get(endpoint_class, self.rates["profile"])[0]
+        return min(default, self.controller.concurrency(account_id, endpoint_class, per_minute))
+
+    def record(self, account_id: str, endpoint_class: str, status: int | None, latency: float | None = None) -> bool:
+        """Informa o resultado de uma chamada. Retorna True se o ritmo foi cortado.
+
+        Num corte o bucket é esvaziado, então a próxima chamada espera o
+        intervalo do novo ritmo em vez de gastar a rajada acumulada.
+        """
+        if not self.controller:
+            return False
+        per_minute = self.rates.get(endpoint_class, self.rates["profile"])[0]
+        _, cut = self.controller.record(account_id, endpoint_class, per_minute, status, latency)
+        if cut:
+            self.drain(account_id, endpoint_class)
+        return cut
+
+    def drain(self, account_id: str, endpoint_class: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO rate_buckets (account_id, endpoint, tokens, updated_at)
+                VALUES (?, ?, 0, ?)
+                ON CONFLICT(account_id, endpoint)
+                DO UPDATE SET tokens = 0, updated_at = excluded.updated_at
+                """,
+                (account_id, endpoint_class, time.time()),
+            )
+
+    def try_acquire(self, account_id: str, endpoint_class: str, tokens: float = 1.0) -> float:
+        """Tenta consumir tokens. Retorna 0 se conseguiu ou os segundos até haver saldo."""
+        rate, capacity = self.rate_for(account_id, endpoint_class)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM rate_buckets WHERE account_id = ? AND endpoint = ?",
+                    (account_id, endpoint_class),
+                ).fetchone()
+                if row:
+                    level = min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                else:
+                    level = capacity
+                if level >= tokens:
+                    level -= tokens
+                    wait = 0.0
+                else:
+                    wait = (tokens - level) / rate if rate > 0 else 60.0
+                self._conn.execute(
+                    """
+                    INSERT INTO rate_buckets (account_id, endpoint, tokens, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(account_id, endpoint)
+                    DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+                    """,
+                    (account_id, endpoint_class, level, now),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def acquire(self, account_id: str, endpoint_class: str, tokens: float = 1.0) -> float:
+        """Bloqueia até haver saldo no bucket. Retorna o tempo total aguardado."""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(account_id, endpoint_class, tokens)
+            if wait <= 0:
+                return waited
+            logger.debug("Rate limit %s/%s: aguardando %.2fs", account_id, endpoint_class, wait)
+            time.sleep(wait)
+            waited += wait
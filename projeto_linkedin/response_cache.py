@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any
+
+from local_store import connect, usable_store_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTLS = {
+    "profile": 7 * 24 * 3600,
+    # Porte e setor de empresa mudam pouco; um mês evita refazer a mesma empresa.
+    "company": 30 * 24 * 3600,
+}
+DEFAULT_MAX_ENTRIES = {
+    "profile": 50000,
+    "company": 20000,
+}
+
+
+class ResponseCache:
+    """Cache em disco (SQLite) de respostas da Unipile com TTL e despejo LRU.
+
+    Cada namespace ("profile", ...) tem seu próprio TTL e limite de entradas.
+    Ao passar do limite, as entradas lidas há mais tempo são removidas. O
+    despejo roda a cada `evict_every` gravações (por padrão 1% do limite), não
+    em todo set: o COUNT(*) percorre o namespace inteiro.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float,
+        max_entries: int,
+        path: str | None = None,
+        evict_every: int | None = None,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.evict_every = max(1, evict_every if evict_every is not None else self.max_entries // 100)
+        self._writes = 0
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS response_cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS response_cache_lru_idx ON response_cache(namespace, accessed_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS response_cache_ttl_idx ON response_cache(namespace, created_at)"
+        )
+
+    @classmethod
+    def from_env(cls, namespace: str) -> "ResponseCache | None":
+        if str(os.getenv("UNIPILE_CACHE_DISABLED", "")).strip().lower() in {"1", "true", "yes", "on"}:
+            return None
+        prefix = f"UNIPILE_{namespace.upper()}_CACHE"
+        ttl = float(os.getenv(f"{prefix}_TTL", DEFAULT_TTLS.get(namespace, 24 * 3600)))
+        max_entries = int(os.getenv(f"{prefix}_MAX", DEFAULT_MAX_ENTRIES.get(namespace, 10000)))
+        return cls(namespace, ttl, max_entries, path=usable_store_path(os.getenv("UNIPILE_CACHE_PATH") or None))
+
+    def get(self, key: str) -> Any | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM response_cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if not row:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute(
+                    "DELETE FROM response_cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                return None
+            self._conn.execute(
+                "UPDATE response_cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        if value is None:
+            return
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO response_cache (namespace, key, payload, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(namespace, key) DO UPDATE SET
+                    payload = excluded.payload,
+                    created_at = excluded.created_at,
+                    accessed_at = excluded.accessed_at
+                """,
+                (self.namespace, key, payload, now, now),
+            )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict()
+
+    def _evict(self) -> None:
+        self._conn.execute(
+            "DELETE FROM response_cache WHERE namespace = ? AND created_at < ?",
+            (self.namespace, time.time() - self.ttl),
+        )
+        count = self._conn.execute(
+            "SELECT COUNT(*) FROM response_cache WHERE namespace = ?",
+            (self.namespace,),
+        ).fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                """
+                DELETE FROM response_cache WHERE namespace = ? AND key IN (
+                    SELECT key FROM response_cache WHERE namespace = ?
+                    ORDER BY accessed_at ASC LIMIT ?
+                )
+                """,
+                (self.namespace, self.namespace, excess),
+            )
+            logger.debug("Cache %s: %s entradas removidas (LRU)", self.namespace, excess)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache WHERE namespace = ?", (self.namespace,))
+
+
+def profile_cache_key(account_id: str, identifier: str, sections) -> str:
+    """Chave por conta: network_distance, contatos e *_preview dependem de quem buscou o perfil."""
+    if isinstance(sections, str):
+        sections = [sections]
+    return f"{account_id}|{identifier}|{','.join(sorted(sections or []))}"
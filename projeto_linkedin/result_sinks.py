@@ -0,0 +1,184 @@
+import gzip
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # opcional: só o ParquetSink precisa
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Colunas fixas do Parquet; o item completo vai em "raw" (JSON) para não depender do schema da Unipile.
+PARQUET_COLUMNS = (
+    "id",
+    "public_identifier",
+    "name",
+    "first_name",
+    "last_name",
+    "headline",
+    "location",
+    "industry",
+    "profile_url",
+    "network_distance",
+)
+
+
+class ResultSink:
+    """Destino dos resultados da paginação: recebe cada página assim que ela chega.
+
+    write_page(items) pode ser chamado quantas vezes for preciso; close()
+    grava o que estiver pendente e fecha o destino. Use como context manager.
+    """
+
+    def write_page(self, items: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class JsonArraySink(ResultSink):
+    """Um array JSON em disco (formato antigo do script), escrito em streaming."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._handle = open(path, "w", encoding="utf-8")
+        self._handle.write("[\n")
+
+    def write_page(self, items: List[Dict[str, Any]]) -> None:
+        for item in items:
+            if self.count:
+                self._handle.write(",\n")
+            self._handle.write(json.dumps(item, ensure_ascii=False))
+            self.count += 1
+
+    def close(self) -> None:
+        if self._handle.closed:
+            return
+        self._handle.write("\n]\n")
+        self._handle.close()
+
+
+class JsonlSink(ResultSink):
+    """Um item por linha; comprime com gzip quando o caminho termina em .gz."""
+
+    def __init__(self, path: str, compresslevel: int = 6):
+        self.path = path
+        self.count = 0
+        if path.endswith(".gz"):
+            self._handle = gzip.open(path, "wt", encoding="utf-8", compresslevel=compresslevel)
+        else:
+            self._handle = open(path, "w", encoding="utf-8")
+
+    def write_page(self, items: List[Dict[str, Any]]) -> None:
+        for item in items:
+            self._handle.write(json.dumps(item, ensure_ascii=False))
+            self._handle.write("\n")
+        self.count += len(items)
+        self._handle.flush()
+
+    def close(self) -> None:
+        if not self._handle.closed:
+            self._handle.close()
+
+
+class ParquetSink(ResultSink):
+    """Parquet colunar para análise; cada `row_group_size` itens viram um row group.
+
+    Requer pyarrow. Campos de texto conhecidos viram colunas; o item completo
+    fica na coluna "raw" como JSON.
+    """
+
+    def __init__(self, path: str, row_group_size: int = 5000):
+        if pq is None:
+            raise RuntimeError("ParquetSink requer pyarrow (pip install pyarrow).")
+        self.path = path
+        self.row_group_size = max(1, row_group_size)
+        self.count = 0
+        self._schema = pa.schema([(name, pa.string()) for name in PARQUET_COLUMNS + ("raw",)])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._rows: List[Dict[str, Any]] = []
+
+    @staticmethod
+    def _row(item: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        row = {}
+        for name in PARQUET_COLUMNS:
+            value = item.get(name)
+            row[name] = None if value is None else str(value)
+        row["raw"] = json.dumps(item, ensure_ascii=False)
+        return row
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        self._writer.write_table(pa.Table.from_pylist(self._rows, schema=self._schema))
+        self.count += len(self._rows)
+        self._rows = []
+
+    def write_page(self, items: List[Dict[str, Any]]) -> None:
+        self._rows.extend(self._row(item) for item in items)
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        self._flush()
+        self._writer.close()
+        self._writer = None
+
+
+class SupabaseLeadsSink(ResultSink):
+    """Upsert direto na tabela leads, em blocos, pelo mapeamento de DBHandler.save_leads."""
+
+    def __init__(self, db, campaign_id: str, user_id: Optional[str] = None, chunk_size: int = 500):
+        self.db = db
+        self.campaign_id = campaign_id
+        self.user_id = user_id
+        self.chunk_size = max(1, chunk_size)
+        self.count = 0
+        self.failed = 0
+        self._pending: List[Dict[str, Any]] = []
+
+    def _flush(self, partial: bool = True) -> None:
+        while self._pending and (partial or len(self._pending) >= self.chunk_size):
+            chunk = self._pending[: self.chunk_size]
+            report = self.db.save_leads(self.campaign_id, chunk, user_id=self.user_id, chunk_size=self.chunk_size)
+            self._pending = self._pending[self.chunk_size:]
+            self.count += len(chunk)
+            failed = getattr(report, "rows_failed", 0)
+            if failed:
+                self.failed += failed
+                logger.warning("Supabase: %s leads rejeitados neste bloco.", failed)
+            logger.info("Supabase: %s leads enviados para a campanha %s.", self.count, self.campaign_id)
+
+    def write_page(self, items: List[Dict[str, Any]]) -> None:
+        self._pending.extend(items)
+        self._flush(partial=False)
+
+    def close(self) -> None:
+        self._flush()
+
+
+def open_sink(kind: str, output: Optional[str] = None, **options: Any) -> ResultSink:
+    """Cria o sink pelo nome usado na linha de comando (json, jsonl, parquet, supabase)."""
+    if kind == "json":
+        return JsonArraySink(output or "salesnav_results.json")
+    if kind == "jsonl":
+        return JsonlSink(output or "salesnav_results.jsonl.gz")
+    if kind == "parquet":
+        return ParquetSink(output or "salesnav_results.parquet", **options)
+    if kind == "supabase":
+        return SupabaseLeadsSink(**options)
+    raise ValueError(f"Sink desconhecido: {kind}")
@@ -0,0 +1,228 @@
+import logging
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterable
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+# Só sobrecarga/limite é repetido; 4xx de payload, auth ou recurso voltam na hora.
+DEFAULT_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+RESET_HEADERS = ("X-RateLimit-Reset", "RateLimit-Reset", "X-Rate-Limit-Reset")
+# Teto de espera somada entre tentativas, o mesmo para o app, workers e o script de paginação.
+DEFAULT_MAX_TOTAL_WAIT = 300.0
+
+
+def is_connect_failure(exc: BaseException) -> bool:
+    """A conexão nem abriu (timeout de connect, DNS, recusa): a requisição não saiu.
+
+    requests.ConnectionError também cobre reset/abort depois do corpo enviado,
+    quando o convite ou a mensagem pode já ter sido entregue.
+    """
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    seen = set()
+    pending = [exc]
+    while pending:
+        current = pending.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, NewConnectionError):
+            return True
+        pending.append(getattr(current, "reason", None))
+        pending.append(current.__cause__)
+        pending.append(current.__context__)
+        pending.extend(arg for arg in getattr(current, "args", ()) if isinstance(arg, BaseException))
+    return False
+
+
+def max_total_wait_from_env() -> float:
+    return _env_float("UNIPILE_RETRY_MAX_WAIT", DEFAULT_MAX_TOTAL_WAIT)
+
+
+def parse_retry_after(headers, now: float | None = None) -> float | None:
+    """Segundos de espera pedidos pelo servidor (Retry-After ou reset do rate limit).
+
+    Aceita Retry-After em segundos ou data HTTP, e os headers de reset tanto
+    como segundos restantes quanto como epoch.
+    """
+    if not headers:
+        return None
+    now = time.time() if now is None else now
+    value = headers.get("Retry-After")
+    if value:
+        value = str(value).strip()
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+            except (TypeError, ValueError):
+                pass
+    for name in RESET_HEADERS:
+        value = headers.get(name)
+        if not value:
+            continue
+        try:
+            reset = float(value)
+        except ValueError:
+            continue
+        # Valores grandes são epoch; pequenos, segundos até o reset.
+        return max(0.0, reset - now) if reset > 1e9 else max(0.0, reset)
+    return None
+
+
+class RetryPolicy:
+    """Política de retry/backoff única para as chamadas à Unipile.
+
+    - status em retry_statuses são repetidos; qualquer outro erro volta na hora;
+    - Retry-After / headers de reset têm prioridade sobre o backoff exponencial
+      e nunca são encurtados;
+    - max_total_wait limita o tempo total dormindo entre tentativas;
+    - retry_network: "all" repete qualquer erro de rede, "connect" só falhas
+      de conexão (a requisição não chegou a sair), "none" não repete.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        retry_statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        max_total_wait: float = DEFAULT_MAX_TOTAL_WAIT,
+        jitter: float = 0.2,
+        retry_network: str = "all",
+    ):
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_statuses = frozenset(retry_statuses)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_total_wait = max_total_wait
+        self.jitter = jitter
+        self.retry_network = retry_network
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay + random.uniform(0, delay * self.jitter)
+
+    def is_retryable_status(self, status: int) -> bool:
+        return status in self.retry_statuses
+
+    def is_retryable_error(self, exc: Exception) -> bool:
+        if self.retry_network == "all":
+            return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+        if self.retry_network == "connect":
+            return is_connect_failure(exc)
+        return False
+
+    def delay_for(self, attempt: int, response=None, paced: bool = False) -> float:
+        """Espera antes da próxima tentativa.
+
+        paced=True indica que um rate limiter já segura a próxima chamada; sem
+        Retry-After, um 429 não precisa de espera extra. O prazo do servidor é
+        respeitado inteiro (max_delay só limita o backoff); se passar de
+        max_total_wait, run() desiste em vez de tentar antes da hora.
+        """
+        server_delay = parse_retry_after(getattr(response, "headers", None)) if response is not None else None
+        if server_delay is not None:
+            return server_delay
+        if paced and getattr(response, "status_code", None) == 429:
+            return 0.0
+        return self.backoff(attempt)
+
+    def run(
+        self,
+        send: Callable[[], requests.Response],
+        label: str = "",
+        paced: bool = False,
+    ) -> requests.Response:
+        """Executa send() com retries e devolve a última resposta.
+
+        Status fatais ou esgotados voltam para o chamador decidir (ex:
+        raise_for_status); erros de rede não repetíveis são relançados.
+        """
+        waited = 0.0
+        for attempt in range(1, self.max_attempts + 1):
+            last = attempt >= self.max_attempts
+            try:
+                response = send()
+            except requests.RequestException as exc:
+                if last or not self.is_retryable_error(exc):
+                    raise
+                delay = self.delay_for(attempt)
+                reason = f"erro de rede: {exc}"
+                if waited + delay > self.max_total_wait:
+                    raise
+            else:
+                status = response.status_code
+                if last or not self.is_retryable_status(status):
+                    return response
+                delay = self.delay_for(attempt, response, paced=paced)
+                reason = f"status {status}"
+                if waited + delay > self.max_total_wait:
+                    logger.warning(
+                        "%s: %s, espera de %.1fs estouraria o limite de %.0fs. Desistindo.",
+                        label or "Unipile",
+                        reason,
+                        delay,
+                        self.max_total_wait,
+                    )
+                    return response
+                # Libera a conexão de respostas em streaming antes de tentar de novo.
+                close = getattr(response, "close", None)
+                if close:
+                    close()
+            logger.warning(
+                "%s: %s (tentativa %s/%s). Aguardando %.1fs",
+                label or "Unipile",
+                reason,
+                attempt,
+                self.max_attempts,
+                delay,
+            )
+            if delay > 0:
+                time.sleep(delay)
+                waited += delay
+        raise RuntimeError("Max retries exceeded")
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Valor invalido para %s: %s. Usando %s.", name, value, default)
+        return default
+
+
+def default_policies() -> dict[str, RetryPolicy]:
+    """Políticas por classe de endpoint (mesmas classes do rate limiter).
+
+    Convites e mensagens não são idempotentes: só repetem quando a Unipile
+    recusou explicitamente (429) ou a conexão nem abriu, para não duplicar envio.
+    UNIPILE_RETRY_MAX_ATTEMPTS e UNIPILE_RETRY_MAX_WAIT ajustam as leituras.
+    """
+    attempts = int(_env_float("UNIPILE_RETRY_MAX_ATTEMPTS", 4))
+    max_wait = max_total_wait_from_env()
+    read_policy = RetryPolicy(max_attempts=attempts, max_total_wait=max_wait)
+    send_policy = RetryPolicy(
+        max_attempts=3,
+        retry_statuses={429},
+        max_total_wait=max_wait,
+        retry_network="connect",
+    )
+    return {
+        "search": read_policy,
+        "profile": read_policy,
+        "relations": read_policy,
+        "invite": send_policy,
+        "message": send_policy,
+    }
@@ -0,0 +1,154 @@
+import copy
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from salesnav_url import COMPANY_HEADCOUNT_RANGES, SENIORITY_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+# Quantos resultados uma única busca do Sales Navigator deixa paginar.
+SALESNAV_RESULT_CAP = 2500
+
+# Filtro do Sales Navigator -> chave no corpo da busca da Unipile.
+FACET_PARAMS = {
+    "REGION": "location",
+    "SENIORITY_LEVEL": "seniority",
+    "COMPANY_HEADCOUNT": "company_headcount",
+    "INDUSTRY": "industry",
+}
+# Ordem padrão de divisão: do filtro que costuma separar mais para o que separa menos.
+DEFAULT_FACETS = ("REGION", "SENIORITY_LEVEL", "COMPANY_HEADCOUNT", "INDUSTRY")
+# Valores conhecidos de antemão; região e indústria só dividem o que a busca já inclui
+# (ou o que vier em `candidates`).
+KNOWN_FACET_VALUES = {
+    "SENIORITY_LEVEL": list(SENIORITY_OPTIONS),
+    "COMPANY_HEADCOUNT": [dict(v) for v in COMPANY_HEADCOUNT_RANGES.values()],
+}
+
+
+class Shard:
+    """Uma sub-busca disjunta: params da Unipile, total estimado e filtros ainda divisíveis."""
+
+    def __init__(self, params: Dict[str, Any], facets: Sequence[str] = (), total: Optional[int] = None):
+        self.params = params
+        self.facets = tuple(facets)
+        self.total = total
+
+    @property
+    def key(self) -> str:
+        return shard_key(self.params)
+
+    def __repr__(self) -> str:
+        return f"Shard(total={self.total}, params={self.params!r})"
+
+
+def shard_key(params: Dict[str, Any]) -> str:
+    """Identificador estável de uma sub-busca (para nomear checkpoints)."""
+    raw = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def facet_values(params: Dict[str, Any], facet: str, candidates: Optional[Iterable[Any]] = None) -> List[Any]:
+    """Valores pelos quais `params` pode ser dividido no filtro `facet`.
+
+    Se a busca já inclui vários valores, divide entre eles. Se o filtro não é
+    usado, divide pelos candidatos (explícitos ou KNOWN_FACET_VALUES), tirando
+    os excluídos. Um único valor incluído não divide mais nada.
+    """
+    key = FACET_PARAMS[facet]
+    current = params.get(key)
+    if facet == "COMPANY_HEADCOUNT":
+        if current:
+            return list(current) if len(current) > 1 else []
+        return list(candidates if candidates is not None else KNOWN_FACET_VALUES[facet])
+    current = current or {}
+    include = current.get("include") or []
+    if include:
+        return list(include) if len(include) > 1 else []
+    if candidates is None:
+        candidates = KNOWN_FACET_VALUES.get(facet, [])
+    exclude = set(current.get("exclude") or [])
+    return [value for value in candidates if value not in exclude]
+
+
+def split_params(params: Dict[str, Any], facet: str, values: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Uma cópia de `params` por valor, restrita a esse valor no filtro."""
+    key = FACET_PARAMS[facet]
+    shards = []
+    for value in values:
+        child = copy.deepcopy(params)
+        if facet == "COMPANY_HEADCOUNT":
+            child[key] = [copy.deepcopy(value)]
+        else:
+            bucket = dict(child.get(key) or {})
+            bucket["include"] = [value]
+            bucket.pop("exclude", None)
+            child[key] = bucket
+        shards.append(child)
+    return shards
+
+
+def plan_shards(
+    search_params: Dict[str, Any],
+    probe: Callable[[Dict[str, Any]], Optional[int]],
+    cap: int = SALESNAV_RESULT_CAP,
+    facets: Sequence[str] = DEFAULT_FACETS,
+    candidates: Optional[Dict[str, Iterable[Any]]] = None,
+    max_workers: int = 4,
+) -> List[Shard]:
+    """Divide uma busca em sub-buscas disjuntas que caibam no teto de resultados.
+
+    probe(params) devolve o total estimado (paging.total_count) de uma busca.
+    Cada sub-busca acima de `cap` é dividida de novo pelo próximo filtro de
+    `facets`, até caber ou acabarem os filtros (nesse caso ela fica como está
+    e só os primeiros `cap` resultados serão alcançados). Os probes de um mesmo
+    nível rodam em paralelo; o ritmo por conta fica com quem implementa probe.
+
+    Dividir por um filtro que a busca não usa deixa de fora quem não tem valor
+    nele (ex: perfis sem senioridade), então só se divide quando necessário.
+    """
+    candidates = candidates or {}
+    pending = [Shard(copy.deepcopy(search_params), facets)]
+    done: List[Shard] = []
+    # Cada nível é resolvido por inteiro antes do próximo: nenhum probe espera outro no pool.
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        while pending:
+            totals = list(pool.map(probe, [shard.params for shard in pending]))
+            next_level: List[Shard] = []
+            for shard, total in zip(pending, totals):
+                shard.total = total
+                if total is None or total <= cap:
+                    # Sub-busca vazia não vale uma paginação; sem total, roda mesmo assim.
+                    if total != 0:
+                        done.append(shard)
+                    continue
+                children = _split_shard(shard, candidates)
+                if not children:
+                    logger.warning(
+                        "Sub-busca com %s resultados não pode mais ser dividida; só %s serão alcançados.",
+                        total,
+                        cap,
+                    )
+                    done.append(shard)
+                    continue
+                next_level.extend(children)
+            pending = next_level
+    logger.info(
+        "Busca dividida em %s sub-buscas (total estimado %s).",
+        len(done),
+        sum(shard.total or 0 for shard in done),
+    )
+    return done
+
+
+def _split_shard(shard: Shard, candidates: Dict[str, Iterable[Any]]) -> List[Shard]:
+    facets = list(shard.facets)
+    while facets:
+        facet = facets.pop(0)
+        values = facet_values(shard.params, facet, candidates.get(facet))
+        if len(values) > 1:
+            return [Shard(params, facets) for params in split_params(shard.params, facet, values)]
+    return []
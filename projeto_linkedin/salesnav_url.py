@@ -0,0 +1,344 @@
+import re
+from urllib.parse import parse_qs, unquote_plus, urlparse
+
+SENIORITY_OPTIONS = [
+    "owner/partner",
+    "cxo",
+    "vice_president",
+    "director",
+    "experienced_manager",
+    "entry_level_manager",
+    "strategic",
+    "senior",
+    "entry_level",
+    "in_training",
+]
+NETWORK_OPTIONS = [1, 2, 3, "GROUP"]
+# Faixas de funcionários do filtro COMPANY_HEADCOUNT (ids da URL do Sales Navigator).
+COMPANY_HEADCOUNT_RANGES = {
+    "B": {"min": 1, "max": 10},
+    "C": {"min": 11, "max": 50},
+    "D": {"min": 51, "max": 200},
+    "E": {"min": 201, "max": 500},
+    "F": {"min": 501, "max": 1000},
+    "G": {"min": 1001, "max": 5000},
+    "H": {"min": 5001, "max": 10000},
+    "I": {"min": 10001},
+}
+
+def decode_salesnav_value(value: str) -> str:
+    if not value:
+        return ""
+    decoded = unquote_plus(value)
+    if "%" in decoded:
+        decoded = unquote_plus(decoded)
+    return decoded
+
+def strip_wrapping_parens(value: str) -> str:
+    if not value:
+        return ""
+    value = value.strip()
+    if len(value) >= 2 and value[0] == "(" and value[-1] == ")":
+        return value[1:-1]
+    return value
+
+def split_top_level(text: str, delimiter: str = ",") -> list[str]:
+    if not text:
+        return []
+    parts = []
+    depth = 0
+    current = []
+    for ch in text:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            if depth > 0:
+                depth -= 1
+        if ch == delimiter and depth == 0:
+            part = "".join(current).strip()
+            if part:
+                parts.append(part)
+            current = []
+        else:
+            current.append(ch)
+    part = "".join(current).strip()
+    if part:
+        parts.append(part)
+    return parts
+
+def parse_top_level_pairs(text: str) -> dict[str, str]:
+    pairs: dict[str, str] = {}
+    for part in split_top_level(text):
+        if ":" not in part:
+            continue
+        key, value = part.split(":", 1)
+        pairs[key.strip()] = value.strip()
+    return pairs
+
+def extract_list_block(text: str, marker: str) -> str | None:
+    idx = text.find(marker)
+    if idx == -1:
+        return None
+    start = idx + len(marker)
+    if start >= len(text):
+        return None
+    depth = 1
+    for i in range(start, len(text)):
+        ch = text[i]
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return text[start:i]
+    return None
+
+def parse_salesnav_filters(filters_text: str) -> dict[str, dict[str, list[str]]]:
+    if not filters_text:
+        return {}
+    list_block = extract_list_block(filters_text, "List(")
+    if list_block is None:
+        return {}
+    items = split_top_level(list_block)
+    filters: dict[str, dict[str, list[str]]] = {}
+    for item in items:
+        item = strip_wrapping_parens(item)
+        if not item:
+            continue
+        pairs = parse_top_level_pairs(item)
+        filter_type = pairs.get("type")
+        values_text = pairs.get("values")
+        if not filter_type or not values_text:
+            continue
+        values_block = extract_list_block(values_text, "List(")
+        if values_block is None:
+            continue
+        value_items = split_top_level(values_block)
+        for value_item in value_items:
+            value_item = strip_wrapping_parens(value_item)
+            if not value_item:
+                continue
+            value_pairs = parse_top_level_pairs(value_item)
+            raw_value = value_pairs.get("id") or value_pairs.get("text")
+            if not raw_value:
+                continue
+            selection = (value_pairs.get("selectionType") or value_pairs.get("selection") or "INCLUDED").upper()
+            bucket = "exclude" if selection == "EXCLUDED" else "include"
+            decoded_value = decode_salesnav_value(raw_value)
+            if not decoded_value:
+                continue
+            entry = filters.setdefault(filter_type, {"include": [], "exclude": []})
+            if decoded_value not in entry[bucket]:
+                entry[bucket].append(decoded_value)
+    return filters
+
+def parse_salesnav_url(search_url: str) -> dict:
+    extracted = {
+        "keywords": "",
+        "saved_search_id": "",
+        "recent_search_id": "",
+        "filters": {},
+    }
+    if not search_url:
+        return extracted
+    try:
+        parsed = urlparse(search_url)
+    except Exception:
+        parsed = None
+    params = parse_qs(parsed.query) if parsed else {}
+    query_value = params.get("query", [""])[0] if params else ""
+    query_text = ""
+    if query_value:
+        query_text = unquote_plus(query_value)
+    elif search_url.strip().startswith("("):
+        query_text = search_url.strip()
+    else:
+        match = re.search(r"query=([^&]+)", search_url)
+        if match:
+            query_text = unquote_plus(match.group(1))
+    if not query_text:
+        return extracted
+    query_text = strip_wrapping_parens(query_text)
+    pairs = parse_top_level_pairs(query_text)
+    keywords_value = (
+        pairs.get("keywords")
+        or pairs.get("keyword")
+        or (params.get("keywords", [""])[0] if params else "")
+    )
+    if keywords_value:
+        extracted["keywords"] = decode_salesnav_value(keywords_value)
+    saved_search_value = (
+        pairs.get("savedSearchId")
+        or pairs.get("saved_search_id")
+        or (params.get("savedSearchId", [""])[0] if params else "")
+        or (params.get("saved_search_id", [""])[0] if params else "")
+    )
+    if saved_search_value:
+        extracted["saved_search_id"] = decode_salesnav_value(saved_search_value)
+    recent_search_value = (
+        pairs.get("recentSearchId")
+        or pairs.get("recent_search_id")
+        or (params.get("recentSearchId", [""])[0] if params else "")
+        or (params.get("recent_search_id", [""])[0] if params else "")
+    )
+    if recent_search_value:
+        extracted["recent_search_id"] = decode_salesnav_value(recent_search_value)
+    filters_value = pairs.get("filters")
+    if filters_value:
+        extracted["filters"] = parse_salesnav_filters(filters_value)
+    return extracted
+
+def dedupe_values(values: list[str]) -> list[str]:
+    seen = set()
+    ordered = []
+    for value in values:
+        if value in seen:
+            continue
+        seen.add(value)
+        ordered.append(value)
+    return ordered
+
+def map_seniority_values(values: list[str]) -> list[str]:
+    lookup = {re.sub(r"[^a-z0-9/]+", "_", opt.lower()).strip("_"): opt for opt in SENIORITY_OPTIONS}
+    lookup.update(
+        {
+            "owner": "owner/partner",
+            "partner": "owner/partner",
+            "owner_partner": "owner/partner",
+            "vp": "vice_president",
+            "vicepresident": "vice_president",
+            "vice_president": "vice_president",
+            "cxo": "cxo",
+            "c_level": "cxo",
+            "clevel": "cxo",
+            "entry_level": "entry_level",
+            "entrylevel": "entry_level",
+            "in_training": "in_training",
+            "training": "in_training",
+        }
+    )
+    mapped = []
+    for raw in values:
+        if not raw:
+            continue
+        norm = re.sub(r"[^a-z0-9/]+", "_", raw.lower()).strip("_")
+        option = lookup.get(norm)
+        if option and option not in mapped:
+            mapped.append(option)
+    return mapped
+
+def map_network_values(values: list[str]) -> list:
+    mapped = []
+    for raw in values:
+        if raw is None:
+            continue
+        text = str(raw).strip()
+        if not text:
+            continue
+        upper = text.upper()
+        if upper.endswith("+") and upper[:-1].isdigit():
+            upper = upper[:-1]
+        if upper.isdigit():
+            num = int(upper)
+            if num in (1, 2, 3) and num not in mapped:
+                mapped.append(num)
+            continue
+        if "GROUP" in upper or upper == "G":
+            if "GROUP" not in mapped:
+                mapped.append("GROUP")
+            continue
+        if "FIRST" in upper or upper in {"1ST", "1ST_DEGREE"}:
+            if 1 not in mapped:
+                mapped.append(1)
+        elif "SECOND" in upper or upper in {"2ND", "2ND_DEGREE"}:
+            if 2 not in mapped:
+                mapped.append(2)
+        elif "THIRD" in upper or upper in {"3RD", "3RD_DEGREE"}:
+            if 3 not in mapped:
+                mapped.append(3)
+    return mapped
+
+def build_salesnav_field_values(extracted: dict) -> dict:
+    filters = extracted.get("filters", {}) if isinstance(extracted, dict) else {}
+    def collect(filter_types: list[str]) -> list[str]:
+        values = []
+        for f_type in filter_types:
+            info = filters.get(f_type, {})
+            values.extend(info.get("include", []))
+        return dedupe_values(values)
+
+    region_ids = collect(["GEOGRAPHY", "REGION", "LOCATION"])
+    industry_ids = collect(["INDUSTRY", "SALES_INDUSTRY"])
+    company_vals = collect(["CURRENT_COMPANY", "COMPANY"])
+    role_vals = collect(["TITLE", "JOB_TITLE", "CURRENT_TITLE", "ROLE"])
+    function_ids = collect(["FUNCTION", "DEPARTMENT"])
+    seniority_vals = collect(["SENIORITY_LEVEL", "SENIORITY"])
+    network_vals = collect(["NETWORK_DISTANCE", "NETWORK"])
+
+    return {
+        "keywords": extracted.get("keywords") or "",
+        "region_ids": ", ".join(region_ids),
+        "industry_ids": ", ".join(industry_ids),
+        "company_vals": ", ".join(company_vals),
+        "role_vals": ", ".join(role_vals),
+        "function_ids": ", ".join(function_ids),
+        "seniority": map_seniority_values(seniority_vals),
+        "network": map_network_values(network_vals),
+        "saved_search_id": extracted.get("saved_search_id") or "",
+        "recent_search_id": extracted.get("recent_search_id") or "",
+    }
+
+def map_company_headcount_values(values: list[str]) -> list[dict]:
+    mapped = []
+    for raw in values:
+        bucket = COMPANY_HEADCOUNT_RANGES.get(str(raw).strip().upper())
+        if bucket and bucket not in mapped:
+            mapped.append(dict(bucket))
+    return mapped
+
+def salesnav_search_params(extracted: dict) -> dict:
+    """Monta o corpo de busca da Unipile (sales_navigator) a partir de parse_salesnav_url."""
+    if not isinstance(extracted, dict):
+        return {}
+    if extracted.get("saved_search_id"):
+        return {"saved_search_id": extracted["saved_search_id"]}
+    filters = extracted.get("filters", {})
+
+    def bucket(filter_types: list[str]) -> dict:
+        include, exclude = [], []
+        for f_type in filter_types:
+            info = filters.get(f_type, {})
+            include.extend(info.get("include", []))
+            exclude.extend(info.get("exclude", []))
+        values = {}
+        if include:
+            values["include"] = dedupe_values(include)
+        if exclude:
+            values["exclude"] = dedupe_values(exclude)
+        return values
+
+    params: dict = {}
+    if extracted.get("keywords"):
+        params["keywords"] = extracted["keywords"]
+    for key, filter_types in (
+        ("location", ["GEOGRAPHY", "REGION", "LOCATION"]),
+        ("industry", ["INDUSTRY", "SALES_INDUSTRY"]),
+        ("company", ["CURRENT_COMPANY", "COMPANY"]),
+        ("role", ["TITLE", "JOB_TITLE", "CURRENT_TITLE", "ROLE"]),
+        ("function", ["FUNCTION", "DEPARTMENT"]),
+    ):
+        values = bucket(filter_types)
+        if values:
+            params[key] = values
+    seniority = bucket(["SENIORITY_LEVEL", "SENIORITY"])
+    seniority = {k: map_seniority_values(v) for k, v in seniority.items()}
+    seniority = {k: v for k, v in seniority.items() if v}
+    if seniority:
+        params["seniority"] = seniority
+    headcount = map_company_headcount_values(bucket(["COMPANY_HEADCOUNT"]).get("include", []))
+    if headcount:
+        params["company_headcount"] = headcount
+    network = map_network_values(bucket(["NETWORK_DISTANCE", "NETWORK"]).get("include", []))
+    if network:
+        params["network_distance"] = network
+    return params
@@ -0,0 +1,121 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ACTION_INVITE = "invite"
+ACTION_MESSAGE = "message"
+WINDOW_DAYS = 7
+
+
+def _env_limit(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def default_limits() -> Dict[str, Dict[str, int]]:
+    """Limites por conta e ação (0 desliga). Mesmas variáveis do cron."""
+    return {
+        ACTION_INVITE: {
+            "daily": _env_limit("INVITE_DAILY_LIMIT", 40),
+            "weekly": _env_limit("INVITE_WEEKLY_LIMIT", 190),
+        },
+        ACTION_MESSAGE: {
+            "daily": _env_limit("MESSAGE_DAILY_LIMIT", 150),
+            "weekly": _env_limit("MESSAGE_WEEKLY_LIMIT", 0),
+        },
+    }
+
+
+def utc_today() -> str:
+    return datetime.utcnow().date().isoformat()
+
+
+class SendCounters:
+    """Contadores de envio por conta Unipile, dia (UTC) e ação, na tabela account_send_counters.
+
+    record() soma um envio pela RPC increment_send_counter (insert ... on conflict,
+    atômico entre cron, UI e sync). usage() lê no máximo WINDOW_DAYS linhas da
+    conta, pela chave primária, em vez de contar invite_schedules inteiro.
+    Falhas de leitura/gravação viram log e não travam o envio, como o antigo
+    check_weekly_limit.
+    """
+
+    def __init__(self, supabase, limits: Optional[Dict[str, Dict[str, int]]] = None, user_id: Optional[str] = None):
+        self.supabase = supabase
+        self.limits = limits if limits is not None else default_limits()
+        self.user_id = user_id
+
+    def record(self, account_id: str, action: str, amount: int = 1) -> Optional[int]:
+        """Soma `amount` envios de hoje; devolve o total do dia (None se falhar)."""
+        if not account_id or amount <= 0:
+            return None
+        params: Dict[str, Any] = {
+            "p_account_id": account_id,
+            "p_action": action,
+            "p_amount": amount,
+            "p_day": utc_today(),
+            "p_user_id": self.user_id,
+        }
+        try:
+            data = self.supabase.rpc("increment_send_counter", params).execute().data
+        except Exception as e:
+            logger.warning("Falha ao registrar envio (%s, %s): %s", account_id, action, e)
+            return None
+        if isinstance(data, list):
+            data = data[0] if data else None
+        if isinstance(data, dict):
+            data = next(iter(data.values()), None)
+        return int(data) if data is not None else None
+
+    def usage(self, account_id: str, action: str, days: int = WINDOW_DAYS) -> Dict[str, int]:
+        """Envios de hoje ("day") e da janela móvel de `days` dias, incluindo hoje ("window")."""
+        today = datetime.utcnow().date()
+        start = (today - timedelta(days=max(1, days) - 1)).isoformat()
+        rows = (
+            self.supabase.table("account_send_counters")
+            .select("day,count")
+            .eq("account_id", account_id)
+            .eq("action", action)
+            .gte("day", start)
+            .execute()
+            .data
+            or []
+        )
+        today_str = today.isoformat()
+        return {
+            "day": sum(int(row.get("count") or 0) for row in rows if str(row.get("day")) == today_str),
+            "window": sum(int(row.get("count") or 0) for row in rows),
+        }
+
+    def remaining(self, account_id: str, action: str) -> Optional[int]:
+        """Quantos envios ainda cabem hoje (None = sem limite configurado ou leitura falhou)."""
+        limits = self.limits.get(action) or {}
+        daily = limits.get("daily") or 0
+        weekly = limits.get("weekly") or 0
+        if not daily and not weekly:
+            return None
+        try:
+            used = self.usage(account_id, action)
+        except Exception as e:
+            logger.warning("Falha ao ler contadores de envio (%s, %s): %s", account_id, action, e)
+            return None
+        left = []
+        if daily:
+            left.append(daily - used["day"])
+        if weekly:
+            left.append(weekly - used["window"])
+        remaining = max(0, min(left))
+        logger.info(
+            "Conta %s (%s): hoje %s/%s, %s dias %s/%s, restam %s",
+            account_id,
+            action,
+            used["day"],
+            daily or "-",
+            WINDOW_DAYS,
+            used["window"],
+            weekly or "-",
+            remaining,
+        )
+        return remaining
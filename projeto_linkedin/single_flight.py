@@ -0,0 +1,64 @@
+import copy
+import threading
+from typing import Any, Callable, Hashable
+
+
+def freeze(value: Any) -> Hashable:
+    """Transforma params (dicts/listas) numa chave hashable e estável."""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesce chamadas idênticas em voo: só a primeira executa, as demais esperam.
+
+    Quem chega enquanto a chamada está em andamento recebe uma cópia do
+    resultado (ou a mesma exceção). Terminada a chamada, a chave é liberada;
+    não é um cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Cada chamador recebe seu próprio objeto para poder alterá-lo à vontade.
+            return copy.deepcopy(call.result)
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+# Compartilhado por todos os clientes do processo (várias sessões do Streamlit).
+shared_flight = SingleFlight()
@@ -0,0 +1,40 @@
+from typing import Any, Callable, Dict, Iterator, List
+
+# Abaixo do max-rows padrão do PostgREST (1000), para a página nunca vir truncada.
+DEFAULT_PAGE_SIZE = 1000
+
+
+def iter_keyset_pages(
+    make_query: Callable[[], Any],
+    page_size: int = DEFAULT_PAGE_SIZE,
+    key: str = "id",
+) -> Iterator[List[Dict[str, Any]]]:
+    """Lê uma tabela em páginas por keyset (key > última chave vista), ordenado por `key`.
+
+    make_query() deve devolver um builder novo a cada chamada, já com
+    select/filtros (ex: lambda: sb.table("leads").select("*").eq(...)), e o
+    select precisa incluir `key`. Diferente de offset, cada página custa o
+    mesmo no banco. Para só quando uma página vem vazia, então um max-rows do
+    PostgREST menor que page_size não corta a leitura.
+    """
+    page_size = max(1, page_size)
+    last = None
+    while True:
+        query = make_query()
+        if last is not None:
+            query = query.gt(key, last)
+        rows = query.order(key).limit(page_size).execute().data or []
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][key]
+
+
+def iter_keyset(
+    make_query: Callable[[], Any],
+    page_size: int = DEFAULT_PAGE_SIZE,
+    key: str = "id",
+) -> Iterator[Dict[str, Any]]:
+    """Mesmo que iter_keyset_pages, linha a linha."""
+    for rows in iter_keyset_pages(make_query, page_size=page_size, key=key):
+        yield from rows
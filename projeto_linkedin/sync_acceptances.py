@@ -7,11 +7,20 @@ from typing import Iterable
 from supabase import create_client
 
 from unipile_client import UnipileClient
+from rate_limiter import RateLimiter
+from dedup_index import HashedKeySet
+from lead_columns import lead_select
+from send_counters import ACTION_MESSAGE, SendCounters
+from supabase_utils import DEFAULT_PAGE_SIZE, iter_keyset
 from message_utils import render_message
 
 
 DEFAULT_UNIPILE_BASE_URL = "https://api26.unipile.com:15609"
 DEFAULT_TEMPLATE = "Ola {first_name}!"
+# Só os identificadores usados no cruzamento; o resto de cada item nem é decodificado.
+INVITE_SENT_FIELDS = ("invited_user_public_id", "invited_user_id")
+RELATION_FIELDS = ("public_identifier", "member_id")
+LEAD_PAGE_SIZE = int(os.getenv("LEADS_PAGE_SIZE", str(DEFAULT_PAGE_SIZE)))
 
 
 def parse_bool(value: str | None, default: bool = False) -> bool:
@@ -32,7 +41,7 @@ def iter_invite_sent(
     cursor = None
     seen = set()
     while True:
-        res = unipile.list_invitations_sent(account_id, limit=limit, cursor=cursor) or {}
+        res = unipile.list_invitations_sent(account_id, limit=limit, cursor=cursor, fields=INVITE_SENT_FIELDS) or {}
         items = res.get("items") or []
         for item in items:
             yield item
@@ -50,7 +59,7 @@ def iter_relations(
     cursor = None
     seen = set()
     while True:
-        res = unipile.list_relations(account_id, limit=limit, cursor=cursor) or {}
+        res = unipile.list_relations(account_id, limit=limit, cursor=cursor, fields=RELATION_FIELDS) or {}
         items = res.get("items") or []
         for item in items:
             yield item
@@ -60,9 +69,9 @@ def iter_relations(
         seen.add(cursor)
 
 
-def build_pending_sets(items: Iterable[dict]) -> tuple[set[str], set[str]]:
-    pending_public_ids: set[str] = set()
-    pending_member_ids: set[str] = set()
+def build_pending_sets(items: Iterable[dict]) -> tuple[HashedKeySet, HashedKeySet]:
+    pending_public_ids = HashedKeySet()
+    pending_member_ids = HashedKeySet()
     for item in items:
         public_id = item.get("invited_user_public_id")
         member_id = item.get("invited_user_id")
@@ -73,9 +82,10 @@ def build_pending_sets(items: Iterable[dict]) -> tuple[set[str], set[str]]:
     return pending_public_ids, pending_member_ids
 
 
-def build_relation_sets(items: Iterable[dict]) -> tuple[set[str], set[str]]:
-    relation_public_ids: set[str] = set()
-    relation_member_ids: set[str] = set()
+def build_relation_sets(items: Iterable[dict]) -> tuple[HashedKeySet, HashedKeySet]:
+    # Contas grandes têm dezenas de milhares de conexões: guardamos só hashes de 64 bits.
+    relation_public_ids = HashedKeySet()
+    relation_member_ids = HashedKeySet()
     for item in items:
         public_id = item.get("public_identifier")
         member_id = item.get("member_id")
@@ -88,10 +98,10 @@ def build_relation_sets(items: Iterable[dict]) -> tuple[set[str], set[str]]:
 
 def lead_is_accepted(
     lead: dict,
-    relation_public_ids: set[str],
-    relation_member_ids: set[str],
-    pending_public_ids: set[str],
-    pending_member_ids: set[str],
+    relation_public_ids: HashedKeySet,
+    relation_member_ids: HashedKeySet,
+    pending_public_ids: HashedKeySet,
+    pending_member_ids: HashedKeySet,
 ) -> bool:
     public_id = lead.get("linkedin_public_id") or lead.get("public_identifier")
     member_id = lead.get("provider_id") or lead.get("id")
@@ -161,6 +171,8 @@ def run() -> None:
     delay_min = max(0.0, args.delay_min)
     delay_max = max(delay_min, args.delay_max)
     total_messages_sent = 0
+    rate_limiter = RateLimiter.from_env()
+    counters = SendCounters(supabase)
 
     for account in accounts:
         account_db_id = account.get("id")
@@ -171,11 +183,13 @@ def run() -> None:
             print(f"[{label}] Skipping account with missing credentials.")
             continue
 
-        unipile = UnipileClient(args.unipile_base_url, api_key)
-        pending_public_ids: set[str] = set()
-        pending_member_ids: set[str] = set()
-        relation_public_ids: set[str] = set()
-        relation_member_ids: set[str] = set()
+        unipile = UnipileClient(args.unipile_base_url, api_key, rate_limiter=rate_limiter)
+        # Limite diário/semanal de mensagens desta conta (MESSAGE_DAILY_LIMIT / MESSAGE_WEEKLY_LIMIT).
+        message_budget = counters.remaining(account_id, ACTION_MESSAGE) if do_send and not args.dry_run else None
+        pending_public_ids = HashedKeySet()
+        pending_member_ids = HashedKeySet()
+        relation_public_ids = HashedKeySet()
+        relation_member_ids = HashedKeySet()
         if do_sync:
             pending_items = iter_invite_sent(unipile, account_id, limit=100)
             pending_public_ids, pending_member_ids = build_pending_sets(pending_items)
@@ -199,15 +213,19 @@ def run() -> None:
             template = campaign.get("message_template") or DEFAULT_TEMPLATE
             if not campaign_id:
                 continue
-            lead_query = supabase.table("leads").select("*").eq("campaign_id", campaign_id)
-            if do_sync:
-                lead_query = lead_query.in_("invitation_status", ["sent", "accepted"])
-            else:
-                lead_query = lead_query.eq("invitation_status", "accepted")
-            leads = lead_query.execute().data or []
+            # Identificadores, status e os campos que o template usa; sem bio/enrichment_data.
+            lead_columns = lead_select("sync", template=template)
+
+            def lead_query(campaign_id=campaign_id, lead_columns=lead_columns):
+                query = supabase.table("leads").select(lead_columns).eq("campaign_id", campaign_id)
+                if do_sync:
+                    return query.in_("invitation_status", ["sent", "accepted"])
+                return query.eq("invitation_status", "accepted")
+
             accepted_updates: list[dict] = []
             accepted_leads: list[dict] = []
-            for lead in leads:
+            # Paginado por keyset: campanhas grandes passam do max-rows do PostgREST.
+            for lead in iter_keyset(lead_query, page_size=LEAD_PAGE_SIZE):
                 status = lead.get("invitation_status")
                 if status == "sent" and do_sync:
                     if lead_is_accepted(
@@ -248,6 +266,9 @@ def run() -> None:
             for lead in accepted_leads:
                 if total_messages_sent >= max_messages and max_messages > 0:
                     break
+                if message_budget is not None and message_budget <= 0:
+                    print(f"[{label}] Message limit reached for this account; remaining leads wait for the next run.")
+                    break
                 lead_id = lead.get("id")
                 if lead_id in already_sent_ids:
                     continue
@@ -283,6 +304,9 @@ def run() -> None:
                             "error_message": None,
                         }
                     ).execute()
+                    counters.record(account_id, ACTION_MESSAGE)
+                    if message_budget is not None:
+                        message_budget -= 1
                     total_messages_sent += 1
                 except Exception as exc:
                     if not args.dry_run:
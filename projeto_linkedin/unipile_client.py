@@ -1,52 +1,218 @@
+import asyncio
+import copy
+import functools
+import os
 import requests
+import threading
 import time
 import logging
-from typing import Dict, List, Optional, Union
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import RateLimiter, classify_endpoint
+from response_cache import ResponseCache, profile_cache_key
+from retry_policy import RetryPolicy, default_policies
+from json_stream import decode_projected_page
+from single_flight import SingleFlight, freeze, shared_flight
+
+# Classe de rate limit de cada método, usada pelo limite adaptativo do cliente async.
+ASYNC_METHOD_CLASSES = {
+    "search_people": "search",
+    "search_from_url": "search",
+    "list_search_parameters": "search",
+    "get_profile_details": "profile",
+    "get_company_details": "profile",
+    "get_user_posts": "profile",
+    "start_chat": "message",
+    "send_message_in_chat": "message",
+    "send_invitation": "invite",
+    "list_invitations_sent": "relations",
+    "list_relations": "relations",
+}
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+DEFAULT_POOL_CONNECTIONS = int(os.getenv("UNIPILE_POOL_CONNECTIONS", "4"))
+DEFAULT_POOL_MAXSIZE = int(os.getenv("UNIPILE_POOL_MAXSIZE", "10"))
+DEFAULT_ACCOUNT_CONCURRENCY = int(os.getenv("UNIPILE_ACCOUNT_CONCURRENCY", "4"))
+# Fim da lista em get_profiles_bulk (None pode vir na própria lista de identificadores).
+_NO_MORE = object()
+
+
+def build_session(pool_connections: int = DEFAULT_POOL_CONNECTIONS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> requests.Session:
+    """Cria uma sessão HTTP com pool de conexões keep-alive.
+
+    pool_connections: quantos hosts distintos ficam com pool em cache.
+    pool_maxsize: conexões simultâneas mantidas por host.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 class UnipileClient:
-    def __init__(self, base_url: str, api_key: str):
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        session: requests.Session | None = None,
+        rate_limiter: RateLimiter | None = None,
+        profile_cache: ResponseCache | None = None,
+        company_cache: ResponseCache | None = None,
+        retry_policies: dict[str, RetryPolicy] | None = None,
+        single_flight: SingleFlight | None = shared_flight,
+    ):
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
-        self.last_status = None
-        self.last_error_status = None
-        self.last_error_response = None
+        # Uma única sessão por cliente: reaproveita TCP/TLS entre chamadas.
+        self.session = session or build_session(pool_connections, pool_maxsize)
+        self.rate_limiter = rate_limiter
+        self.profile_cache = profile_cache
+        self.company_cache = company_cache
+        # Política de retry por classe de endpoint (search/profile/invite/message/relations).
+        self.retry_policies = {**default_policies(), **(retry_policies or {})}
+        # GETs idênticos em voo (mesma chave, endpoint e params) viram uma requisição só.
+        self.single_flight = single_flight
+        # Status da última resposta por thread: workers do get_profiles_bulk
+        # e do cliente async não sobrescrevem o que a thread chamadora lê.
+        self._local = threading.local()
         self.headers = {
             "accept": "application/json",
             "content-type": "application/json",
             "X-API-KEY": self.api_key
         }
 
-    def _request(self, method: str, endpoint: str, params: dict = None, json_data: dict = None, max_retries: int = 3):
+    @property
+    def last_status(self):
+        return getattr(self._local, "last_status", None)
+
+    @last_status.setter
+    def last_status(self, value):
+        self._local.last_status = value
+
+    @property
+    def last_error_status(self):
+        return getattr(self._local, "last_error_status", None)
+
+    @last_error_status.setter
+    def last_error_status(self, value):
+        self._local.last_error_status = value
+
+    @property
+    def last_error_response(self):
+        return getattr(self._local, "last_error_response", None)
+
+    @last_error_response.setter
+    def last_error_response(self, value):
+        self._local.last_error_response = value
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _throttle(self, endpoint: str, account_id: str | None):
+        """Consome um token do bucket compartilhado da conta antes de chamar a API."""
+        if self.rate_limiter and account_id:
+            self.rate_limiter.acquire(str(account_id), classify_endpoint(endpoint))
+
+    def _record(self, endpoint: str, account_id: str | None, status: int | None, latency: float | None) -> bool:
+        """Alimenta o controle adaptativo (AIMD). Retorna True se o ritmo foi cortado."""
+        if self.rate_limiter and account_id:
+            return self.rate_limiter.record(str(account_id), classify_endpoint(endpoint), status, latency)
+        return False
+
+    def _policy(self, endpoint: str, max_retries: int | None = None) -> RetryPolicy:
+        policy = self.retry_policies.get(classify_endpoint(endpoint)) or RetryPolicy()
+        if max_retries is not None and max_retries != policy.max_attempts:
+            policy = copy.copy(policy)
+            policy.max_attempts = max(1, max_retries)
+        return policy
+
+    def _send(
+        self,
+        method: str,
+        endpoint: str,
+        account_id: str | None,
+        max_retries: int | None = None,
+        decode=None,
+        **kwargs,
+    ):
+        """Envia com throttle, registro AIMD e a política de retry do endpoint.
+
+        decode(response) substitui response.json() nas respostas 2xx.
+        """
         url = f"{self.base_url}{endpoint}"
-        for attempt in range(max_retries):
-            try:
-                response = requests.request(method, url, headers=self.headers, params=params, json=json_data, timeout=30)
-                self.last_status = response.status_code
-                self.last_error_status = None
-                self.last_error_response = None
-                
-                if response.status_code == 429:
-                    wait_time = (2 ** attempt) + 5
-                    logger.warning(f"⚠️ Rate limit. Aguardando {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                
-                if 200 <= response.status_code < 300:
-                    return response.json()
-                try:
-                    self.last_error_response = response.json()
-                except ValueError:
-                    self.last_error_response = {"raw": response.text}
-                self.last_error_status = response.status_code
-                response.raise_for_status()
-            except Exception as e:
-                if attempt == max_retries - 1: raise e
-                time.sleep(2)
+
+        def send():
+            self._throttle(endpoint, account_id)
+            started = time.monotonic()
+            response = self.session.request(method, url, timeout=30, **kwargs)
+            self._record(endpoint, account_id, response.status_code, time.monotonic() - started)
+            return response
+
+        response = self._policy(endpoint, max_retries).run(
+            send,
+            label=f"{method} {endpoint}",
+            paced=bool(self.rate_limiter and account_id),
+        )
+        return self._handle_response(response, decode)
+
+    def _handle_response(self, response, decode=None):
+        self.last_status = response.status_code
+        self.last_error_status = None
+        self.last_error_response = None
+        if 200 <= response.status_code < 300:
+            return decode(response) if decode else response.json()
+        try:
+            self.last_error_response = response.json()
+        except ValueError:
+            self.last_error_response = {"raw": response.text}
+        self.last_error_status = response.status_code
+        response.raise_for_status()
         return None
 
+    def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict = None,
+        json_data: dict = None,
+        max_retries: int | None = None,
+        fields: Iterable[str] | None = None,
+    ):
+        """Com fields, a página de lista é lida em streaming e cada item só guarda esses campos."""
+        account_id = (params or {}).get("account_id") or (json_data or {}).get("account_id")
+        decode = functools.partial(decode_projected_page, fields=tuple(fields)) if fields else None
+        send = functools.partial(
+            self._send,
+            method,
+            endpoint,
+            account_id,
+            max_retries=max_retries,
+            decode=decode,
+            headers=self.headers,
+            params=params,
+            json=json_data,
+            stream=bool(fields),
+        )
+        if method == "GET" and self.single_flight is not None:
+            key = (self.base_url, self.api_key, endpoint, freeze(params), freeze(fields))
+            return self.single_flight.do(key, send)
+        return send()
+
     def search_people(self, account_id: str, criteria: Dict, limit: int = 50, cursor: str = None, api_type: str = "classic"):
         """Busca pessoas com suporte a paginação."""
         endpoint = "/api/v1/linkedin/search"
@@ -116,24 +282,119 @@ class UnipileClient:
             params["keywords"] = keywords
         return self._request("GET", endpoint, params=params)
 
-    def get_profile_details(self, account_id: str, identifier: str, sections: Union[List[str], str, None] = None):
-        """Busca dados completos do perfil (Enriquecimento)."""
+    def get_profile_details(
+        self,
+        account_id: str,
+        identifier: str,
+        sections: Union[List[str], str, None] = None,
+        use_cache: bool = True,
+    ):
+        """Busca dados completos do perfil (Enriquecimento).
+
+        Com profile_cache configurado, reaproveita perfis já buscados pela
+        mesma conta com as mesmas seções dentro do TTL. use_cache=False força a busca na API
+        (e atualiza o cache).
+        """
         # Pede seções estratégicas para não pesar tanto mas trazer contatos
         if sections is None:
             sections = ["contact_info", "experience", "education", "about"]
+        cache_key = profile_cache_key(account_id, identifier, sections) if self.profile_cache else None
+        if cache_key and use_cache:
+            cached = self.profile_cache.get(cache_key)
+            if cached is not None:
+                return cached
         endpoint = f"/api/v1/users/{identifier}"
         params = {"account_id": account_id, "linkedin_sections": sections}
-        return self._request("GET", endpoint, params=params)
+        profile = self._request("GET", endpoint, params=params)
+        if cache_key and profile:
+            self.profile_cache.set(cache_key, profile)
+        return profile
+
+    def get_profiles_bulk(
+        self,
+        account_id: str,
+        identifiers: Iterable[str],
+        sections: Union[List[str], str, None] = None,
+        concurrency: int = DEFAULT_ACCOUNT_CONCURRENCY,
+        ordered: bool = False,
+        use_cache: bool = True,
+    ) -> Iterator[tuple[str, dict | Exception | None]]:
+        """Busca vários perfis em paralelo e gera (identifier, perfil_ou_erro).
+
+        O ritmo continua no rate limiter da conta (classe "profile"); a
+        concorrência fica limitada ao valor aprendido pelo AIMD, relido a cada
+        janela (um corte no meio do lote já reduz as próximas submissões). Por
+        padrão os resultados saem conforme terminam; ordered=True mantém a
+        ordem de entrada. Só uma janela de 2x concurrency fica submetida por
+        vez, então listas grandes não enchem a fila do executor. Erros saem
+        como a exceção do próprio perfil (HTTPError traz o status em
+        .response), não pelo last_status compartilhado; identificadores vazios
+        (None, "") saem como ValueError sem chamar a API.
+        """
+        concurrency = max(1, concurrency)
+
+        def window() -> int:
+            if not self.rate_limiter:
+                return concurrency
+            return max(1, self.rate_limiter.concurrency_for(str(account_id), "profile", concurrency))
+
+        fetch_profile = functools.partial(self.get_profile_details, account_id, sections=sections, use_cache=use_cache)
+
+        def fetch(identifier):
+            # Lead sem provider_id: vira erro no próprio resultado, sem chamar a API.
+            if not identifier:
+                raise ValueError(f"Identificador de perfil vazio: {identifier!r}")
+            return fetch_profile(identifier)
+
+        pending_ids = iter(identifiers)
+        in_flight: deque = deque()
+
+        def outcome(future):
+            try:
+                return future.result()
+            except Exception as exc:
+                return exc
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="unipile-bulk") as pool:
+            try:
+                while True:
+                    limit = window() * 2
+                    while len(in_flight) < limit:
+                        identifier = next(pending_ids, _NO_MORE)
+                        if identifier is _NO_MORE:
+                            break
+                        in_flight.append((identifier, pool.submit(fetch, identifier)))
+                    if not in_flight:
+                        break
+                    if ordered:
+                        identifier, future = in_flight.popleft()
+                    else:
+                        wait([f for _, f in in_flight], return_when=FIRST_COMPLETED)
+                        identifier, future = next((item for item in in_flight if item[1].done()))
+                        in_flight.remove((identifier, future))
+                    yield identifier, outcome(future)
+            finally:
+                # Consumidor parou no meio: não dispara o que ainda não começou.
+                for _, future in in_flight:
+                    future.cancel()
 
-    def get_company_details(self, account_id: str, company_id: str):
-        """Busca dados da empresa."""
+    def get_company_details(self, account_id: str, company_id: str, use_cache: bool = True):
+        """Busca dados da empresa (usa company_cache quando configurado)."""
         if not company_id: return None
+        company_id = str(company_id)
+        if self.company_cache and use_cache:
+            cached = self.company_cache.get(company_id)
+            if cached is not None:
+                return cached
         endpoint = f"/api/v1/linkedin/company/{company_id}"
         params = {"account_id": account_id}
         try:
-            return self._request("GET", endpoint, params=params)
+            company = self._request("GET", endpoint, params=params)
         except:
             return None # Se falhar empresa, não trava o fluxo
+        if self.company_cache and company:
+            self.company_cache.set(company_id, company)
+        return company
 
     def get_user_posts(self, account_id: str, identifier: str, limit: int = 3):
         """Busca posts recentes do usuário."""
@@ -151,7 +412,6 @@ class UnipileClient:
         linkedin_inmail: bool | None = None,
     ):
         endpoint = "/api/v1/chats"
-        url = f"{self.base_url}{endpoint}"
         headers = {
             "accept": "application/json",
             "X-API-KEY": self.api_key,
@@ -168,23 +428,10 @@ class UnipileClient:
             data.append(("linkedin[api]", linkedin_api))
         if linkedin_inmail is not None:
             data.append(("linkedin[inmail]", "true" if linkedin_inmail else "false"))
-        response = requests.post(url, headers=headers, data=data, timeout=30)
-        self.last_status = response.status_code
-        self.last_error_status = None
-        self.last_error_response = None
-        if 200 <= response.status_code < 300:
-            return response.json()
-        try:
-            self.last_error_response = response.json()
-        except ValueError:
-            self.last_error_response = {"raw": response.text}
-        self.last_error_status = response.status_code
-        response.raise_for_status()
-        return None
+        return self._send("POST", endpoint, account_id, headers=headers, data=data)
 
     def send_message_in_chat(self, chat_id: str, text: str, account_id: str | None = None):
         endpoint = f"/api/v1/chats/{chat_id}/messages"
-        url = f"{self.base_url}{endpoint}"
         headers = {
             "accept": "application/json",
             "X-API-KEY": self.api_key,
@@ -192,19 +439,7 @@ class UnipileClient:
         data: list[tuple[str, str]] = [("text", text)]
         if account_id:
             data.append(("account_id", account_id))
-        response = requests.post(url, headers=headers, data=data, timeout=30)
-        self.last_status = response.status_code
-        self.last_error_status = None
-        self.last_error_response = None
-        if 200 <= response.status_code < 300:
-            return response.json()
-        try:
-            self.last_error_response = response.json()
-        except ValueError:
-            self.last_error_response = {"raw": response.text}
-        self.last_error_status = response.status_code
-        response.raise_for_status()
-        return None
+        return self._send("POST", endpoint, account_id, headers=headers, data=data)
 
     def send_invitation(
         self,
@@ -224,7 +459,13 @@ class UnipileClient:
             payload["user_email"] = user_email
         return self._request("POST", endpoint, json_data=payload)
 
-    def list_invitations_sent(self, account_id: str, limit: int = 100, cursor: str | None = None):
+    def list_invitations_sent(
+        self,
+        account_id: str,
+        limit: int = 100,
+        cursor: str | None = None,
+        fields: Iterable[str] | None = None,
+    ):
         endpoint = "/api/v1/users/invite/sent"
         params = {
             "account_id": account_id,
@@ -232,9 +473,17 @@ class UnipileClient:
         }
         if cursor:
             params["cursor"] = cursor
-        return self._request("GET", endpoint, params=params)
+        return self._request("GET", endpoint, params=params, fields=fields)
 
-    def list_relations(self, account_id: str, limit: int = 1000, cursor: str | None = None, filter_query: str | None = None):
+    def list_relations(
+        self,
+        account_id: str,
+        limit: int = 1000,
+        cursor: str | None = None,
+        filter_query: str | None = None,
+        fields: Iterable[str] | None = None,
+    ):
+        """Lista conexões. fields=("public_identifier", "member_id") evita montar o objeto inteiro de cada item."""
         endpoint = "/api/v1/users/relations"
         params = {
             "account_id": account_id,
@@ -244,4 +493,127 @@ class UnipileClient:
             params["cursor"] = cursor
         if filter_query:
             params["filter"] = filter_query
-        return self._request("GET", endpoint, params=params)
+        return self._request("GET", endpoint, params=params, fields=fields)
+
+
+class AdaptiveSemaphore:
+    """Semáforo asyncio cujo limite é relido a cada entrada (limite AIMD)."""
+
+    def __init__(self, limit_fn):
+        self._limit_fn = limit_fn
+        self._active = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < max(1, self._limit_fn()))
+            self._active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+
+class AsyncUnipileClient:
+    """Versão asyncio do UnipileClient para operações em lote.
+
+    Cada chamada roda numa thread do executor usando o mesmo UnipileClient
+    (e portanto o mesmo pool de conexões). Um semáforo por account_id limita
+    quantas requisições ficam em voo por conta; com rate limiter adaptativo,
+    cada classe de endpoint ainda respeita a concorrência aprendida (AIMD).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        max_concurrency: int = DEFAULT_ACCOUNT_CONCURRENCY,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        client: UnipileClient | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        pool_maxsize = max(pool_maxsize, self.max_concurrency)
+        self.client = client or UnipileClient(
+            base_url,
+            api_key,
+            pool_maxsize=pool_maxsize,
+            rate_limiter=rate_limiter,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=pool_maxsize, thread_name_prefix="unipile")
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._adaptive: dict[tuple[str, str], AdaptiveSemaphore] = {}
+
+    def _semaphore(self, account_id: str | None) -> asyncio.Semaphore:
+        key = account_id or ""
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[key] = semaphore
+        return semaphore
+
+    def _adaptive_semaphore(self, account_id: str | None, endpoint_class: str) -> AdaptiveSemaphore:
+        key = (account_id or "", endpoint_class)
+        semaphore = self._adaptive.get(key)
+        if semaphore is None:
+            limiter = self.client.rate_limiter
+            if limiter and account_id:
+                semaphore = AdaptiveSemaphore(
+                    lambda: limiter.concurrency_for(str(account_id), endpoint_class, self.max_concurrency)
+                )
+            else:
+                semaphore = AdaptiveSemaphore(lambda: self.max_concurrency)
+            self._adaptive[key] = semaphore
+        return semaphore
+
+    async def _call(self, account_id: str | None, func, *args, **kwargs):
+        endpoint_class = ASYNC_METHOD_CLASSES.get(getattr(func, "__name__", ""), "profile")
+        async with self._semaphore(account_id):
+            async with self._adaptive_semaphore(account_id, endpoint_class):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def search_people(self, account_id: str, criteria: Dict, **kwargs):
+        return await self._call(account_id, self.client.search_people, account_id, criteria, **kwargs)
+
+    async def search_from_url(self, account_id: str, search_url: str, **kwargs):
+        return await self._call(account_id, self.client.search_from_url, account_id, search_url, **kwargs)
+
+    async def list_search_parameters(self, account_id: str, parameter_type: str, **kwargs):
+        return await self._call(account_id, self.client.list_search_parameters, account_id, parameter_type, **kwargs)
+
+    async def get_profile_details(self, account_id: str, identifier: str, **kwargs):
+        return await self._call(account_id, self.client.get_profile_details, account_id, identifier, **kwargs)
+
+    async def get_company_details(self, account_id: str, company_id: str, **kwargs):
+        return await self._call(account_id, self.client.get_company_details, account_id, company_id, **kwargs)
+
+    async def get_user_posts(self, account_id: str, identifier: str, **kwargs):
+        return await self._call(account_id, self.client.get_user_posts, account_id, identifier, **kwargs)
+
+    async def start_chat(self, account_id: str, attendees_ids: List[str], text: str, **kwargs):
+        return await self._call(account_id, self.client.start_chat, account_id, attendees_ids, text, **kwargs)
+
+    async def send_message_in_chat(self, chat_id: str, text: str, account_id: str | None = None):
+        return await self._call(account_id, self.client.send_message_in_chat, chat_id, text, account_id=account_id)
+
+    async def send_invitation(self, account_id: str, provider_id: str, **kwargs):
+        return await self._call(account_id, self.client.send_invitation, account_id, provider_id, **kwargs)
+
+    async def list_invitations_sent(self, account_id: str, **kwargs):
+        return await self._call(account_id, self.client.list_invitations_sent, account_id, **kwargs)
+
+    async def list_relations(self, account_id: str, **kwargs):
+        return await self._call(account_id, self.client.list_relations, account_id, **kwargs)
+
+    async def aclose(self):
+        self._executor.shutdown(wait=True)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
@@ -0,0 +1,18 @@
+-- Enriquecimento por empresa: cache de empresas por usuario e porte/setor no lead.
+alter table leads add column if not exists company_size text;
+alter table leads add column if not exists company_industry text;
+
+create table if not exists companies (
+  id uuid default uuid_generate_v4() primary key,
+  user_id uuid references auth.users not null,
+  company_id text not null,
+  name text,
+  industry text,
+  employee_count integer,
+  employee_count_range text,
+  website text,
+  fetched_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  unique(user_id, company_id)
+);
+
+create index if not exists leads_campaign_company_idx on leads(campaign_id, company_id);
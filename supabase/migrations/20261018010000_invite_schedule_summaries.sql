@@ -0,0 +1,32 @@
+-- Resumos das agendas de convite calculados no banco (painel "Agendas salvas").
+-- security_invoker: a view respeita o RLS de invite_schedules de quem consulta.
+create or replace view invite_schedule_batches with (security_invoker = true) as
+select
+  user_id,
+  campaign_id,
+  source,
+  batch_id,
+  min(batch_label) as batch_label,
+  min(created_at) as created_at,
+  count(*) as total,
+  count(*) filter (where status = 'scheduled') as scheduled,
+  count(*) filter (where status = 'sent') as sent,
+  count(*) filter (where status = 'error') as error,
+  count(*) filter (where status = 'skipped') as skipped
+from invite_schedules
+where batch_id is not null
+group by user_id, campaign_id, source, batch_id;
+
+create or replace view invite_schedule_days with (security_invoker = true) as
+select
+  user_id,
+  batch_id,
+  scheduled_date,
+  count(*) as total,
+  count(*) filter (where status = 'scheduled') as scheduled,
+  count(*) filter (where status = 'sent') as sent,
+  count(*) filter (where status = 'error') as error,
+  count(*) filter (where status = 'skipped') as skipped
+from invite_schedules
+where batch_id is not null
+group by user_id, batch_id, scheduled_date;
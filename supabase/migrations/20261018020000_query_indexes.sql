@@ -0,0 +1,20 @@
+-- Índices para os filtros que o app, o cron e o sync realmente usam.
+-- Conferir os planos com: python benchmarks/explain_queries.py
+
+-- Leads: leitura por keyset (campaign_id + id), filtrada por status ou invitation_status.
+create index if not exists leads_campaign_id_idx on leads(campaign_id, id);
+create index if not exists leads_campaign_status_idx on leads(campaign_id, status, id);
+create index if not exists leads_campaign_invitation_idx on leads(campaign_id, invitation_status, id)
+  where invitation_status is not null;
+
+-- message_logs: o sync lê lead_id das mensagens já enviadas da campanha (index-only scan).
+create index if not exists message_logs_campaign_status_idx on message_logs(campaign_id, status) include (lead_id);
+-- invite_schedules: o cron busca os pendentes até hoje (scheduled_date <= hoje) sem filtro de usuário...
+-- invite_schedules: o cron busca os pendentes do dia sem filtro de usuário...
+create index if not exists invite_schedules_pending_date_idx on invite_schedules(scheduled_date)
+  where status = 'scheduled';
+-- ...e conta os enviados nos últimos 7 dias (limite semanal).
+create index if not exists invite_schedules_sent_at_idx on invite_schedules(sent_at)
+  where status = 'sent';
+-- Painel de agendas e envio de um dia da agenda (batch_id + dia + status).
+create index if not exists invite_schedules_batch_day_idx on invite_schedules(batch_id, scheduled_date, status);
@@ -0,0 +1,67 @@
+-- Contadores de envio por conta Unipile, dia (UTC) e ação (invite, message).
+-- Substituem o count(*) sobre invite_schedules no limite semanal do cron.
+create table if not exists account_send_counters (
+  account_id text not null,
+  day date not null,
+  action text not null,
+  count integer not null default 0,
+  user_id uuid references auth.users,
+  updated_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  primary key (account_id, action, day)
+);
+
+-- Incremento atômico: duas execuções simultâneas (cron e UI) nunca perdem um envio.
+create or replace function increment_send_counter(
+  p_account_id text,
+  p_action text,
+  p_amount integer default 1,
+  p_day date default (timezone('utc'::text, now()))::date,
+  p_user_id uuid default null
+) returns integer
+language sql
+as $$
+  insert into account_send_counters as c (account_id, action, day, count, user_id)
+  values (p_account_id, p_action, p_day, p_amount, coalesce(p_user_id, auth.uid()))
+  on conflict (account_id, action, day)
+  do update set count = c.count + excluded.count, updated_at = timezone('utc'::text, now())
+  returning c.count;
+$$;
+
+-- Backfill: convites enviados nos últimos 7 dias (UTC), para o limite semanal não
+-- recomeçar do zero no deploy. invite_schedules não guarda a conta: ela vem da
+-- campanha (campaigns.unipile_account_id) ou, em agendas CSV, da única conta do
+-- usuário. Agendas CSV de usuários com várias contas não entram no backfill.
+-- greatest() torna o backfill idempotente e não soma duas vezes envios já
+-- registrados pela RPC.
+with sent as (
+  select
+    s.user_id,
+    (s.sent_at at time zone 'utc')::date as day,
+    coalesce(
+      (
+        select ua.account_id
+        from campaigns cp
+        join unipile_accounts ua on ua.id = cp.unipile_account_id
+        where cp.id = s.campaign_id
+      ),
+      (
+        select min(ua.account_id)
+        from unipile_accounts ua
+        where ua.user_id = s.user_id
+        having count(*) = 1
+      )
+    ) as account_id
+  from invite_schedules s
+  where s.status = 'sent'
+    and s.sent_at >= ((timezone('utc'::text, now()))::date - 6)::timestamp at time zone 'utc'
+)
+insert into account_send_counters as c (account_id, action, day, count, user_id)
+select account_id, 'invite', day, count(*), (array_agg(user_id))[1]
+from sent
+where account_id is not null
+group by account_id, day
+on conflict (account_id, action, day)
+do update set count = greatest(c.count, excluded.count), updated_at = timezone('utc'::text, now());
+
+-- O limite semanal não conta mais invite_schedules por sent_at.
+drop index if exists invite_schedules_sent_at_idx;
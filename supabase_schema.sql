@@ -32,6 +32,8 @@ create table leads (
   current_title text,
   companies text,
   company_id text,
+  company_size text,
+  company_industry text,
   bio text,
   emails text,
   phones text,
@@ -46,6 +48,26 @@ create table leads (
   unique(campaign_id, linkedin_public_id)
 );
 
+create index leads_campaign_id_idx on leads(campaign_id, id);
+create index leads_campaign_status_idx on leads(campaign_id, status, id);
+create index leads_campaign_invitation_idx on leads(campaign_id, invitation_status, id)
+  where invitation_status is not null;
+
+create table companies (
+  id uuid default uuid_generate_v4() primary key,
+  user_id uuid references auth.users not null,
+  company_id text not null,
+  name text,
+  industry text,
+  employee_count integer,
+  employee_count_range text,
+  website text,
+  fetched_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  unique(user_id, company_id)
+);
+
+create index leads_campaign_company_idx on leads(campaign_id, company_id);
+
 create table invite_schedules (
   id uuid default uuid_generate_v4() primary key,
   user_id uuid references auth.users not null,
@@ -70,6 +92,40 @@ create table invite_schedules (
 create index invite_schedules_user_date_idx on invite_schedules(user_id, scheduled_date);
 create index invite_schedules_campaign_idx on invite_schedules(campaign_id);
 create unique index invite_schedules_unique_idx on invite_schedules(user_id, provider_id, scheduled_date);
+create index invite_schedules_pending_date_idx on invite_schedules(scheduled_date) where status = 'scheduled';
+create index invite_schedules_batch_day_idx on invite_schedules(batch_id, scheduled_date, status);
+
+-- security_invoker: a view respeita o RLS de invite_schedules de quem consulta.
+create or replace view invite_schedule_batches with (security_invoker = true) as
+select
+  user_id,
+  campaign_id,
+  source,
+  batch_id,
+  min(batch_label) as batch_label,
+  min(created_at) as created_at,
+  count(*) as total,
+  count(*) filter (where status = 'scheduled') as scheduled,
+  count(*) filter (where status = 'sent') as sent,
+  count(*) filter (where status = 'error') as error,
+  count(*) filter (where status = 'skipped') as skipped
+from invite_schedules
+where batch_id is not null
+group by user_id, campaign_id, source, batch_id;
+
+create or replace view invite_schedule_days with (security_invoker = true) as
+select
+  user_id,
+  batch_id,
+  scheduled_date,
+  count(*) as total,
+  count(*) filter (where status = 'scheduled') as scheduled,
+  count(*) filter (where status = 'sent') as sent,
+  count(*) filter (where status = 'error') as error,
+  count(*) filter (where status = 'skipped') as skipped
+from invite_schedules
+where batch_id is not null
+group by user_id, batch_id, scheduled_date;
 
 create table message_logs (
   id uuid default uuid_generate_v4() primary key,
@@ -79,3 +135,32 @@ create table message_logs (
   status text not null,
   error_message text
 );
+
+create index message_logs_campaign_status_idx on message_logs(campaign_id, status) include (lead_id);
+
+create table account_send_counters (
+  account_id text not null,
+  day date not null,
+  action text not null,
+  count integer not null default 0,
+  user_id uuid references auth.users,
+  updated_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  primary key (account_id, action, day)
+);
+
+-- Incremento atômico: duas execuções simultâneas (cron e UI) nunca perdem um envio.
+create or replace function increment_send_counter(
+  p_account_id text,
+  p_action text,
+  p_amount integer default 1,
+  p_day date default (timezone('utc'::text, now()))::date,
+  p_user_id uuid default null
+) returns integer
+language sql
+as $$
+  insert into account_send_counters as c (account_id, action, day, count, user_id)
+  values (p_account_id, p_action, p_day, p_amount, coalesce(p_user_id, auth.uid()))
+  on conflict (account_id, action, day)
+  do update set count = c.count + excluded.count, updated_at = timezone('utc'::text, now())
+  returning c.count;
+$$;
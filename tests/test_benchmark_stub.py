@@ -0,0 +1,33 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from linkedin_salesnav_pagination import fetch_salesnav_people
+from unipile_stub import UnipileStub
+
+
+class TestUnipileStub(unittest.TestCase):
+    def test_fetch_salesnav_people_over_http_stub(self):
+        with UnipileStub(total=250, overlap=5, rate_429=0.2, cursor_mode="capped", cap=230) as stub:
+            people = fetch_salesnav_people(
+                {"keywords": "rh"},
+                account_id="acc",
+                token="token",
+                base_url=stub.base_url,
+                min_delay=0.0,
+                max_delay=0.0,
+                checkpoint_path=None,
+                resume=False,
+                max_retries=20,
+            )
+            stats = dict(stub.stats)
+        self.assertEqual(len(people), 230)
+        self.assertEqual(len({p["id"] for p in people}), 230)
+        self.assertEqual(stats["pages"], 3)
+        self.assertEqual(stats["requests"], stats["pages"] + stats["throttled"])
+
+
+if __name__ == "__main__":
+    unittest.main()
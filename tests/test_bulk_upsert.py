@@ -0,0 +1,110 @@
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+from bulk_upsert import BufferedUpsertWriter, UpsertReport, chunked_upsert, dedupe_rows, is_transient_error
+
+
+class ApiError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class TestBulkUpsert(unittest.TestCase):
+    def test_chunks_in_parallel_and_reports_progress(self):
+        sent = []
+        lock = threading.Lock()
+
+        def send(chunk):
+            with lock:
+                sent.append(len(chunk))
+
+        progress = []
+        rows = [{"id": i} for i in range(1050)]
+        report = chunked_upsert(send, rows, chunk_size=500, max_workers=3, on_progress=lambda d, t: progress.append(d))
+        self.assertTrue(report.ok)
+        self.assertEqual(report.rows_written, 1050)
+        self.assertEqual(sorted(sent), [50, 500, 500])
+        self.assertEqual(progress[-1], 1050)
+
+    def test_bad_rows_are_isolated_by_bisection(self):
+        def send(chunk):
+            if any(row["id"] in (3, 7) for row in chunk):
+                raise ApiError("invalid input syntax", code="22P02")
+
+        rows = [{"id": i} for i in range(10)]
+        report = chunked_upsert(send, rows, chunk_size=10, max_workers=1)
+        self.assertEqual(report.rows_written, 8)
+        self.assertEqual(sorted(f["row"]["id"] for f in report.failed), [3, 7])
+        self.assertIn("invalid input", report.failed[0]["error"])
+        self.assertEqual(report.retries, 0)
+
+    def test_transient_errors_are_retried(self):
+        calls = {"n": 0}
+
+        def send(chunk):
+            calls["n"] += 1
+            if calls["n"] == 1:
+                raise ApiError("canceling statement due to statement timeout", code="57014")
+
+        with patch("bulk_upsert.time.sleep") as sleep:
+            report = chunked_upsert(send, [{"id": 1}, {"id": 2}], chunk_size=10)
+        self.assertTrue(report.ok)
+        self.assertEqual(report.retries, 1)
+        sleep.assert_called_once()
+
+    def test_persistent_transient_error_fails_whole_chunk_without_bisecting(self):
+        calls = {"n": 0}
+
+        def send(chunk):
+            calls["n"] += 1
+            raise ConnectionError("connection refused")
+
+        with patch("bulk_upsert.time.sleep"):
+            report = chunked_upsert(send, [{"id": i} for i in range(4)], chunk_size=4, max_attempts=3)
+        self.assertEqual(calls["n"], 3)
+        self.assertEqual(report.rows_written, 0)
+        self.assertEqual(sorted(f["row"]["id"] for f in report.failed), [0, 1, 2, 3])
+        self.assertIn("connection refused", report.failed[0]["error"])
+
+    def test_is_transient_error(self):
+        self.assertTrue(is_transient_error(TimeoutError()))
+        self.assertTrue(is_transient_error(ApiError("x", code="40P01")))
+        self.assertFalse(is_transient_error(ApiError("x", code="23505")))
+
+    def test_dedupe_rows_keeps_last_per_conflict_key(self):
+        rows = [
+            {"campaign_id": "c", "linkedin_public_id": "a", "v": 1},
+            {"campaign_id": "c", "linkedin_public_id": None, "v": 2},
+            {"campaign_id": "c", "linkedin_public_id": "a", "v": 3},
+        ]
+        deduped = dedupe_rows(rows, ("campaign_id", "linkedin_public_id"))
+        self.assertEqual([r["v"] for r in deduped], [3, 2])
+
+    def test_buffered_writer_flushes_by_rows_time_and_close(self):
+        batches = []
+
+        def flush(rows):
+            batches.append([r["id"] for r in rows])
+            report = UpsertReport(len(rows))
+            report.rows_written = len(rows)
+            return report
+
+        with patch("bulk_upsert.time.monotonic", side_effect=[0.0, 0.1, 0.2, 10.0, 10.0, 10.1, 10.2, 10.3]):
+            with BufferedUpsertWriter(flush, max_rows=2, max_seconds=5.0) as writer:
+                writer.add({"id": 1})
+                writer.add({"id": 2})  # cheio: flush
+                writer.add({"id": 3})  # prazo estourado: flush
+                writer.add({"id": 4})
+        self.assertEqual(batches, [[1, 2], [3], [4]])
+        self.assertEqual(writer.report.rows_written, 4)
+        self.assertTrue(writer.report.ok)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+from company_enrichment import (
+    collect_company_ids,
+    enrich_leads_with_companies,
+    extract_company_fields,
+    lead_company_fields,
+)
+from response_cache import ResponseCache
+from unipile_client import UnipileClient
+
+
+class TestCompanyEnrichment(unittest.TestCase):
+    def test_collect_company_ids_dedupes_in_order(self):
+        leads = [
+            {"company_id": "10"},
+            {"company_id": 20},
+            {"company_id": "10"},
+            {"company_id": None},
+            {"company_id": ""},
+        ]
+        self.assertEqual(collect_company_ids(leads), ["10", "20"])
+
+    def test_each_company_is_fetched_once(self):
+        calls = []
+        lock = threading.Lock()
+
+        def fake_company(account_id, company_id, use_cache=True):
+            with lock:
+                calls.append(company_id)
+            return {"name": f"Empresa {company_id}", "industry": ["Software"], "employee_count_range": {"from": 51, "to": 200}}
+
+        unipile = MagicMock()
+        unipile.get_company_details.side_effect = fake_company
+        leads = [{"company_id": str(i % 3)} for i in range(300)]
+
+        companies = enrich_leads_with_companies(unipile, "acc", leads, max_workers=4)
+
+        self.assertEqual(sorted(calls), ["0", "1", "2"])
+        self.assertEqual(
+            lead_company_fields(companies["1"]),
+            {"company_size": "51-200", "company_industry": "Software"},
+        )
+
+    def test_known_companies_are_skipped(self):
+        unipile = MagicMock()
+        unipile.get_company_details.return_value = {"name": "Nova"}
+        leads = [{"company_id": "1"}, {"company_id": "2"}, {"company_id": "1"}]
+
+        companies = enrich_leads_with_companies(unipile, "acc", leads, skip={"1": {"name": "Antiga"}})
+
+        unipile.get_company_details.assert_called_once_with("acc", "2", use_cache=True)
+        self.assertEqual(list(companies), ["2"])
+
+    def test_extract_company_fields_open_range(self):
+        fields = extract_company_fields("9", {"name": "Big", "employee_count": 12000, "employee_count_range": {"from": 10001}})
+        self.assertEqual(fields["employee_count_range"], "10001+")
+        self.assertEqual(fields["employee_count"], 12000)
+
+    def test_client_company_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ResponseCache("company", ttl=3600, max_entries=10, path=os.path.join(tmpdir, "c.sqlite3"))
+            client = UnipileClient("https://api.test", "key", session=MagicMock(), company_cache=cache)
+            client._request = MagicMock(return_value={"name": "Acme"})
+
+            client.get_company_details("acc", "1")
+            client.get_company_details("acc", 1)
+            self.assertEqual(client._request.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
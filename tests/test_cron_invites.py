@@ -0,0 +1,107 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+try:
+    import cron_invites
+except ImportError:  # supabase / python-dotenv não instalados
+    cron_invites = None
+
+
+class FakeQuery:
+    """Subconjunto do query builder do postgrest usado pelo cron, sobre uma lista em memória."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.filters = []
+        self.update_data = None
+        self.order_by = None
+        self.max_rows = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def update(self, data):
+        self.update_data = data
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row.get(column) <= value)
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = column
+        return self
+
+    def limit(self, count):
+        self.max_rows = count
+        return self
+
+    def execute(self):
+        matched = [row for row in self.rows if all(check(row) for check in self.filters)]
+        if self.update_data is not None:
+            for row in matched:
+                row.update(self.update_data)
+            return MagicMock(data=matched)
+        if self.order_by:
+            matched.sort(key=lambda row: row[self.order_by])
+        return MagicMock(data=[dict(row) for row in matched[: self.max_rows]])
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+        self.rpc = MagicMock()
+
+    def table(self, name):
+        return FakeQuery(self.rows)
+
+
+@unittest.skipIf(cron_invites is None, "supabase/python-dotenv not installed")
+class TestCronInvites(unittest.TestCase):
+    def run_cron(self, supabase, today, budget):
+        with patch.multiple(
+            cron_invites,
+            SUPABASE_URL="https://db.test",
+            SUPABASE_SERVICE_KEY="key",
+            INVITE_DELAY_MIN=0.0,
+            INVITE_DELAY_MAX=0.0,
+            create_client=MagicMock(return_value=supabase),
+            utc_today=MagicMock(return_value=today),
+            account_invite_budget=MagicMock(return_value=budget),
+            send_invitation=MagicMock(return_value=(True, {"id": "inv-1"}, False)),
+        ), patch("cron_invites.RateLimiter.from_env", return_value=None), patch("cron_invites.time.sleep"):
+            cron_invites.process_schedules()
+            return cron_invites.send_invitation
+
+    def test_row_skipped_by_account_limit_is_sent_on_next_run(self):
+        rows = [
+            {
+                "id": "s1",
+                "provider_id": "p1",
+                "scheduled_date": "2026-10-18",
+                "status": "scheduled",
+                "unipile_accounts": {"account_id": "acc", "api_key": "k"},
+            }
+        ]
+        supabase = FakeSupabase(rows)
+
+        send = self.run_cron(supabase, "2026-10-18", budget=0)
+        send.assert_not_called()
+        self.assertEqual(rows[0]["status"], "scheduled")
+
+        send = self.run_cron(supabase, "2026-10-19", budget=None)
+        send.assert_called_once()
+        self.assertEqual(rows[0]["status"], "sent")
+        self.assertEqual(rows[0]["invitation_id"], "inv-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
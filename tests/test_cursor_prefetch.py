@@ -0,0 +1,82 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+from cursor_prefetch import CursorPrefetcher
+
+PAGES = {
+    None: {"items": [1], "cursor": "c1"},
+    "c1": {"items": [2], "cursor": "c2"},
+    "c2": {"items": [3], "paging": {"cursor": "c3"}},
+    "c3": {"items": [4], "cursor": None},
+}
+
+
+class TestCursorPrefetcher(unittest.TestCase):
+    def test_serial_mode_walks_all_pages(self):
+        pages = list(CursorPrefetcher(PAGES.__getitem__, depth=0))
+        self.assertEqual([cursor for cursor, _ in pages], [None, "c1", "c2", "c3"])
+
+    def test_next_page_is_fetched_while_current_is_processed(self):
+        started = {cursor: threading.Event() for cursor in PAGES}
+
+        def fetch(cursor):
+            started[cursor].set()
+            return PAGES[cursor]
+
+        items = []
+        with CursorPrefetcher(fetch, depth=1) as pages:
+            for cursor, data in pages:
+                if cursor is None:
+                    # A página seguinte sai enquanto a primeira ainda está sendo processada.
+                    self.assertTrue(started["c1"].wait(2))
+                items.extend(data["items"])
+        self.assertEqual(items, [1, 2, 3, 4])
+
+    def test_prefetch_depth_is_bounded(self):
+        lock = threading.Lock()
+        state = {"fetched": 0, "consumed": 0, "ahead": 0}
+
+        def fetch(cursor):
+            with lock:
+                state["fetched"] += 1
+                state["ahead"] = max(state["ahead"], state["fetched"] - state["consumed"])
+            return {"items": [], "cursor": f"c{state['fetched']}" if state["fetched"] < 20 else None}
+
+        with CursorPrefetcher(fetch, depth=2) as pages:
+            for _ in pages:
+                with lock:
+                    state["consumed"] += 1
+        self.assertEqual(state["consumed"], 20)
+        self.assertLessEqual(state["ahead"], 2)
+
+    def test_should_continue_stops_before_requesting_next_page(self):
+        fetched = []
+
+        def fetch(cursor):
+            fetched.append(cursor)
+            return PAGES[cursor]
+
+        with CursorPrefetcher(fetch, depth=2, should_continue=lambda: len(fetched) < 2) as pages:
+            consumed = [cursor for cursor, _ in pages]
+        self.assertEqual(consumed, [None, "c1"])
+        self.assertEqual(fetched, [None, "c1"])
+
+    def test_fetch_errors_are_raised_to_consumer(self):
+        def fetch(cursor):
+            if cursor == "c1":
+                raise RuntimeError("boom")
+            return PAGES[cursor]
+
+        seen = []
+        with self.assertRaises(RuntimeError):
+            for cursor, _ in CursorPrefetcher(fetch, depth=1):
+                seen.append(cursor)
+        self.assertEqual(seen, [None])
+
+
+if __name__ == "__main__":
+    unittest.main()
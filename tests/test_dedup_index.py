@@ -0,0 +1,43 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+from dedup_index import HashedKeySet
+
+
+class TestHashedKeySet(unittest.TestCase):
+    def test_add_and_contains_across_growth(self):
+        keys = [f"public_identifier:lead-{i}" for i in range(5000)]
+        index = HashedKeySet(capacity=8)
+        self.assertTrue(all(index.add(key) for key in keys))
+        self.assertFalse(index.add(keys[0]))
+        self.assertEqual(len(index), 5000)
+        self.assertTrue(all(key in index for key in keys))
+        self.assertNotIn("public_identifier:outro", index)
+        self.assertNotIn(None, index)
+
+    def test_bloom_precheck_keeps_answers(self):
+        index = HashedKeySet(["a", "b"], bloom_bits=1024)
+        self.assertIn("a", index)
+        self.assertNotIn("c", index)
+
+    def test_state_roundtrip_through_json(self):
+        index = HashedKeySet((f"id:{i}" for i in range(300)), bloom_bits=4096)
+        state = json.loads(json.dumps(index.to_state()))
+        restored = HashedKeySet.from_state(state)
+        self.assertEqual(len(restored), 300)
+        self.assertIn("id:299", restored)
+        self.assertNotIn("id:300", restored)
+        self.assertEqual(len(HashedKeySet.from_state(HashedKeySet().to_state())), 0)
+
+    def test_from_state_accepts_legacy_key_list(self):
+        restored = HashedKeySet.from_state(["id:1", "id:2"])
+        self.assertIn("id:2", restored)
+        self.assertEqual(len(HashedKeySet.from_state(None)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from explain_queries import QUERIES, explain_query, summarize_plan
+
+PLAN = """Limit  (cost=0.42..8.44 rows=1 width=64)
+  ->  Index Scan using invite_schedules_pending_date_idx on invite_schedules  (cost=0.42..8.44 rows=1 width=64)
+        Index Cond: (scheduled_date = '2026-10-18'::date)
+  ->  Seq Scan on message_logs  (cost=0.00..1.01 rows=1 width=16)
+"""
+
+
+class RecordingBuilder:
+    """Aceita qualquer encadeamento do postgrest e devolve o plano no execute()."""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __getattr__(self, name):
+        def method(*args, **kwargs):
+            self.calls.append(name)
+            return self
+
+        return method
+
+    def execute(self):
+        return PLAN
+
+
+class TestExplainQueries(unittest.TestCase):
+    def test_summarize_plan(self):
+        summary = summarize_plan(PLAN)
+        self.assertEqual(summary["indexes"], ["invite_schedules_pending_date_idx"])
+        self.assertEqual(summary["seq_scans"], ["message_logs"])
+
+    def test_every_query_requests_an_explain(self):
+        ctx = {
+            "campaign_id": "c",
+            "user_id": "u",
+            "batch_id": "b",
+            "lead_id": "l",
+            "account_id": "acc",
+            "today": "2026-10-18",
+            "week_ago": "2026-10-11T00:00:00",
+            "daily_limit": 40,
+            "pending_limit": 1000,
+        }
+        for name in QUERIES:
+            calls = []
+            outcome = explain_query(RecordingBuilder(calls), name, ctx)
+            self.assertEqual(calls[0], "table", name)
+            self.assertIn("explain", calls, name)
+            self.assertEqual(outcome["indexes"], ["invite_schedules_pending_date_idx"])
+
+
+if __name__ == "__main__":
+    unittest.main()
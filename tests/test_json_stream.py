@@ -0,0 +1,68 @@
+import io
+import json
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+import json_stream
+from json_stream import decode_projected_page
+from unipile_client import UnipileClient
+
+PAGE = {
+    "object": "UserRelationsList",
+    "items": [
+        {
+            "public_identifier": "ana",
+            "member_id": "m1",
+            "headline": "x" * 200,
+            "profile_picture_url": "https://img",
+            "experience": [{"public_identifier": "nested", "company": "Acme"}],
+        },
+        {"public_identifier": "bruno", "member_id": "m2", "first_name": "Bruno"},
+    ],
+    "cursor": "next-1",
+}
+
+
+def make_response(payload):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(json.dumps(payload).encode("utf-8"))
+    return response
+
+
+class TestProjectedDecode(unittest.TestCase):
+    def test_streaming_keeps_only_requested_fields(self):
+        if json_stream.ijson is None:
+            self.skipTest("ijson nao instalado")
+        page = decode_projected_page(make_response(PAGE), ("public_identifier", "member_id"))
+        self.assertEqual(
+            page["items"],
+            [{"public_identifier": "ana", "member_id": "m1"}, {"public_identifier": "bruno", "member_id": "m2"}],
+        )
+        self.assertEqual(page["cursor"], "next-1")
+
+    def test_fallback_without_ijson(self):
+        with patch.object(json_stream, "ijson", None):
+            page = decode_projected_page(make_response(PAGE), ("public_identifier",))
+        self.assertEqual(page["items"], [{"public_identifier": "ana"}, {"public_identifier": "bruno"}])
+        self.assertEqual(page["cursor"], "next-1")
+
+    def test_list_relations_streams_when_fields_given(self):
+        session = MagicMock()
+        session.request.return_value = make_response(PAGE)
+        client = UnipileClient("https://api.test", "key", session=session)
+
+        page = client.list_relations("acc", fields=("member_id",))
+
+        self.assertTrue(session.request.call_args.kwargs["stream"])
+        self.assertEqual([item["member_id"] for item in page["items"]], ["m1", "m2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
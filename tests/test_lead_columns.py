@@ -0,0 +1,35 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+from lead_columns import LEAD_COLUMNS, LEAD_VIEWS, lead_select, template_fields
+
+
+class TestLeadColumns(unittest.TestCase):
+    def test_views_are_known_columns_and_skip_large_fields(self):
+        for name, columns in LEAD_VIEWS.items():
+            self.assertTrue(set(columns) <= set(LEAD_COLUMNS), name)
+            self.assertIn("id", columns)
+            self.assertNotIn("enrichment_data", columns)
+        for name in ("list", "invite", "sync"):
+            self.assertNotIn("bio", LEAD_VIEWS[name])
+
+    def test_template_fields_only_returns_lead_columns(self):
+        template = "Oi {first_name}, vi sua bio: {bio} ({company}) {{literal}}"
+        self.assertEqual(template_fields(template), ("bio",))
+        self.assertEqual(template_fields("Oi {"), ())
+        self.assertEqual(template_fields(None), ())
+
+    def test_lead_select_adds_template_columns_once(self):
+        select = lead_select("sync", template="{bio} {full_name}")
+        columns = select.split(",")
+        self.assertEqual(columns.count("full_name"), 1)
+        self.assertEqual(columns[-1], "bio")
+        with self.assertRaises(ValueError):
+            lead_select("tudo")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+import local_store
+from rate_limiter import RateLimiter, classify_endpoint, parse_rate
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "store.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_bucket_is_shared_between_instances(self):
+        rates = {"search": (60.0, 2.0)}
+        first = RateLimiter(self.path, rates=rates)
+        second = RateLimiter(self.path, rates=rates)
+        with patch("rate_limiter.time.time", return_value=1000.0):
+            self.assertEqual(first.try_acquire("acc", "search"), 0.0)
+            self.assertEqual(second.try_acquire("acc", "search"), 0.0)
+            self.assertAlmostEqual(first.try_acquire("acc", "search"), 1.0)
+            # Outra conta tem bucket proprio.
+            self.assertEqual(second.try_acquire("other", "search"), 0.0)
+        with patch("rate_limiter.time.time", return_value=1001.0):
+            self.assertEqual(second.try_acquire("acc", "search"), 0.0)
+
+    def test_unwritable_store_falls_back_to_temp_file(self):
+        blocker = os.path.join(self.tmpdir.name, "not-a-dir")
+        open(blocker, "w").close()
+        fallback = os.path.join(self.tmpdir.name, "fallback.sqlite3")
+        with patch.object(local_store, "FALLBACK_STORE_PATH", fallback), patch.object(
+            local_store, "DEFAULT_STORE_PATH", os.path.join(blocker, "store.sqlite3")
+        ), self.assertLogs("local_store", "ERROR"):
+            limiter = RateLimiter.from_env()
+        self.assertIsNotNone(limiter)
+        self.assertTrue(os.path.exists(fallback))
+
+    def test_classify_endpoint(self):
+        self.assertEqual(classify_endpoint("/api/v1/linkedin/search"), "search")
+        self.assertEqual(classify_endpoint("/api/v1/linkedin/search/parameters"), "search")
+        self.assertEqual(classify_endpoint("/api/v1/users/joao"), "profile")
+        self.assertEqual(classify_endpoint("/api/v1/users/invite"), "invite")
+        self.assertEqual(classify_endpoint("/api/v1/users/relations"), "relations")
+        self.assertEqual(classify_endpoint("/api/v1/chats/c1/messages"), "message")
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("30:4", (1.0, 1.0)), (30.0, 4.0))
+        self.assertEqual(parse_rate("30", (1.0, 2.0)), (30.0, 2.0))
+        self.assertEqual(parse_rate("abc", (1.0, 2.0)), (1.0, 2.0))
+
+
+
+class TestAdaptiveController(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "store.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_additive_increase_and_multiplicative_decrease(self):
+        limiter = RateLimiter(self.path, rates={"profile": (60.0, 5.0)}, adaptive=True)
+        for _ in range(4):
+            limiter.record("acc", "profile", 200, 0.1)
+        rate, _ = limiter.rate_for("acc", "profile")
+        self.assertAlmostEqual(rate * 60, 64.0)
+
+        self.assertTrue(limiter.record("acc", "profile", 429, 0.1))
+        rate, _ = limiter.rate_for("acc", "profile")
+        self.assertAlmostEqual(rate * 60, 32.0)
+        # Cortes seguidos dentro do cooldown nao derrubam o ritmo de novo.
+        self.assertFalse(limiter.record("acc", "profile", 503, 0.1))
+        # Bucket esvaziado no corte: a proxima chamada precisa esperar.
+        self.assertGreater(limiter.try_acquire("acc", "profile"), 0)
+
+    def test_learned_rate_persists_between_runs(self):
+        first = RateLimiter(self.path, rates={"search": (20.0, 5.0)}, adaptive=True)
+        first.record("acc", "search", 429, 0.2)
+        second = RateLimiter(self.path, rates={"search": (20.0, 5.0)}, adaptive=True)
+        rate, _ = second.rate_for("acc", "search")
+        self.assertAlmostEqual(rate * 60, 10.0)
+
+    def test_send_classes_never_grow_past_configured_rate(self):
+        limiter = RateLimiter(self.path, rates={"invite": (6.0, 2.0)}, adaptive=True)
+        for _ in range(5):
+            limiter.record("acc", "invite", 201, 0.1)
+        rate, _ = limiter.rate_for("acc", "invite")
+        self.assertAlmostEqual(rate * 60, 6.0)
+
+    def test_cut_starts_from_capped_rate_for_over_cap_rows(self):
+        limiter = RateLimiter(self.path, rates={"invite": (6.0, 2.0)}, adaptive=True)
+        # Linha gravada antes do teto por classe (convites a 3x).
+        limiter._conn.execute(
+            """
+            INSERT INTO adaptive_rates
+                (account_id, endpoint, per_minute, concurrency, latency_ewma, samples, last_decrease, updated_at)
+            VALUES ('acc', 'invite', 18.0, 1.0, NULL, 0, 0.0, 0.0)
+            """
+        )
+        limiter.record("acc", "invite", 429, 0.1)
+        stored = limiter._conn.execute(
+            "SELECT per_minute FROM adaptive_rates WHERE account_id = 'acc' AND endpoint = 'invite'"
+        ).fetchone()[0]
+        self.assertAlmostEqual(stored, 3.0)
+
+    def test_cuts_from_another_process_are_seen_after_ttl(self):
+        ui = RateLimiter(self.path, rates={"profile": (60.0, 5.0)}, adaptive=True)
+        worker = RateLimiter(self.path, rates={"profile": (60.0, 5.0)}, adaptive=True)
+        with patch("rate_limiter.time.monotonic", return_value=100.0):
+            self.assertAlmostEqual(ui.rate_for("acc", "profile")[0] * 60, 60.0)
+        worker.record("acc", "profile", 429, 0.1)
+        with patch("rate_limiter.time.monotonic", return_value=100.5):
+            self.assertAlmostEqual(ui.rate_for("acc", "profile")[0] * 60, 60.0)
+        with patch("rate_limiter.time.monotonic", return_value=103.0):
+            self.assertAlmostEqual(ui.rate_for("acc", "profile")[0] * 60, 30.0)
+
+    def test_latency_spike_counts_as_congestion(self):
+        limiter = RateLimiter(self.path, rates={"profile": (60.0, 5.0)}, adaptive=True)
+        for _ in range(6):
+            limiter.record("acc", "profile", 200, 0.1)
+        self.assertTrue(limiter.record("acc", "profile", 200, 2.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+from response_cache import ResponseCache, profile_cache_key
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_ttl_expires_entries(self):
+        cache = ResponseCache("profile", ttl=60, max_entries=10, path=self.path)
+        with patch("response_cache.time.time", return_value=1000.0):
+            cache.set("a", {"id": "a"})
+            self.assertEqual(cache.get("a"), {"id": "a"})
+        with patch("response_cache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get("a"))
+
+    def test_lru_eviction_keeps_recently_read(self):
+        cache = ResponseCache("profile", ttl=3600, max_entries=2, path=self.path)
+        for now, action in ((1.0, "set a"), (2.0, "set b"), (3.0, "get a"), (4.0, "set c")):
+            verb, key = action.split()
+            with patch("response_cache.time.time", return_value=now):
+                if verb == "set":
+                    cache.set(key, {"id": key})
+                else:
+                    cache.get(key)
+        with patch("response_cache.time.time", return_value=5.0):
+            self.assertIsNotNone(cache.get("a"))
+            self.assertIsNone(cache.get("b"))
+            self.assertIsNotNone(cache.get("c"))
+
+    def test_eviction_runs_on_write_interval(self):
+        cache = ResponseCache("profile", ttl=3600, max_entries=2, path=self.path, evict_every=3)
+        for n, key in enumerate("abc"):
+            with patch("response_cache.time.time", return_value=float(n)):
+                cache.set(key, {"id": key})
+        with patch("response_cache.time.time", return_value=10.0):
+            self.assertIsNone(cache.get("a"))
+            self.assertIsNotNone(cache.get("c"))
+
+    def test_profile_cache_key_ignores_section_order(self):
+        self.assertEqual(
+            profile_cache_key("acc", "joao", ["experience", "about"]),
+            profile_cache_key("acc", "joao", ["about", "experience"]),
+        )
+        self.assertNotEqual(
+            profile_cache_key("acc", "joao", ["about"]), profile_cache_key("acc", "joao", ["experience"])
+        )
+        self.assertNotEqual(profile_cache_key("acc1", "joao", ["about"]), profile_cache_key("acc2", "joao", ["about"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
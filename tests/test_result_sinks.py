@@ -0,0 +1,60 @@
+import gzip
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+import result_sinks
+from result_sinks import JsonArraySink, JsonlSink, SupabaseLeadsSink, open_sink
+
+
+class TestResultSinks(unittest.TestCase):
+    def test_jsonl_sink_writes_gzip_lines_per_page(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "out.jsonl.gz")
+            with JsonlSink(path) as sink:
+                sink.write_page([{"id": "1"}, {"id": "2"}])
+                sink.write_page([{"id": "3", "name": "Ana"}])
+            with gzip.open(path, "rt", encoding="utf-8") as handle:
+                rows = [json.loads(line) for line in handle]
+        self.assertEqual([r["id"] for r in rows], ["1", "2", "3"])
+        self.assertEqual(sink.count, 3)
+
+    def test_json_array_sink_is_valid_json(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "out.json")
+            with open_sink("json", path) as sink:
+                sink.write_page([{"id": "1"}])
+                sink.write_page([])
+                sink.write_page([{"id": "2"}])
+            with open(path, encoding="utf-8") as handle:
+                self.assertEqual(json.load(handle), [{"id": "1"}, {"id": "2"}])
+        self.assertIsInstance(sink, JsonArraySink)
+
+    def test_supabase_sink_upserts_in_chunks(self):
+        db = MagicMock()
+        with SupabaseLeadsSink(db, "camp", user_id="user", chunk_size=2) as sink:
+            sink.write_page([{"id": "1"}, {"id": "2"}, {"id": "3"}])
+            self.assertEqual(db.save_leads.call_count, 1)
+        chunks = [call.args[1] for call in db.save_leads.call_args_list]
+        self.assertEqual([[lead["id"] for lead in chunk] for chunk in chunks], [["1", "2"], ["3"]])
+        self.assertEqual(db.save_leads.call_args.kwargs["user_id"], "user")
+        self.assertEqual(sink.count, 3)
+
+    @unittest.skipIf(result_sinks.pq is None, "pyarrow not installed")
+    def test_parquet_sink_keeps_columns_and_raw(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "out.parquet")
+            with open_sink("parquet", path, row_group_size=1) as sink:
+                sink.write_page([{"id": "1", "name": "Ana", "extra": {"a": 1}}, {"id": 2}])
+            table = result_sinks.pq.read_table(path)
+        self.assertEqual(table.column("id").to_pylist(), ["1", "2"])
+        self.assertEqual(json.loads(table.column("raw").to_pylist()[0])["extra"], {"a": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from retry_policy import RetryPolicy, default_policies, is_connect_failure, parse_retry_after
+
+
+class ResponseStub:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_parse_retry_after_variants(self):
+        self.assertEqual(parse_retry_after({"Retry-After": "7"}), 7.0)
+        self.assertEqual(parse_retry_after({"X-RateLimit-Reset": "1030"}, now=1000.0), 1030.0)
+        self.assertEqual(parse_retry_after({"X-RateLimit-Reset": "2000000030"}, now=2000000000.0), 30.0)
+        self.assertAlmostEqual(
+            parse_retry_after({"Retry-After": "Thu, 01 Jan 2037 00:00:10 GMT"}, now=2114380800.0),
+            10.0,
+        )
+        self.assertIsNone(parse_retry_after({}))
+
+    def test_honors_retry_after_header(self):
+        send = MagicMock(side_effect=[ResponseStub(429, {"Retry-After": "3"}), ResponseStub(200)])
+        with patch("retry_policy.time.sleep") as sleep:
+            response = RetryPolicy(max_attempts=3).run(send)
+        self.assertEqual(response.status_code, 200)
+        sleep.assert_called_once_with(3.0)
+
+    def test_fatal_status_is_not_retried(self):
+        send = MagicMock(return_value=ResponseStub(422))
+        with patch("retry_policy.time.sleep") as sleep:
+            response = RetryPolicy(max_attempts=5).run(send)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(send.call_count, 1)
+        sleep.assert_not_called()
+
+    def test_total_wait_is_capped(self):
+        send = MagicMock(return_value=ResponseStub(503, {"Retry-After": "40"}))
+        with patch("retry_policy.time.sleep") as sleep:
+            response = RetryPolicy(max_attempts=10, max_total_wait=100).run(send)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_long_retry_after_is_not_shortened(self):
+        send = MagicMock(return_value=ResponseStub(429, {"Retry-After": "300"}))
+        with patch("retry_policy.time.sleep") as sleep:
+            response = RetryPolicy(max_attempts=3, max_delay=60, max_total_wait=120).run(send)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(send.call_count, 1)
+        sleep.assert_not_called()
+
+        send = MagicMock(side_effect=[ResponseStub(429, {"Retry-After": "90"}), ResponseStub(200)])
+        with patch("retry_policy.time.sleep") as sleep:
+            RetryPolicy(max_attempts=3, max_delay=60, max_total_wait=120).run(send)
+        sleep.assert_called_once_with(90.0)
+
+    def test_paced_429_skips_backoff(self):
+        send = MagicMock(side_effect=[ResponseStub(429), ResponseStub(200)])
+        with patch("retry_policy.time.sleep") as sleep:
+            RetryPolicy().run(send, paced=True)
+        sleep.assert_not_called()
+
+    def test_send_policy_does_not_repeat_ambiguous_failures(self):
+        policy = default_policies()["invite"]
+        send = MagicMock(return_value=ResponseStub(500))
+        with patch("retry_policy.time.sleep"):
+            self.assertEqual(policy.run(send).status_code, 500)
+        self.assertEqual(send.call_count, 1)
+
+        send = MagicMock(side_effect=requests.ReadTimeout())
+        with self.assertRaises(requests.ReadTimeout):
+            policy.run(send)
+        self.assertEqual(send.call_count, 1)
+
+        # Reset depois do corpo enviado: o convite pode ter saído, então não repete.
+        send = MagicMock(side_effect=requests.ConnectionError(ConnectionResetError("reset by peer")))
+        with self.assertRaises(requests.ConnectionError):
+            policy.run(send)
+        self.assertEqual(send.call_count, 1)
+
+    def test_send_policy_repeats_only_connect_failures(self):
+        refused = requests.ConnectionError(
+            MaxRetryError(None, "/api/v1/users/invite", NewConnectionError(None, "connection refused"))
+        )
+        self.assertTrue(is_connect_failure(refused))
+        self.assertTrue(is_connect_failure(requests.exceptions.ConnectTimeout()))
+        self.assertFalse(is_connect_failure(requests.ConnectionError("aborted")))
+        send = MagicMock(side_effect=[refused, ResponseStub(201)])
+        with patch("retry_policy.time.sleep"):
+            self.assertEqual(default_policies()["invite"].run(send).status_code, 201)
+        self.assertEqual(send.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import argparse
 import json
 import os
 import tempfile
@@ -6,7 +7,16 @@ from unittest.mock import MagicMock, patch
 
 import requests
 
-from linkedin_salesnav_pagination import fetch_salesnav_people, _request_with_retries
+from linkedin_salesnav_pagination import (
+    _open_sink_from_args,
+    _load_checkpoint,
+    _request_with_retries,
+    fetch_salesnav_people,
+    iter_salesnav_people,
+    iter_sharded_salesnav_people,
+    load_batch,
+    run_batch,
+)
 
 
 class ResponseStub:
@@ -43,6 +53,27 @@ class TestSalesNavPagination(unittest.TestCase):
         self.assertEqual(data.get("items"), [])
         self.assertEqual(session.post.call_count, 2)
 
+    def test_request_with_retries_retries_5xx_but_not_auth_failures(self):
+        session = MagicMock()
+        session.post.side_effect = [
+            ResponseStub(502, {"error": "bad gateway"}),
+            ResponseStub(200, {"items": [], "paging": {}}),
+        ]
+        with patch("linkedin_salesnav_pagination.time.sleep", return_value=None):
+            status, _ = _request_with_retries(
+                session, "https://example.com", headers={}, params={}, payload={}, timeout=5, max_retries=3
+            )
+        self.assertEqual(status, 200)
+
+        session = MagicMock()
+        session.post.return_value = ResponseStub(401, {"error": "invalid api key"})
+        with patch("linkedin_salesnav_pagination.time.sleep", return_value=None):
+            with self.assertRaises(requests.HTTPError):
+                _request_with_retries(
+                    session, "https://example.com", headers={}, params={}, payload={}, timeout=5, max_retries=3
+                )
+        self.assertEqual(session.post.call_count, 1)
+
     def test_fetch_salesnav_people_paginates_until_cursor_end(self):
         page1 = {
             "items": [{"id": "1"}, {"id": "2"}],
@@ -143,6 +174,279 @@ class TestSalesNavPagination(unittest.TestCase):
         _, kwargs = session.post.call_args
         self.assertEqual(kwargs["params"].get("cursor"), "c1")
 
+    def test_resume_after_max_results_with_raised_limit(self):
+        pages = {
+            None: {"items": [{"id": "1"}, {"id": "2"}], "cursor": "c1"},
+            "c1": {"items": [{"id": "3"}, {"id": "4"}], "cursor": "c2"},
+            "c2": {"items": [{"id": "5"}], "cursor": None},
+        }
+        session = MagicMock()
+        session.post.side_effect = lambda url, **kwargs: ResponseStub(200, pages[kwargs["params"].get("cursor")])
+
+        def run(path, max_results):
+            return fetch_salesnav_people(
+                {"keywords": "RH"},
+                account_id="acc",
+                token="token",
+                base_url="https://api.test",
+                limit=2,
+                max_results=max_results,
+                min_delay=0.0,
+                max_delay=0.0,
+                prefetch=0,
+                checkpoint_path=path,
+                resume=True,
+            )
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint_path = os.path.join(tmpdir, "checkpoint.jsonl")
+            with patch("linkedin_salesnav_pagination.requests.Session", return_value=session):
+                first = run(checkpoint_path, 3)
+                state = _load_checkpoint(checkpoint_path)
+                self.assertFalse(state["finished"])
+                self.assertEqual(state["cursor"], "c1")
+                second = run(checkpoint_path, None)
+                self.assertTrue(_load_checkpoint(checkpoint_path)["finished"])
+        self.assertEqual([item["id"] for item in first], ["1", "2", "3"])
+        self.assertEqual([item["id"] for item in second], ["1", "2", "3", "4", "5"])
+        cursors = [kwargs["params"].get("cursor") for _, kwargs in session.post.call_args_list]
+        self.assertEqual(cursors, [None, "c1", "c1", "c2"])
+
+    def test_checkpoint_journal_appends_and_replays(self):
+        pages = [
+            {"items": [{"id": "1"}, {"id": "2"}], "cursor": "c1"},
+            {"items": [{"id": "2"}, {"id": "3"}], "cursor": "c2"},
+            {"items": [{"id": "4"}], "cursor": "c3"},
+        ]
+        session = MagicMock()
+        session.post.side_effect = [ResponseStub(200, page) for page in pages] + [requests.ConnectionError("down")]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint_path = os.path.join(tmpdir, "checkpoint.jsonl")
+            with patch("linkedin_salesnav_pagination.requests.Session", return_value=session):
+                with patch("linkedin_salesnav_pagination.time.sleep", return_value=None):
+                    with self.assertRaises(requests.ConnectionError):
+                        fetch_salesnav_people(
+                            {"keywords": "RH"},
+                            account_id="acc",
+                            token="token",
+                            base_url="https://api.test",
+                            min_delay=0.0,
+                            max_delay=0.0,
+                            checkpoint_path=checkpoint_path,
+                            resume=False,
+                            max_retries=1,
+                            prefetch=0,
+                        )
+            with open(checkpoint_path, encoding="utf-8") as handle:
+                lines = [json.loads(line) for line in handle if line.strip()]
+            # Empty snapshot + one line per page with only that page's new items.
+            self.assertEqual([line["type"] for line in lines], ["snapshot", "page", "page", "page"])
+            self.assertEqual([item["id"] for item in lines[2]["items"]], ["3"])
+
+            checkpoint = _load_checkpoint(checkpoint_path)
+            self.assertEqual(checkpoint["cursor"], "c3")
+            self.assertEqual(checkpoint["page"], 3)
+            self.assertEqual([item["id"] for item in checkpoint["items"]], ["1", "2", "3", "4"])
+
+    def test_iter_salesnav_people_streams_pages_and_skips_replay(self):
+        session = MagicMock()
+        session.post.side_effect = [
+            ResponseStub(200, {"items": [{"id": "2"}, {"id": "3"}], "cursor": "c2"}),
+            ResponseStub(200, {"items": [{"id": "3"}, {"id": "4"}], "cursor": None}),
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint_path = os.path.join(tmpdir, "checkpoint.json")
+            with open(checkpoint_path, "w", encoding="utf-8") as handle:
+                json.dump({"cursor": "c1", "page": 1, "items": [{"id": "1"}, {"id": "2"}]}, handle)
+            with patch("linkedin_salesnav_pagination.requests.Session", return_value=session):
+                pages = list(
+                    iter_salesnav_people(
+                        {"keywords": "RH"},
+                        account_id="acc",
+                        token="token",
+                        min_delay=0.0,
+                        max_delay=0.0,
+                        checkpoint_path=checkpoint_path,
+                        replay_checkpoint=False,
+                        by_page=True,
+                    )
+                )
+            checkpoint = _load_checkpoint(checkpoint_path)
+        self.assertEqual([[item["id"] for item in page] for page in pages], [["3"], ["4"]])
+        self.assertTrue(checkpoint["finished"])
+        self.assertEqual([item["id"] for item in checkpoint["items"]], ["1", "2", "3", "4"])
+
+    def test_resume_skips_only_exhausted_checkpoints(self):
+        session = MagicMock()
+        session.post.return_value = ResponseStub(200, {"items": [{"id": "1"}, {"id": "2"}], "cursor": None})
+
+        def resume(path):
+            return [
+                item["id"]
+                for item in iter_salesnav_people(
+                    {"keywords": "RH"},
+                    account_id="acc",
+                    token="token",
+                    min_delay=0.0,
+                    max_delay=0.0,
+                    prefetch=0,
+                    checkpoint_path=path,
+                )
+            ]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "checkpoint.jsonl")
+            with patch("linkedin_salesnav_pagination.requests.Session", return_value=session):
+                self.assertEqual(resume(path), ["1", "2"])
+                self.assertEqual(resume(path), ["1", "2"])
+                self.assertEqual(session.post.call_count, 1)
+
+                # Older snapshots marked any stop as finished: walk the search again.
+                with open(path, "w", encoding="utf-8") as handle:
+                    handle.write(json.dumps({"type": "snapshot", "cursor": None, "page": 1, "finished": True}) + "\n")
+                    handle.write(json.dumps({"type": "items", "items": [{"id": "1"}]}) + "\n")
+                self.assertEqual(resume(path), ["1", "2"])
+                self.assertEqual(session.post.call_count, 2)
+
+    def test_sharded_search_splits_over_cap_and_dedupes(self):
+        def post(url, headers=None, params=None, json=None, timeout=None):
+            regions = (json.get("location") or {}).get("include", [])
+            if params["limit"] == 1:
+                return ResponseStub(200, {"items": [], "paging": {"total_count": 3 if len(regions) > 1 else 2}})
+            # "x" aparece nas duas regiões e deve sair uma vez só.
+            items = {"sp": [{"id": "s1"}, {"id": "x"}], "rj": [{"id": "r1"}, {"id": "x"}]}[regions[0]]
+            return ResponseStub(200, {"items": items, "cursor": None})
+
+        session = MagicMock()
+        session.post.side_effect = post
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch("linkedin_salesnav_pagination.requests.Session", return_value=session):
+                results = list(
+                    iter_sharded_salesnav_people(
+                        {"keywords": "RH", "location": {"include": ["sp", "rj"]}},
+                        account_id="acc",
+                        token="token",
+                        cap=2,
+                        checkpoint_dir=tmpdir,
+                        min_delay=0.0,
+                        max_delay=0.0,
+                    )
+                )
+            with open(os.path.join(tmpdir, "plan.json"), encoding="utf-8") as handle:
+                plan = json.load(handle)
+        self.assertEqual(sorted(item["id"] for item in results), ["r1", "s1", "x"])
+        self.assertEqual(len(plan["shards"]), 2)
+
+    def test_load_batch_accepts_urls_and_filter_dicts(self):
+        url = (
+            "https://www.linkedin.com/sales/search/people?query=(keywords:rh,filters:List("
+            "(type:REGION,values:List((id:106057199,selectionType:INCLUDED)))))"
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "batch.jsonl")
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write(url + "\n")
+                handle.write("# comentario\n")
+                handle.write(json.dumps({"keywords": "ti"}) + "\n")
+                handle.write(json.dumps({"name": "sp", "params": {"keywords": "rh"}, "account_id": "acc2"}) + "\n")
+            entries = load_batch(path)
+        self.assertEqual([e["name"] for e in entries], ["search-001", "search-002", "sp"])
+        self.assertEqual(entries[0]["params"]["location"], {"include": ["106057199"]})
+        self.assertEqual(entries[1]["params"], {"keywords": "ti"})
+        self.assertEqual(entries[2]["account_id"], "acc2")
+
+    def test_run_batch_spreads_searches_and_isolates_failures(self):
+        calls = []
+
+        def post(url, headers=None, params=None, json=None, timeout=None):
+            calls.append((params["account_id"], json["keywords"]))
+            if json["keywords"] == "quebra":
+                return ResponseStub(400, {"error": "bad filter"})
+            return ResponseStub(200, {"items": [{"id": json["keywords"]}], "cursor": None})
+
+        session = MagicMock()
+        session.post.side_effect = post
+        written = {}
+
+        class ListSink:
+            def __init__(self, name):
+                self.name = name
+
+            def write_page(self, items):
+                written.setdefault(self.name, []).extend(items)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        entries = [
+            {"name": "a", "params": {"keywords": "rh"}},
+            {"name": "b", "params": {"keywords": "ti"}},
+            {"name": "c", "params": {"keywords": "quebra"}},
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch("linkedin_salesnav_pagination.requests.Session", return_value=session):
+                summary = run_batch(
+                    entries,
+                    accounts=["acc1", "acc2"],
+                    token="token",
+                    open_entry_sink=lambda entry: ListSink(entry["name"]),
+                    work_dir=tmpdir,
+                    min_delay=0.0,
+                    max_delay=0.0,
+                )
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, "a.checkpoint.json")))
+        self.assertEqual([(s["name"], s["account_id"], s["saved"]) for s in summary[:2]], [("a", "acc1", 1), ("b", "acc2", 1)])
+        self.assertIsNotNone(summary[2]["error"])
+        self.assertEqual(written, {"a": [{"id": "rh"}], "b": [{"id": "ti"}]})
+        self.assertIn(("acc2", "ti"), calls)
+
+    def test_run_batch_reports_an_invalid_sink_without_aborting(self):
+        session = MagicMock()
+        session.post.side_effect = lambda url, **kwargs: ResponseStub(
+            200, {"items": [{"id": kwargs["json"]["keywords"]}], "cursor": None}
+        )
+        args = argparse.Namespace(
+            sink="supabase", output=None, campaign_id=None, supabase_url="https://db.test", supabase_key="k", user_id="u"
+        )
+        written = []
+
+        class ListSink:
+            def write_page(self, items):
+                written.extend(items)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        def open_entry_sink(entry):
+            if entry["name"] == "sem-campanha":
+                return _open_sink_from_args(args, campaign_id=entry.get("campaign_id"))
+            return ListSink()
+
+        entries = [
+            {"name": "sem-campanha", "params": {"keywords": "rh"}},
+            {"name": "ok", "params": {"keywords": "ti"}},
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch("linkedin_salesnav_pagination.requests.Session", return_value=session):
+                summary = run_batch(
+                    entries,
+                    accounts=["acc1"],
+                    token="token",
+                    open_entry_sink=open_entry_sink,
+                    work_dir=tmpdir,
+                    min_delay=0.0,
+                    max_delay=0.0,
+                )
+        self.assertIn("--campaign-id", summary[0]["error"])
+        self.assertEqual((summary[1]["saved"], summary[1]["error"]), (1, None))
+        self.assertEqual(written, [{"id": "ti"}])
+
 
 if __name__ == "__main__":
     unittest.main()
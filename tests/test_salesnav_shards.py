@@ -0,0 +1,82 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+from salesnav_shards import facet_values, plan_shards, split_params
+from salesnav_url import parse_salesnav_url, salesnav_search_params
+
+
+class TestSalesNavShards(unittest.TestCase):
+    def test_facet_values_prefers_included_values(self):
+        params = {"location": {"include": ["1", "2"]}, "seniority": {"include": ["cxo"]}}
+        self.assertEqual(facet_values(params, "REGION"), ["1", "2"])
+        # Um valor só já não divide.
+        self.assertEqual(facet_values(params, "SENIORITY_LEVEL"), [])
+        # Sem filtro de indústria e sem candidatos, não há como dividir.
+        self.assertEqual(facet_values(params, "INDUSTRY"), [])
+        self.assertEqual(facet_values(params, "INDUSTRY", ["4", "96"]), ["4", "96"])
+
+    def test_facet_values_enumerates_known_facets_minus_excluded(self):
+        params = {"seniority": {"exclude": ["in_training"]}}
+        values = facet_values(params, "SENIORITY_LEVEL")
+        self.assertIn("cxo", values)
+        self.assertNotIn("in_training", values)
+        self.assertEqual(len(facet_values({}, "COMPANY_HEADCOUNT")), 8)
+
+    def test_split_params_restricts_each_copy(self):
+        params = {"keywords": "rh", "location": {"include": ["1", "2"], "exclude": ["3"]}}
+        children = split_params(params, "REGION", ["1", "2"])
+        self.assertEqual([c["location"] for c in children], [{"include": ["1"]}, {"include": ["2"]}])
+        self.assertEqual(params["location"]["include"], ["1", "2"])
+        headcount = split_params({}, "COMPANY_HEADCOUNT", [{"min": 1, "max": 10}])
+        self.assertEqual(headcount[0]["company_headcount"], [{"min": 1, "max": 10}])
+
+    def test_plan_shards_splits_recursively_until_under_cap(self):
+        def probe(params):
+            region = (params.get("location") or {}).get("include", [])
+            seniority = (params.get("seniority") or {}).get("include", [])
+            if len(region) != 1:
+                return 9000
+            if region == ["sp"] and len(seniority) != 1:
+                return 4000
+            if seniority == ["in_training"]:
+                return 0
+            return 800
+
+        shards = plan_shards(
+            {"keywords": "rh", "location": {"include": ["sp", "rj"]}},
+            probe,
+            cap=2500,
+            facets=("REGION", "SENIORITY_LEVEL"),
+        )
+        regions = [s.params["location"]["include"][0] for s in shards]
+        self.assertEqual(regions.count("rj"), 1)
+        # SP foi dividido por senioridade; a faixa vazia foi descartada.
+        self.assertEqual(regions.count("sp"), 9)
+        self.assertTrue(all(s.total <= 2500 for s in shards))
+        self.assertEqual(len({s.key for s in shards}), len(shards))
+
+    def test_plan_shards_keeps_unsplittable_shard(self):
+        shards = plan_shards({"location": {"include": ["sp"]}}, lambda params: 5000, facets=("REGION",))
+        self.assertEqual(len(shards), 1)
+        self.assertEqual(shards[0].total, 5000)
+
+    def test_salesnav_search_params_from_url(self):
+        url = (
+            "https://www.linkedin.com/sales/search/people?query=(keywords:rh,filters:List("
+            "(type:REGION,values:List((id:106057199,selectionType:INCLUDED))),"
+            "(type:SENIORITY_LEVEL,values:List((id:DIRECTOR,selectionType:INCLUDED),"
+            "(id:TRAINING,selectionType:EXCLUDED))),"
+            "(type:COMPANY_HEADCOUNT,values:List((id:D,selectionType:INCLUDED)))))"
+        )
+        params = salesnav_search_params(parse_salesnav_url(url))
+        self.assertEqual(params["keywords"], "rh")
+        self.assertEqual(params["location"], {"include": ["106057199"]})
+        self.assertEqual(params["seniority"], {"include": ["director"], "exclude": ["in_training"]})
+        self.assertEqual(params["company_headcount"], [{"min": 51, "max": 200}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+from send_counters import ACTION_INVITE, ACTION_MESSAGE, SendCounters
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, rows, filters):
+        self.rows = rows
+        self.filters = filters
+
+    def select(self, columns):
+        return self
+
+    def eq(self, key, value):
+        self.filters[key] = value
+        return self
+
+    def gte(self, key, value):
+        self.filters[f"{key}>="] = value
+        return self
+
+    def execute(self):
+        start = self.filters.get("day>=")
+        return FakeResponse([row for row in self.rows if row["day"] >= start])
+
+
+class FakeSupabase:
+    def __init__(self, rows=None, fail=False):
+        self.rows = rows or []
+        self.fail = fail
+        self.filters = {}
+        self.rpc_calls = []
+
+    def table(self, name):
+        if self.fail:
+            raise ConnectionError("offline")
+        return FakeQuery(self.rows, self.filters)
+
+    def rpc(self, name, params):
+        if self.fail:
+            raise ConnectionError("offline")
+        self.rpc_calls.append((name, params))
+        return _Rpc(params["p_amount"] + 4)
+
+
+class _Rpc:
+    def __init__(self, value):
+        self.value = value
+
+    def execute(self):
+        return FakeResponse(self.value)
+
+
+def day(offset):
+    return (datetime.utcnow().date() - timedelta(days=offset)).isoformat()
+
+
+class TestSendCounters(unittest.TestCase):
+    def test_remaining_uses_daily_and_weekly_window(self):
+        rows = [{"day": day(0), "count": 10}, {"day": day(3), "count": 25}, {"day": day(9), "count": 99}]
+        counters = SendCounters(FakeSupabase(rows), limits={ACTION_INVITE: {"daily": 40, "weekly": 40}})
+        self.assertEqual(counters.usage("acc", ACTION_INVITE), {"day": 10, "window": 35})
+        self.assertEqual(counters.remaining("acc", ACTION_INVITE), 5)
+
+    def test_no_limit_or_read_failure_does_not_block(self):
+        counters = SendCounters(FakeSupabase(), limits={ACTION_MESSAGE: {"daily": 0, "weekly": 0}})
+        self.assertIsNone(counters.remaining("acc", ACTION_MESSAGE))
+        failing = SendCounters(FakeSupabase(fail=True), limits={ACTION_INVITE: {"daily": 10}})
+        self.assertIsNone(failing.remaining("acc", ACTION_INVITE))
+        self.assertIsNone(failing.record("acc", ACTION_INVITE))
+
+    def test_record_calls_atomic_increment(self):
+        sb = FakeSupabase()
+        total = SendCounters(sb, user_id="u1").record("acc", ACTION_INVITE)
+        self.assertEqual(total, 5)
+        name, params = sb.rpc_calls[0]
+        self.assertEqual(name, "increment_send_counter")
+        self.assertEqual(params["p_account_id"], "acc")
+        self.assertEqual(params["p_action"], ACTION_INVITE)
+        self.assertEqual(params["p_user_id"], "u1")
+        self.assertEqual(params["p_day"], day(0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+from supabase_utils import iter_keyset, iter_keyset_pages
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """Imita o builder do postgrest sobre uma lista em memória."""
+
+    def __init__(self, rows, calls, max_rows=None):
+        self.rows = rows
+        self.calls = calls
+        self.max_rows = max_rows
+        self.after = None
+        self.size = None
+
+    def gt(self, key, value):
+        self.after = (key, value)
+        return self
+
+    def order(self, key):
+        self.key = key
+        return self
+
+    def limit(self, size):
+        self.size = size
+        return self
+
+    def execute(self):
+        self.calls.append((self.after, self.size))
+        rows = sorted(self.rows, key=lambda row: row[self.key])
+        if self.after:
+            rows = [row for row in rows if row[self.key] > self.after[1]]
+        size = min(self.size, self.max_rows or self.size)
+        return FakeResponse(rows[:size])
+
+
+class TestKeysetPagination(unittest.TestCase):
+    def setUp(self):
+        self.rows = [{"id": f"{n:04d}"} for n in reversed(range(25))]
+        self.calls = []
+
+    def test_pages_follow_last_key(self):
+        pages = list(iter_keyset_pages(lambda: FakeQuery(self.rows, self.calls), page_size=10))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(self.calls[0], (None, 10))
+        self.assertEqual(self.calls[1], (("id", "0009"), 10))
+        self.assertEqual(len(self.calls), 4)
+
+    def test_server_row_cap_does_not_truncate(self):
+        rows = list(iter_keyset(lambda: FakeQuery(self.rows, self.calls, max_rows=7), page_size=10))
+        self.assertEqual([row["id"] for row in rows], [f"{n:04d}" for n in range(25)])
+
+    def test_empty_table(self):
+        self.assertEqual(list(iter_keyset(lambda: FakeQuery([], self.calls))), [])
+        self.assertEqual(len(self.calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,229 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "projeto_linkedin"))
+
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from unipile_client import AsyncUnipileClient, UnipileClient, build_session
+
+
+class ResponseStub:
+    def __init__(self, status_code, payload, headers=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = headers or {}
+        self.text = ""
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(response=self)
+
+
+class TestUnipileClientSession(unittest.TestCase):
+    def test_build_session_mounts_pooled_adapter(self):
+        session = build_session(pool_connections=2, pool_maxsize=7)
+        adapter = session.get_adapter("https://api.test")
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 7)
+
+    def test_all_methods_share_one_session(self):
+        session = MagicMock()
+        session.request.return_value = ResponseStub(200, {"items": []})
+        client = UnipileClient("https://api.test", "key", session=session)
+
+        client.get_profile_details("acc", "joao")
+        client.list_relations("acc")
+        client.start_chat("acc", ["p1"], "oi")
+        client.send_message_in_chat("c1", "oi", account_id="acc")
+
+        self.assertEqual(session.request.call_count, 4)
+
+
+class TestProfileCache(unittest.TestCase):
+    def test_profile_is_served_from_cache_unless_bypassed(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ResponseCache("profile", ttl=3600, max_entries=10, path=os.path.join(tmpdir, "c.sqlite3"))
+            session = MagicMock()
+            session.request.return_value = ResponseStub(200, {"public_identifier": "joao"})
+            client = UnipileClient("https://api.test", "key", session=session, profile_cache=cache)
+
+            client.get_profile_details("acc", "joao", sections=["about"])
+            client.get_profile_details("acc", "joao", sections=["about"])
+            self.assertEqual(session.request.call_count, 1)
+
+            client.get_profile_details("acc", "joao", sections=["experience"])
+            client.get_profile_details("acc", "joao", sections=["about"], use_cache=False)
+            self.assertEqual(session.request.call_count, 3)
+
+    def test_profile_cache_is_per_account(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = ResponseCache("profile", ttl=3600, max_entries=10, path=os.path.join(tmpdir, "c.sqlite3"))
+            session = MagicMock()
+            session.request.side_effect = [
+                ResponseStub(200, {"public_identifier": "joao", "network_distance": "FIRST_DEGREE"}),
+                ResponseStub(200, {"public_identifier": "joao", "network_distance": "THIRD_DEGREE"}),
+            ]
+            client = UnipileClient("https://api.test", "key", session=session, profile_cache=cache)
+
+            first = client.get_profile_details("acc-a", "joao", sections=["about"])
+            second = client.get_profile_details("acc-b", "joao", sections=["about"])
+            self.assertEqual(session.request.call_count, 2)
+            self.assertEqual(first["network_distance"], "FIRST_DEGREE")
+            self.assertEqual(second["network_distance"], "THIRD_DEGREE")
+            self.assertEqual(client.get_profile_details("acc-a", "joao", sections=["about"]), first)
+            self.assertEqual(session.request.call_count, 2)
+
+
+class TestProfilesBulk(unittest.TestCase):
+    def make_client(self, delays):
+        client = UnipileClient("https://api.test", "key", session=MagicMock(), single_flight=None)
+
+        def fake_profile(account_id, identifier, sections=None, use_cache=True):
+            time.sleep(delays[identifier])
+            if identifier == "bad":
+                raise requests.HTTPError("404")
+            return {"public_identifier": identifier}
+
+        client.get_profile_details = fake_profile
+        return client
+
+    def test_unordered_yields_as_completed_with_errors(self):
+        client = self.make_client({"slow": 0.1, "fast": 0.0, "bad": 0.0})
+        results = list(client.get_profiles_bulk("acc", ["slow", "fast", "bad"], concurrency=3))
+        self.assertEqual(results[-1][0], "slow")
+        by_id = dict(results)
+        self.assertEqual(by_id["fast"], {"public_identifier": "fast"})
+        self.assertIsInstance(by_id["bad"], requests.HTTPError)
+
+    def test_ordered_keeps_input_order(self):
+        client = self.make_client({"a": 0.05, "b": 0.0, "c": 0.01})
+        results = client.get_profiles_bulk("acc", ["a", "b", "c"], concurrency=3, ordered=True)
+        self.assertEqual([identifier for identifier, _ in results], ["a", "b", "c"])
+
+    def test_empty_identifiers_are_reported_without_stopping(self):
+        client = self.make_client({"a": 0.0, "b": 0.0})
+        results = list(client.get_profiles_bulk("acc", ["a", None, "", "b"], concurrency=2, ordered=True))
+        self.assertEqual([identifier for identifier, _ in results], ["a", None, "", "b"])
+        self.assertIsInstance(results[1][1], ValueError)
+        self.assertIsInstance(results[2][1], ValueError)
+        self.assertEqual(results[3][1], {"public_identifier": "b"})
+
+    def test_fresh_account_runs_at_caller_concurrency(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            limiter = RateLimiter(os.path.join(tmp, "store.sqlite3"), adaptive=True)
+            client = self.make_client({name: 0.05 for name in "abcd"})
+            client.rate_limiter = limiter
+            active, peak, lock = [0], [0], threading.Lock()
+            fetch = client.get_profile_details
+
+            def tracked(*args, **kwargs):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                try:
+                    return fetch(*args, **kwargs)
+                finally:
+                    with lock:
+                        active[0] -= 1
+
+            client.get_profile_details = tracked
+            list(client.get_profiles_bulk("acc", list("abcd"), concurrency=4))
+            self.assertEqual(peak[0], 4)
+
+    def test_workers_do_not_overwrite_caller_status(self):
+        session = MagicMock()
+        session.request.side_effect = lambda method, url, **kwargs: (
+            ResponseStub(404, {"error": "not found"}) if url.endswith("/bad") else ResponseStub(200, {"ok": True})
+        )
+        client = UnipileClient("https://api.test", "key", session=session, single_flight=None)
+        client.last_status = 201
+        results = dict(client.get_profiles_bulk("acc", ["good", "bad"], concurrency=2))
+        self.assertEqual(results["good"], {"ok": True})
+        self.assertEqual(results["bad"].response.status_code, 404)
+        self.assertEqual(client.last_status, 201)
+        self.assertIsNone(client.last_error_status)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_identical_gets_share_one_request(self):
+        release = threading.Event()
+
+        def slow_request(*args, **kwargs):
+            release.wait(2)
+            return ResponseStub(200, {"public_identifier": "joao"})
+
+        session = MagicMock()
+        session.request.side_effect = slow_request
+        flight = SingleFlight()
+        clients = [UnipileClient("https://api.test", "key", session=session, single_flight=flight) for _ in range(2)]
+        results = []
+        threads = [
+            threading.Thread(target=lambda c=c: results.append(c.get_profile_details("acc", "joao")))
+            for c in clients * 2
+        ]
+        for thread in threads:
+            thread.start()
+        while flight.in_flight() == 0:
+            time.sleep(0.005)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(session.request.call_count, 1)
+        self.assertEqual([r["public_identifier"] for r in results], ["joao"] * 4)
+        self.assertEqual(len({id(r) for r in results}), 4)
+
+    def test_posts_are_not_coalesced(self):
+        session = MagicMock()
+        session.request.return_value = ResponseStub(200, {"object": "UserInvitationSent"})
+        client = UnipileClient("https://api.test", "key", session=session, single_flight=SingleFlight())
+        client.send_invitation("acc", "p1")
+        client.send_invitation("acc", "p1")
+        self.assertEqual(session.request.call_count, 2)
+
+
+class TestAsyncUnipileClient(unittest.TestCase):
+    def test_per_account_concurrency_is_bounded(self):
+        lock = threading.Lock()
+        state = {"current": 0, "peak": 0}
+
+        def fake_profile(account_id, identifier, **kwargs):
+            with lock:
+                state["current"] += 1
+                state["peak"] = max(state["peak"], state["current"])
+            time.sleep(0.02)
+            with lock:
+                state["current"] -= 1
+            return {"id": identifier}
+
+        fake_client = MagicMock()
+        fake_client.rate_limiter = None
+        fake_client.get_profile_details.side_effect = fake_profile
+
+        async def run():
+            async with AsyncUnipileClient("https://api.test", "key", max_concurrency=2, client=fake_client) as client:
+                return await asyncio.gather(
+                    *(client.get_profile_details("acc", f"p{i}") for i in range(6))
+                )
+
+        results = asyncio.run(run())
+        self.assertEqual([r["id"] for r in results], [f"p{i}" for i in range(6)])
+        self.assertEqual(state["peak"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()